@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Event loop benchmark: runs a simulated command workload through the cogs on asyncio's
+default loop and on uvloop, and compares throughput and latency.
+
+Usage:
+    python benchmark_loops.py [--commands 2000] [--concurrency 50] [--loops asyncio,uvloop]
+
+Each loop is measured in its own process, against a throwaway credits database in a
+temporary directory, so the real credits.db is never touched. Nothing connects to
+Discord: messages are parsed into a Context and run through bot.invoke() as on_message
+would, with stand-in users, channels and messages whose sends return immediately. The
+numbers therefore cover command dispatch, cog code, database calls and executor round
+trips, but not network I/O. A loop that isn't installed is skipped.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+import statistics
+import subprocess
+import tempfile
+import importlib.util
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PREFIX = '!'
+EXTENSIONS = ['credits_system.cog', 'cogs.games', 'cogs.help']
+# Commands that finish without another user or a button press; slots is left out
+# because its reel animation sleeps for several seconds
+WORKLOAD = [
+    '!roll 3d6', '!8ball will this be fast?', '!rfi', '!coinflip',
+    '!credits', '!leaderboard', '!top', '!history', '!help', '!help roll',
+]
+
+
+class Stub:
+    """
+    Stands in for a Discord object.
+
+    Attributes given to the constructor are returned as is, missing ones are new stubs,
+    and calling or awaiting a stub returns a stub, so `await channel.send(...)` and
+    `await message.edit(...)` complete without doing anything.
+    """
+
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Stub()
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __await__(self):
+        yield from ()
+        return self
+
+    def __iter__(self):
+        return iter(())
+
+    def __str__(self):
+        return 'stub'
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run_workload(total: int, concurrency: int) -> Dict:
+    """Measure `total` commands issued by `concurrency` simulated users on the running loop"""
+    import discord
+    from discord.ext import commands
+    from discord.ext.commands.view import StringView
+
+    message_ids = itertools.count(1)
+
+    async def send(*args, **kwargs):
+        return Stub(id=next(message_ids))
+
+    class BenchContext(commands.Context):
+        async def send(self, *args, **kwargs):
+            return await send()
+
+        async def reply(self, *args, **kwargs):
+            return await send()
+
+    bot = commands.Bot(command_prefix=PREFIX, intents=discord.Intents.default(), case_insensitive=True, help_command=None)
+    bot.owner_id = 0  # Owner checks would otherwise fetch the application info over HTTP
+    errors: Counter = Counter()
+
+    @bot.event
+    async def on_command_error(ctx, error):
+        errors[f"{ctx.command}: {type(getattr(error, 'original', error)).__name__}"] += 1
+
+    channel = Stub(id=2, name='benchmark', mention='<#2>', send=send)
+    guild = Stub(id=1, name='Benchmark', member_count=concurrency, members=[], shard_id=0, chunked=True,
+                 icon=None, get_member=lambda user_id: None)
+
+    def make_user(index: int) -> Stub:
+        user_id = 1000 + index
+        return Stub(id=user_id, name=f'user{index}', display_name=f'User {index}', global_name=None,
+                    mention=f'<@{user_id}>', discriminator='0', bot=False, avatar=None, roles=[],
+                    display_avatar=Stub(url='https://cdn.discordapp.com/embed/avatars/0.png'))
+
+    async def dispatch(author: Stub, content: str) -> float:
+        message = Stub(id=next(message_ids), content=content, author=author, guild=guild, channel=channel,
+                       attachments=[], mentions=[], reply=send)
+        start = time.perf_counter()
+        view = StringView(content)
+        view.skip_string(PREFIX)
+        ctx = BenchContext(prefix=PREFIX, view=view, bot=bot, message=message)
+        ctx.invoked_with = view.get_word()
+        ctx.command = bot.all_commands.get(ctx.invoked_with)
+        await bot.invoke(ctx)
+        return time.perf_counter() - start
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    async with bot:
+        for extension in EXTENSIONS:
+            await bot.load_extension(extension)
+
+        # One untimed pass to warm caches, prepared statements and the read pool
+        warmup_user = make_user(concurrency)
+        for content in WORKLOAD:
+            await dispatch(warmup_user, content)
+        errors.clear()
+
+        workload = itertools.cycle(WORKLOAD)
+        remaining = [total]
+
+        async def simulated_user(index: int):
+            author = make_user(index)
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                content = next(workload)
+                latencies[content.split()[0]].append(await dispatch(author, content))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(simulated_user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        for extension in list(bot.extensions):
+            await bot.unload_extension(extension)
+
+    every = [latency for values in latencies.values() for latency in values]
+    loop = asyncio.get_running_loop()
+    return {
+        'loop': f"{type(loop).__module__}.{type(loop).__name__}",
+        'commands': len(every),
+        'seconds': elapsed,
+        'throughput': len(every) / elapsed,
+        'p50_ms': percentile(every, 0.50) * 1000,
+        'p95_ms': percentile(every, 0.95) * 1000,
+        'p99_ms': percentile(every, 0.99) * 1000,
+        'max_ms': max(every) * 1000,
+        'per_command_p50_ms': {name: statistics.median(values) * 1000 for name, values in sorted(latencies.items())},
+        'errors': dict(errors),
+    }
+
+
+def run_child(loop_name: str, total: int, concurrency: int):
+    """Run the workload on one loop in this process and print the result as JSON"""
+    sys.path.insert(0, BASE_DIR)
+    from utils.event_loop import run
+    os.chdir(tempfile.mkdtemp(prefix='rfibot-bench-'))  # The credits database is created here
+    result = run(run_workload(total, concurrency), loop_name)
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare command throughput and latency on asyncio and uvloop")
+    parser.add_argument('--commands', type=int, default=2000, help="commands per run (default: 2000)")
+    parser.add_argument('--concurrency', type=int, default=50, help="simulated users issuing commands at once (default: 50)")
+    parser.add_argument('--loops', default='asyncio,uvloop', help="event loops to compare (default: asyncio,uvloop)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.commands, args.concurrency)
+        return
+
+    results = {}
+    for loop_name in [name.strip() for name in args.loops.split(',') if name.strip()]:
+        if loop_name == 'uvloop' and importlib.util.find_spec('uvloop') is None:
+            print("uvloop is not installed, skipping it (install it with: uv pip install uvloop)")
+            continue
+        print(f"Running {args.commands} commands with {args.concurrency} users on {loop_name}...")
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', loop_name,
+             '--commands', str(args.commands), '--concurrency', str(args.concurrency)],
+            capture_output=True, text=True
+        )
+        if output.returncode != 0:
+            print(f"{loop_name} run failed:\n{output.stderr}")
+            continue
+        results[loop_name] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    if not results:
+        sys.exit(1)
+
+    print()
+    print(f"{'loop':<10} {'commands/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for loop_name, result in results.items():
+        print(
+            f"{loop_name:<10} {result['throughput']:>11.0f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} {result['max_ms']:>8.2f} {sum(result['errors'].values()):>7}"
+        )
+
+    names = list(results)
+    print()
+    print("p50 ms per command:")
+    print(f"  {'command':<12}" + ''.join(f" {name:>10}" for name in names))
+    for command in results[names[0]]['per_command_p50_ms']:
+        print(f"  {command:<12}" + ''.join(f" {results[name]['per_command_p50_ms'].get(command, float('nan')):>10.2f}" for name in names))
+
+    if 'asyncio' in results and 'uvloop' in results:
+        base, fast = results['asyncio'], results['uvloop']
+        print()
+        print(f"uvloop vs asyncio: throughput {fast['throughput'] / base['throughput'] - 1:+.1%}, "
+              f"p50 {fast['p50_ms'] / base['p50_ms'] - 1:+.1%}, p99 {fast['p99_ms'] / base['p99_ms'] - 1:+.1%}")
+
+    for loop_name, result in results.items():
+        for error, count in result['errors'].items():
+            print(f"{loop_name}: {count} x {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,35 @@
 #!/usr/bin/env python3
 import os
+from config import (
+    TOKEN, COMMAND_PREFIX, AUTO_SHARD, SHARD_COUNT, SHARD_IDS, CLUSTER_ID, STARTUP_PROFILE, LAZY_COGS,
+    MEMBER_CACHE, CHUNK_GUILDS_AT_STARTUP, METRICS_PORT, METRICS_HOST, HEALTH_FILE, HEALTH_INTERVAL, HEALTH_MAX_LOOP_LAG,
+    LOOP_STALL_THRESHOLD, LOOP_STALL_REPORT_INTERVAL, EVENT_LOOP, SHUTDOWN_GRACE_PERIOD
+)
+from utils.startup import StartupProfiler
+
+# Installed before the heavy imports below so they show up in the startup report
+startup_profiler = StartupProfiler()
+if STARTUP_PROFILE:
+    startup_profiler.install()
+
 import discord
 from discord.ext import commands
 from discord.ext.commands import Context
-import asyncio
+import time
 import logging
 import traceback
-from config import TOKEN, COMMAND_PREFIX
 from utils.logger import setup_logger
 from utils.discord_error_handler import DiscordErrorHandler
+from utils.sharding import parse_shard_ids, log_shard_summary
+from utils.lazy_cogs import LazyCogLoader, scan_extension
+from utils.member_cache import member_cache_flags, log_member_cache
+from utils.health import HealthMonitor
+from utils.metrics import (
+    COMMANDS, COMMAND_DURATION, COMMAND_ERRORS, MetricsServer, observe_db_query, register_bot_metrics
+)
+from utils.loop_monitor import LoopMonitor
+from utils.event_loop import run
+from utils.shutdown import GracefulShutdown
 
 
 # Get the directory of the current script
@@ -26,34 +47,84 @@ intents.reactions = True
 intents.guilds = True
 intents.messages = True  # Explicitly enable messages intent
 intents.members = True   # Enable member events for welcome messages
-bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents, case_insensitive=True, help_command=None)
+
+# Member cache policy: chunking at startup only makes sense if chunked members stay cached
+cache_flags = member_cache_flags(MEMBER_CACHE)
+chunk_at_startup = CHUNK_GUILDS_AT_STARTUP and cache_flags.joined
+if CHUNK_GUILDS_AT_STARTUP and not chunk_at_startup:
+    logger.info(f"MEMBER_CACHE={MEMBER_CACHE} doesn't keep joined members, so guilds won't be chunked at startup")
+if not chunk_at_startup:
+    # discord.py drops GUILD_MEMBER_UPDATE for members it hasn't cached, so on_member_update never sees them
+    logger.warning(
+        "Not every member is cached, so username changes of uncached members aren't seen live; "
+        "the credits system picks them up at the next startup reconciliation"
+    )
+bot_options = dict(
+    command_prefix=COMMAND_PREFIX, intents=intents, case_insensitive=True, help_command=None,
+    member_cache_flags=cache_flags, chunk_guilds_at_startup=chunk_at_startup
+)
+
+# Shard when asked to (AUTO_SHARD) or when a shard layout is given (SHARD_COUNT/SHARD_IDS, e.g. from launcher.py)
+shard_ids = parse_shard_ids(SHARD_IDS)
+if AUTO_SHARD or SHARD_COUNT or shard_ids:
+    bot = commands.AutoShardedBot(**bot_options, shard_count=SHARD_COUNT, shard_ids=shard_ids)
+    logger.info(f"Cluster {CLUSTER_ID}: sharded mode, shard count {SHARD_COUNT or 'auto'}, shards {shard_ids or 'all'}")
+else:
+    bot = commands.Bot(**bot_options)
+
+PREFIX_LENGTH = len(COMMAND_PREFIX)
 
 # Initialize Discord error handler (will be fully initialized in on_ready)
 discord_error_handler = DiscordErrorHandler(bot)
 
+lazy_cogs = LazyCogLoader(bot, startup_profiler)
+bot.lazy_cogs = lazy_cogs  # Lets !reload tell deferred cogs from unknown ones
+
+health = HealthMonitor(bot, HEALTH_FILE, HEALTH_INTERVAL, HEALTH_MAX_LOOP_LAG)
+
+# Measures event loop lag, and catches what blocks the loop unless LOOP_STALL_THRESHOLD is 0
+loop_monitor = LoopMonitor(LOOP_STALL_THRESHOLD, LOOP_STALL_REPORT_INTERVAL, discord_error_handler.send_error_to_discord)
+
+# SIGTERM/SIGINT drain running games and flush credits writes before disconnecting
+shutdown = GracefulShutdown(bot, SHUTDOWN_GRACE_PERIOD)
+
 # Load cogs
 async def load_cogs():
-    """Dynamically loads all cogs from the 'cogs' directory."""
-    for filename in os.listdir('./cogs'):
-        if filename.endswith('.py') and not filename.startswith('__'):
-            try:
-                await bot.load_extension(f'cogs.{filename[:-3]}')
-                logger.info(f"Loaded cog: {filename}")
-            except Exception as e:
-                logger.error(f"Failed to load cog {filename}: {e}")
-                traceback.print_exc()
-
-    # Load the credits system cog
-    try:
-        await bot.load_extension('credits_system.cog')
-        logger.info("Loaded cog: credits_system.cog")
-    except Exception as e:
-        logger.error(f"Failed to load cog credits_system.cog: {e}")
-        traceback.print_exc()
+    """
+    Loads the credits system cog, then every cog in the 'cogs' directory.
+
+    Credits comes first so other cogs can look it up in cog_load. Cogs named in
+    LAZY_COGS get placeholder commands instead and are imported on first use,
+    unless they listen for events or run background tasks.
+    """
+    extensions = ['credits_system.cog'] + [
+        f'cogs.{filename[:-3]}' for filename in sorted(os.listdir('./cogs'))
+        if filename.endswith('.py') and not filename.startswith('__')
+    ]
+    for extension in extensions:
+        if 'all' in LAZY_COGS or extension in LAZY_COGS:
+            manifest = scan_extension(extension)
+            if manifest.lazy_safe:
+                await lazy_cogs.defer(manifest)
+                logger.info(f"Deferred cog: {extension} ({len(manifest.commands)} commands)")
+                continue
+            logger.info(f"Loading {extension} at startup: it {manifest.reason}")
+        try:
+            timing = await startup_profiler.load_extension(bot, extension)
+            logger.info(f"Loaded cog: {extension} in {timing.import_ms + timing.setup_ms:.0f} ms")
+        except Exception as e:
+            logger.error(f"Failed to load cog {extension}: {e}")
+            traceback.print_exc()
+    startup_profiler.mark("cogs loaded")
 
 @bot.event
 async def on_ready():
     logger.info(f'{bot.user} has connected to Discord!')
+    if "ready" not in startup_profiler.marks:
+        logger.info(f"Ready {startup_profiler.mark('ready'):.2f}s after process start")
+        if STARTUP_PROFILE:
+            startup_profiler.uninstall()
+            startup_profiler.report(logger)
     
     # Initialize Discord error handler async components
     await discord_error_handler.initialize_async()
@@ -82,6 +153,8 @@ async def on_ready():
         if len(guild_names) > 100:
             guild_names = guild_names[:97] + '...'
         logger.info(f"Connected to {guild_count} guild(s): {guild_names}")
+    log_shard_summary(bot, logger)
+    log_member_cache(bot, logger)
 
     # Generate invite link with explicit permissions
     invite_link = discord.utils.oauth_url(
@@ -99,14 +172,46 @@ async def on_ready():
 
 @bot.event
 async def on_message(message):
-    if message.author == bot.user:
-        return
+    """
+    Fast path for command dispatch.
 
-    # Check if the message starts with the command prefix before logging
-    if message.content.startswith(COMMAND_PREFIX):
-        logger.info(f"Command received: {message.content} from {message.author} in channel {message.channel.name}")
+    Most messages aren't commands, so they are rejected with a prefix check before
+    anything else. A prefixed message is only parsed into a Context (in
+    process_commands) once its first word matches a registered command name or
+    alias in bot.all_commands, which discord.py keeps current across cog loads,
+    reloads and lazy placeholders.
+    """
+    content = message.content
+    if not content.startswith(COMMAND_PREFIX) or message.author.bot:
+        return
+    invoked = content[PREFIX_LENGTH:].split(maxsplit=1)
+    if not invoked or content[PREFIX_LENGTH].isspace():
+        return
+    command = bot.all_commands.get(invoked[0])
+    if command is None:
+        return
 
+    # Arguments are ids and plain strings, so the queued record is formatted off the event loop
+    logger.info(
+        "Command received: command=%s user=%s user_id=%s channel_id=%s guild_id=%s",
+        invoked[0], message.author.name, message.author.id, message.channel.id, message.guild.id if message.guild else None
+    )
+    start = time.perf_counter()
     await bot.process_commands(message)
+    COMMANDS.inc(command.name)
+    COMMAND_DURATION.observe(time.perf_counter() - start, command.name)
+
+@bot.event
+async def on_command_completion(ctx: Context):
+    health.command_completed()
+
+@bot.event
+async def on_shard_ready(shard_id):
+    logger.info(f'Shard {shard_id} is ready')
+
+@bot.event
+async def on_shard_resumed(shard_id):
+    logger.info(f'Shard {shard_id} resumed its session')
 
 @bot.event
 async def on_guild_join(guild):
@@ -121,6 +226,7 @@ async def on_error(event, *args, **kwargs):
 @bot.event
 async def on_command_error(ctx: Context, error: commands.CommandError):
     """Handles errors that occur during command execution."""
+    COMMAND_ERRORS.inc(ctx.command.qualified_name if ctx.command else "", type(getattr(error, 'original', error)).__name__)
     if hasattr(ctx.command, 'on_error'):
         # If the command has its own error handler, let it handle it.
         return
@@ -136,29 +242,61 @@ async def on_command_error(ctx: Context, error: commands.CommandError):
         await ctx.send(f"You're missing a required argument: `{error.param.name}`. Use `!help {ctx.command.name}` for more info.")
     elif isinstance(error, commands.CommandOnCooldown):
         await ctx.send(f"This command is on cooldown. Please try again in {error.retry_after:.2f} seconds.", delete_after=5)
-    elif isinstance(error, commands.MissingPermissions):
+    elif isinstance(error, (commands.MissingPermissions, commands.NotOwner)):
         await ctx.send("You don't have permission to use this command.")
     elif isinstance(error, commands.UserNotFound):
         await ctx.send("Could not find the specified user. Please make sure you @mention them correctly.")
+    elif isinstance(error, commands.CheckFailure):
+        # e.g. the games cog refusing new games while the bot shuts down
+        await ctx.send(str(error))
     else:
         logger.error(f"An unhandled error occurred in command '{ctx.command.name}':")
         traceback.print_exception(type(error), error, error.__traceback__)
         await ctx.send("An error occurred while executing the command.")
 
+async def start_metrics():
+    """Start the metrics endpoint and the probes behind it, if METRICS_PORT is set"""
+    if METRICS_PORT is None:
+        return None
+    loop_monitor.start()
+    register_bot_metrics(bot, loop_monitor)
+    credits_cog = bot.get_cog("Credits")
+    if credits_cog:
+        credits_cog.db.add_query_listener(observe_db_query)
+    server = MetricsServer(METRICS_HOST, METRICS_PORT, health=health)
+    try:
+        await server.start()
+    except OSError as e:
+        logger.error(f"Could not start the metrics endpoint on {METRICS_HOST}:{METRICS_PORT}: {e}")
+        return None
+    return server
+
 async def main():
+    metrics_server = None
     try:
         async with bot:
+            startup_profiler.mark("imports done")
             await load_cogs()
+            health.start()
+            if LOOP_STALL_THRESHOLD:
+                loop_monitor.start()
+            metrics_server = await start_metrics()
+            shutdown.install()
             await bot.start(TOKEN)
+            await shutdown.wait()
     except KeyboardInterrupt:
         logger.info("KeyboardInterrupt received, shutting down.")
     finally:
+        health.stop()
+        loop_monitor.stop()
+        if metrics_server:
+            await metrics_server.stop()
         if bot.is_closed() is False:
             await bot.close()
             logger.info("Bot connection closed.")
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run(main(), EVENT_LOOP)
     except (KeyboardInterrupt, SystemExit):
         logger.info("Bot shutdown complete.")
\ No newline at end of file
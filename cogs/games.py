@@ -3,11 +3,13 @@ from discord import ui
 from discord.ext import commands
 import secrets
 import logging
+import time
 import asyncio
-from typing import Optional, Union
+import weakref
+from collections import Counter
+from typing import Optional, Union, Dict
 from credits_system.cog import CreditsCog # Import CreditsCog
-import datetime
-import pytz # Import pytz for timezone awareness
+from credits_system.rewards import PeriodRewardTracker
 
 logger = logging.getLogger('discord_bot')
 
@@ -93,6 +95,11 @@ EIGHT_BALL_RESPONSES = [
     "Reply hazy, try again.", "Ask again later.", "Better not tell you now.", "Cannot predict now.", "Concentrate and ask again.",
     "Don't count on it.", "My reply is no.", "My sources say no.", "Outlook not so good.", "Very doubtful.",
 ]
+# Escrow hold lifetimes (seconds). Holds outlive their views so a late settlement still finds them,
+# and expire on their own if the bot restarts mid-game.
+RFI_CHALLENGE_HOLD_TTL = 240  # Challenge view times out after 180s
+SLOTS_HOLD_TTL = 120
+
 # Slot Machine Constants
 SLOT_EMOJIS = ["🍒", "🍋", "🍊", "🍇", "🍉", "⭐"] # Star is the wildcard
 SLOT_ANIMATION_FRAMES = ["|", "/", "-", "\\"] # Simple animation frames
@@ -137,6 +144,17 @@ SLOT_PAYOUTS = {
 # 2. UI VIEWS & HELPER CLASSES
 # =====================================================================================================================
 
+# Every game view created, for counting active games; views drop out once garbage collected
+active_game_views: "weakref.WeakSet[ui.View]" = weakref.WeakSet()
+
+class GameView(ui.View):
+    """Base class for the game views below; registers each one in active_game_views."""
+    accepted = False  # Challenge views set this once accepted, so shutdown no longer calls them off
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        active_game_views.add(self)
+
 # --- Tic-Tac-Toe Classes ---
 class TicTacToeButton(ui.Button['TicTacToeGameView']):
     """A button on the Tic-Tac-Toe game board."""
@@ -193,7 +211,7 @@ class TicTacToeButton(ui.Button['TicTacToeGameView']):
             await asyncio.sleep(1)
             await view.bot_move()
 
-class TicTacToeGameView(ui.View):
+class TicTacToeGameView(GameView):
     """A view for the Tic-Tac-Toe game, managing the board and player turns."""
     children: list[TicTacToeButton]
     X = -1
@@ -303,7 +321,7 @@ class TicTacToeGameView(ui.View):
         if self.message:
             await self.message.edit(content=content, view=self)
 
-class TicTacToeChallengeView(ui.View):
+class TicTacToeChallengeView(GameView):
     """A view for the Tic-Tac-Toe challenge, with accept and deny buttons."""
     def __init__(self, challenger: discord.Member, challenged: Union[discord.Member, discord.ClientUser]):
         """
@@ -342,6 +360,7 @@ class TicTacToeChallengeView(ui.View):
         if not self.challenged.bot and interaction.user.id != self.challenged.id:
             await interaction.response.send_message("Only the challenged user can accept this challenge.", ephemeral=True)
             return
+        self.accepted = True
         logger.info(f'{self.challenged.name} accepted TicTacToe challenge from {self.challenger.name}')
         game_view = TicTacToeGameView(self.challenger, self.challenged)
         starting_player = game_view.challenger if game_view.current_player == game_view.X else game_view.challenged
@@ -372,7 +391,7 @@ It is now {starting_player.mention}'s turn.""",
             self.stop()
 
 # --- Rock, Paper, Scissors Classes ---
-class RPSGameView(ui.View):
+class RPSGameView(GameView):
     """A view for the Rock, Paper, Scissors game."""
     def __init__(self, challenger: discord.Member, challenged: discord.Member):
         """
@@ -488,7 +507,7 @@ class RPSGameView(ui.View):
         """Callback for the scissors button."""
         await self._process_choice(interaction, "Scissors")
 
-class RPSChallengeView(ui.View):
+class RPSChallengeView(GameView):
     """A view for the Rock, Paper, Scissors challenge, with accept and deny buttons."""
     def __init__(self, challenger: discord.Member, challenged: discord.Member):
         """
@@ -524,6 +543,7 @@ class RPSChallengeView(ui.View):
         if interaction.user.id != self.challenged.id:
             await interaction.response.send_message("Only the challenged user can accept this challenge.", ephemeral=True)
             return
+        self.accepted = True
         logger.info(f'{self.challenged.name} accepted RPS challenge from {self.challenger.name}')
         game_view = RPSGameView(self.challenger, self.challenged)
         await interaction.response.edit_message(
@@ -553,9 +573,9 @@ Make your choice!""",
             self.stop()
 
 # --- Roll For Initiative (RFI) Classes ---
-class RFIChallengeView(ui.View):
+class RFIChallengeView(GameView):
     """A view for the Roll for Initiative challenge, with accept and deny buttons."""
-    def __init__(self, challenger: discord.Member, challenged: discord.Member, bet_amount: int = 0, credits_cog: Optional[CreditsCog] = None):
+    def __init__(self, challenger: discord.Member, challenged: discord.Member, bet_amount: int = 0, credits_cog: Optional[CreditsCog] = None, challenger_hold_id: Optional[int] = None):
         """
         Initializes the RFIChallengeView.
 
@@ -564,6 +584,7 @@ class RFIChallengeView(ui.View):
             challenged (discord.Member): The user who was challenged.
             bet_amount (int): The amount of credits being bet.
             credits_cog (Optional[CreditsCog]): The credits cog instance for credit operations.
+            challenger_hold_id (Optional[int]): Escrow hold on the challenger's stake, placed when the challenge was issued.
         """
         super().__init__(timeout=180.0)
         self.challenger = challenger
@@ -571,6 +592,20 @@ class RFIChallengeView(ui.View):
         self.message = None
         self.bet_amount = bet_amount
         self.credits_cog = credits_cog
+        self.challenger_hold_id = challenger_hold_id
+        self.challenged_hold_id: Optional[int] = None
+
+    async def _release_holds(self):
+        """Returns any escrowed stakes to the players."""
+        if not self.credits_cog:
+            return
+        # Forget the holds before awaiting, so a concurrent caller can't release them twice
+        hold_ids = (self.challenger_hold_id, self.challenged_hold_id)
+        self.challenger_hold_id = None
+        self.challenged_hold_id = None
+        for hold_id in hold_ids:
+            if hold_id is not None:
+                await self.credits_cog.release_hold(hold_id)
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         """
@@ -590,6 +625,7 @@ class RFIChallengeView(ui.View):
 
     async def on_timeout(self):
         """Handles the view timing out."""
+        await self._release_holds()
         if self.message:
             bet_message = ""
             if self.bet_amount > 0:
@@ -603,6 +639,19 @@ class RFIChallengeView(ui.View):
             await interaction.response.send_message("Only the challenged user can accept this challenge.", ephemeral=True)
             return
         
+        # From here on the holds belong to the settlement below, not on_timeout()
+        self.accepted = True
+
+        # Escrow the challenged player's stake before anything is rolled
+        if self.bet_amount > 0 and self.credits_cog:
+            self.challenged_hold_id = await self.credits_cog.hold_credits(
+                str(self.challenged.id), str(interaction.guild_id), self.bet_amount, RFI_CHALLENGE_HOLD_TTL, "rfi_challenge"
+            )
+            if self.challenged_hold_id is None:
+                self.accepted = False  # Still open; the challenge can be accepted later or time out
+                await interaction.response.send_message(f"You do not have enough available credits to accept a bet of {self.bet_amount}.", ephemeral=True)
+                return
+
         logger.info(f'{self.challenged.name} accepted RFI challenge from {self.challenger.name}')
         
         # Initial response to update the message, then send results
@@ -638,13 +687,18 @@ class RFIChallengeView(ui.View):
             if winner and loser: # If there was a clear winner/loser
                 winner_id = str(winner.id)
                 loser_id = str(loser.id)
-                guild_id = str(channel.guild.id) # Guild context from the channel interaction
-
-                # Perform the transfer
-                subtract_success = self.credits_cog.subtract_credits(loser_id, guild_id, self.bet_amount, "rfi_bet_loss")
-                add_success = self.credits_cog.add_credits(winner_id, guild_id, self.bet_amount, "rfi_bet_win")
-
-                if subtract_success and add_success:
+                loser_hold_id = self.challenger_hold_id if loser == self.challenger else self.challenged_hold_id
+                winner_hold_id = self.challenged_hold_id if loser == self.challenger else self.challenger_hold_id
+
+                # Pay the loser's escrowed stake to the winner in one transaction and free the winner's stake.
+                # The key derived from the challenge message makes a retried settlement a no-op.
+                settlement_key = f"rfi_challenge:{interaction.message.id}"
+                self.challenger_hold_id = None
+                self.challenged_hold_id = None
+                transfer_success = await self.credits_cog.capture_hold(loser_hold_id, "rfi_bet_loss", winner_id, "rfi_bet_win", settlement_key)
+                await self.credits_cog.release_hold(winner_hold_id)
+
+                if transfer_success:
                     result_message += f"💰 {winner.mention} won {self.bet_amount} credits from {loser.mention}!"
                 else:
                     # This case should ideally not happen if initial credit check passed,
@@ -652,6 +706,7 @@ class RFIChallengeView(ui.View):
                     logger.error(f"Failed to transfer RFI bet credits. Winner: {winner_id}, Loser: {loser_id}, Amount: {self.bet_amount}")
                     result_message += f"\n❌ An error occurred during credit transfer for the bet."
             else: # It was a tie, return credits
+                await self._release_holds()
                 result_message += f"🤝 It's a tie! Bet of {self.bet_amount} credits returned to both players."
 
         await channel.send(result_message)
@@ -660,6 +715,8 @@ class RFIChallengeView(ui.View):
     @ui.button(label="Deny", style=discord.ButtonStyle.red)
     async def deny(self, interaction: discord.Interaction, button: ui.Button):
         """Callback for the deny button."""
+        if interaction.user.id in (self.challenger.id, self.challenged.id):
+            await self._release_holds()
         if interaction.user.id == self.challenger.id:
             logger.info(f'{self.challenger.name} cancelled the RFI challenge to {self.challenged.name}')
             await interaction.response.edit_message(
@@ -675,7 +732,7 @@ class RFIChallengeView(ui.View):
             )
             self.stop()
 
-class SaveRollView(ui.View):
+class SaveRollView(GameView):
     """A view that allows a user to roll to save themselves from a critical failure."""
     def __init__(self, user: discord.Member):
         """
@@ -721,7 +778,7 @@ class SaveRollView(ui.View):
         self.stop()
 
 # --- Coinflip Challenge Classes ---
-class CoinflipGameView(ui.View):
+class CoinflipGameView(GameView):
     def __init__(self, challenger: discord.Member, challenged: discord.Member, bet_amount: int, credits_cog: Optional[CreditsCog] = None):
         super().__init__(timeout=180.0)
         self.challenger = challenger
@@ -769,7 +826,7 @@ class CoinflipGameView(ui.View):
             if self.credits_cog and self.bet_amount > 0:
                 user_id = str(self.challenged.id)
                 guild_id = str(interaction.guild_id)
-                credits_success = self.credits_cog.add_credits(user_id, guild_id, self.bet_amount, "coinflip_win")
+                credits_success = await self.credits_cog.add_credits(user_id, guild_id, self.bet_amount, "coinflip_win", f"coinflip:{interaction.message.id}:win")
                 if credits_success:
                     result_message += f"💰 {self.challenged.mention} won {self.bet_amount} credits!"
                 else:
@@ -783,7 +840,7 @@ class CoinflipGameView(ui.View):
         self.stop()
 
 
-class CoinflipChallengeView(ui.View):
+class CoinflipChallengeView(GameView):
     def __init__(self, challenger: discord.Member, challenged: discord.Member, bet_amount: int, credits_cog: Optional[CreditsCog] = None):
         super().__init__(timeout=180.0)
         self.challenger = challenger
@@ -804,6 +861,7 @@ class CoinflipChallengeView(ui.View):
 
     @ui.button(label="Accept", style=discord.ButtonStyle.green)
     async def accept(self, interaction: discord.Interaction, button: ui.Button):
+        self.accepted = True
         logger.info(f'{self.challenged.name} accepted Coinflip challenge from {self.challenger.name}')
         game_view = CoinflipGameView(self.challenger, self.challenged, self.bet_amount, self.credits_cog)
         
@@ -828,6 +886,9 @@ class CoinflipChallengeView(ui.View):
         )
         self.stop()
 
+# Views waiting for the challenged user to accept; nothing has been played yet, so shutdown calls them off first
+CHALLENGE_VIEWS = (TicTacToeChallengeView, RPSChallengeView, RFIChallengeView, CoinflipChallengeView)
+
 # =====================================================================================================================
 # 3. MAIN COG CLASS
 # =====================================================================================================================
@@ -836,21 +897,101 @@ class Games(commands.Cog):
     """A cog for game-related commands."""
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.credits_cog: Optional[CreditsCog] = None # Initialize credits_cog
-        self.last_rfi_reward_time = {} # {user_id: datetime.datetime}
+        self.rfi_rewards: Optional[PeriodRewardTracker] = None # Once-per-day RFI roll rewards, set once credits are available
         self.slots_lock = asyncio.Lock()
-        self.active_slots_users: set[str] = set()  # user_id strings with active slots
-        self.active_slots_count = 0  # total active slots games across all users
+        self.active_slots_users: set[str] = set()  # user_id strings with active slots, at most one game each
+        self.closing = False  # Set by drain() on shutdown; new game commands are refused from then on
         logger.info("Games cog initialized")
-    
-    @commands.Cog.listener()
-    async def on_ready(self):
-        """Called when the bot is fully ready and all cogs are loaded."""
-        self.credits_cog = self.bot.get_cog("Credits")
+
+    @property
+    def credits_cog(self) -> Optional[CreditsCog]:
+        """The credits cog, looked up on use so a reloaded credits cog is picked up"""
+        return self.bot.get_cog("Credits")
+
+    async def cog_load(self):
+        """Called when the cog is added. The credits cog is loaded first (see load_cogs in bot.py)."""
         if self.credits_cog:
+            if self.rfi_rewards is None:
+                self.rfi_rewards = PeriodRewardTracker(self.credits_cog.db, "rfi")
             logger.info("CreditsCog successfully retrieved in Games cog.")
         else:
             logger.warning("CreditsCog not found. Credit rewards for RFI will be unavailable.")
+
+    def active_game_counts(self) -> Dict[str, int]:
+        """Running games by kind: slots spins, plus unfinished game views by view class"""
+        counts = Counter(type(view).__name__ for view in list(active_game_views) if not view.is_finished())
+        counts['slots'] = len(self.active_slots_users)
+        return dict(counts)
+
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        if self.closing:
+            raise commands.CheckFailure("🔧 The bot is restarting, so new games are paused. Try again in a minute!")
+        return True
+
+    @staticmethod
+    def _open_views() -> list:
+        return [view for view in list(active_game_views) if not view.is_finished()]
+
+    @staticmethod
+    async def _end_view(view: ui.View):
+        """Finish a view the way its timeout would, returning any escrowed stakes"""
+        view.stop()  # No more button presses from here on
+        if getattr(view, 'accepted', False):
+            return  # Its accept callback is still running and settles the stakes itself
+        try:
+            await view.on_timeout()
+        except Exception as e:
+            logger.error(f"Error ending {type(view).__name__} on shutdown: {e}")
+
+    async def drain(self, timeout: float):
+        """
+        Let running games settle before a shutdown (called by utils.shutdown.GracefulShutdown).
+
+        New game commands are refused from now on. Challenges nobody has accepted yet are
+        called off right away through their timeout handler, which returns escrowed
+        stakes. Games in progress, challenges being accepted and slots spins get until
+        `timeout` to finish; views still open after that are timed out the same way,
+        except accepted challenges, which are only stopped.
+        """
+        self.closing = True
+        challenges = [view for view in self._open_views() if isinstance(view, CHALLENGE_VIEWS) and not getattr(view, 'accepted', False)]
+        for view in challenges:
+            await self._end_view(view)
+
+        deadline = time.monotonic() + timeout
+        while (self.active_slots_users or self._open_views()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+
+        leftover = self._open_views()
+        for view in leftover:
+            await self._end_view(view)
+        if self.active_slots_users:
+            # Their bets stay escrowed and come back when the holds expire
+            logger.warning(f"{len(self.active_slots_users)} slots spin(s) still running at shutdown")
+        logger.info(f"Games drained: {len(challenges)} open challenge(s) called off, {len(leftover)} game(s) cut short")
+
+    def export_state(self) -> dict:
+        """
+        State handed to the new Games cog on !reload.
+
+        The slots lock and reservation set are shared rather than copied: slots games
+        already spinning finish on the old cog and release their reservation in the
+        same set the new cog checks. Challenge views keep running on their own.
+        """
+        return {
+            'slots_lock': self.slots_lock,
+            'active_slots_users': self.active_slots_users,
+            'rfi_rewards': self.rfi_rewards,
+            'game_views': list(active_game_views),
+        }
+
+    def import_state(self, state: dict):
+        """Adopt the state exported by the Games cog this one replaces"""
+        self.slots_lock = state['slots_lock']
+        self.active_slots_users = state['active_slots_users']
+        self.rfi_rewards = state['rfi_rewards'] or self.rfi_rewards
+        for view in state.get('game_views', []):
+            active_game_views.add(view)
     
     @commands.command(name='roll', help="Rolls dice and returns the results and their sum. Defaults to '2d6'. Example: !roll 3d8")
     async def roll(self, ctx: commands.Context, dice: str = '2d6'):
@@ -917,34 +1058,16 @@ Total: {sum(results)}""")
             f'{ctx.author.display_name} {secrets.choice(response_list)}\n'
         )
 
-        # Award credits if applicable
-        if self.credits_cog and credits_awarded > 0:
+        # Award credits if applicable (once per user per server per day)
+        if self.credits_cog and self.rfi_rewards and credits_awarded > 0:
             user_id = str(ctx.author.id)
             server_id = str(ctx.guild.id)
-            
-            # Define the timezone for GMT-7 (America/Denver)
-            try:
-                denver_tz = pytz.timezone('America/Denver') 
-            except pytz.exceptions.UnknownTimeZoneError:
-                logger.error("America/Denver timezone not found. Using UTC as fallback for RFI reward reset.")
-                denver_tz = pytz.utc
-            
-            now_local_tz = datetime.datetime.now(denver_tz)
-            today_local_tz = now_local_tz.date() # Get just the date part
 
-            last_reward_date = self.last_rfi_reward_time.get(user_id)
-            
-            # Check if credits have already been awarded today (local timezone)
-            if last_reward_date and last_reward_date == today_local_tz:
-                # Credits already awarded today, do not add credit message
-                pass 
-            else:
-                # Credits not yet awarded today, proceed to award
-                credits_success = self.credits_cog.add_credits(user_id, server_id, credits_awarded, reason)
-                if credits_success:
+            if not await self.rfi_rewards.has_claimed(user_id, server_id):
+                if await self.rfi_rewards.claim(user_id, server_id, credits_awarded, reason, f"rfi_roll:{ctx.message.id}"):
                     message += f"💰 You earned {credits_awarded} credits!"
-                    self.last_rfi_reward_time[user_id] = today_local_tz # Store only the date
-                else:
+                elif not await self.rfi_rewards.has_claimed(user_id, server_id):
+                    # Only a real failure is reported; losing a race with another roll is not one
                     message += "❌ Failed to award credits."
 
         # Handle the special case for critical failure, otherwise send normally
@@ -974,6 +1097,7 @@ Total: {sum(results)}""")
             return
 
         bet_amount = 0
+        challenger_hold_id = None
         if bet is not None:
             if bet <= 0:
                 await ctx.send("Bet amount must be a positive number.", ephemeral=True)
@@ -984,19 +1108,22 @@ Total: {sum(results)}""")
                 await ctx.send("Credit system is not available, cannot place bets.", ephemeral=True)
                 return
 
-            challenger_credits = self.credits_cog.get_credits(str(challenger.id), str(ctx.guild.id))
-            if challenger_credits is None or challenger_credits < bet_amount:
-                await ctx.send(f"{challenger.mention}, you do not have enough credits to bet {bet_amount}. Your current balance: {challenger_credits if challenger_credits is not None else 0}.", ephemeral=True)
+            # Reserve the challenger's stake now so it can't be bet twice while the challenge is open
+            challenger_hold_id = await self.credits_cog.hold_credits(str(challenger.id), str(ctx.guild.id), bet_amount, RFI_CHALLENGE_HOLD_TTL, "rfi_challenge")
+            if challenger_hold_id is None:
+                challenger_credits = await self.credits_cog.get_available_credits(str(challenger.id), str(ctx.guild.id))
+                await ctx.send(f"{challenger.mention}, you do not have enough credits to bet {bet_amount}. Your available balance: {challenger_credits if challenger_credits is not None else 0}.", ephemeral=True)
                 return
 
-            challenged_credits = self.credits_cog.get_credits(str(user.id), str(ctx.guild.id))
+            challenged_credits = await self.credits_cog.get_available_credits(str(user.id), str(ctx.guild.id))
             if challenged_credits is None or challenged_credits < bet_amount:
+                await self.credits_cog.release_hold(challenger_hold_id)
                 await ctx.send(f"{user.mention} does not have enough credits to accept a bet of {bet_amount}.", ephemeral=True)
                 return
 
         logger.info(f'RFI challenge command used by {challenger.name} to challenge {user.name} with bet: {bet_amount}')
 
-        challenge_view = RFIChallengeView(challenger, user, bet_amount, self.credits_cog)
+        challenge_view = RFIChallengeView(challenger, user, bet_amount, self.credits_cog, challenger_hold_id)
         challenge_message_content = f"{user.mention}, you have been challenged by {challenger.mention} to a Roll for Initiative!"
         if bet_amount > 0:
             challenge_message_content += f" The stakes are {bet_amount} credits!"
@@ -1164,10 +1291,10 @@ It is now {starting_player.mention}'s turn.""",
         
         user_id = str(player.id)
         guild_id = str(ctx.guild.id)
-        current_credits = self.credits_cog.get_credits(user_id, guild_id)
+        current_credits = await self.credits_cog.get_available_credits(user_id, guild_id)
 
         if current_credits is None or current_credits < bet:
-            await ctx.send(f"{player.mention}, you do not have enough credits to bet {bet}. Your current balance: {current_credits if current_credits is not None else 0}.", ephemeral=True)
+            await ctx.send(f"{player.mention}, you do not have enough credits to bet {bet}. Your available balance: {current_credits if current_credits is not None else 0}.", ephemeral=True)
             return
 
         # Concurrency checks: allow one slots game per user and up to 2 total concurrently
@@ -1176,21 +1303,20 @@ It is now {starting_player.mention}'s turn.""",
             if user_id_str in self.active_slots_users:
                 await ctx.send(f"{player.mention}, you already have a slots game running.", ephemeral=True)
                 return
-            if self.active_slots_count >= 2:
+            if len(self.active_slots_users) >= 2:
                 await ctx.send("There are already 2 slots games running. Please wait.", ephemeral=True)
                 return
             # Reserve a slot for this user
             self.active_slots_users.add(user_id_str)
-            self.active_slots_count += 1
 
         logger.info(f'Slots game reserved for {player.name} with a bet of {bet} credits.')
 
-        # Deduct bet (if this fails, release the reservation)
-        if not self.credits_cog.subtract_credits(user_id, guild_id, bet, "slot_machine_bet"):
+        # Escrow the bet until the reels settle (if this fails, release the reservation).
+        # The hold expires on its own if the bot goes down mid-spin.
+        bet_hold_id = await self.credits_cog.hold_credits(user_id, guild_id, bet, SLOTS_HOLD_TTL, "slots")
+        if bet_hold_id is None:
             async with self.slots_lock:
                 self.active_slots_users.discard(user_id_str)
-                if self.active_slots_count > 0:
-                    self.active_slots_count -= 1
             await ctx.send(f"{player.mention}, you do not have enough credits to place a bet of {bet}.")
             return
         
@@ -1248,20 +1374,29 @@ It is now {starting_player.mention}'s turn.""",
             result_message = initial_message_content + "\n"
             result_message += f"**{_get_reels_display(final_reels)}**\n\n"
 
-            if multiplier > 0:
+            # Settle the escrowed bet; winnings are only paid out against a captured bet
+            bet_captured = await self.credits_cog.capture_hold(bet_hold_id, "slot_machine_bet", idempotency_key=f"slots:{ctx.message.id}:bet")
+            if bet_captured:
+                bet_hold_id = None
+
+            if not bet_captured:
+                result_message += f"⚠️ {player.mention}, your bet could not be settled and has been returned."
+            elif multiplier > 0:
                 winnings = int(bet * multiplier)
-                self.credits_cog.add_credits(user_id, guild_id, winnings, "slot_machine_win")
+                await self.credits_cog.add_credits(user_id, guild_id, winnings, "slot_machine_win", f"slots:{ctx.message.id}:win")
                 result_message += f"🎉 **{player.mention} wins {winnings} credits!** (Multiplier: {multiplier:.1f}x)"
             else:
                 result_message += f"😔 {player.mention} didn't win this time. Better luck next spin!"
 
             await message.edit(content=result_message)
         finally:
+            # Refund the bet if the spin didn't complete
+            if bet_hold_id is not None:
+                await self.credits_cog.release_hold(bet_hold_id)
+
             # Release reservation for this user's slots game
             async with self.slots_lock:
                 self.active_slots_users.discard(user_id_str)
-                if self.active_slots_count > 0:
-                    self.active_slots_count -= 1
 
 # =====================================================================================================================
 # 4. SETUP FUNCTION
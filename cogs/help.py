@@ -9,7 +9,10 @@ class CustomHelpCommand(commands.HelpCommand):
 
     def get_command_signature(self, command):
         """Generates a clean command usage string."""
-        
+        if command.usage:
+            # Explicit usage, e.g. from a lazily loaded cog's placeholder command
+            return f'{self.context.clean_prefix}{command.qualified_name} {command.usage}'.strip()
+
         params = []
         # Iterate through the command's parameters, excluding self and ctx
         for name, param in command.clean_params.items():
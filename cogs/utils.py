@@ -1,10 +1,11 @@
 import discord
 from discord.ext import commands, tasks
 import logging
-import requests
 import datetime
 import os
 from utils.logger import clean_old_logs
+from utils.hot_reload import resolve_extension, reload_extension
+from utils.member_cache import member_cache_summary
 
 logger = logging.getLogger('discord_bot')
 
@@ -43,11 +44,52 @@ class Utils(commands.Cog):
         latency = round(self.bot.latency * 1000)
         await ctx.send(f'Pong! Latency: {latency}ms 🌐')
 
+    @commands.command(name='reload', hidden=True, help="Reloads a cog's code without restarting the bot, keeping its state. Example: !reload games")
+    @commands.is_owner()
+    async def reload(self, ctx: commands.Context, cog: str):
+        """Reloads an extension in place, handing its cogs' state over to the new code."""
+        logger.info(f'Reload command used by {ctx.author} for {cog}')
+        extension = resolve_extension(self.bot, cog)
+        if extension is None:
+            await ctx.send(f"No loaded cog matches `{cog}`. Loaded: {', '.join(f'`{name}`' for name in self.bot.extensions)}")
+            return
+        lazy = getattr(self.bot, 'lazy_cogs', None)
+        if lazy and extension in lazy.pending:
+            await ctx.send(f"`{extension}` hasn't been loaded yet; its latest code will load on first use.")
+            return
+
+        result = await reload_extension(self.bot, extension)
+        if result.ok:
+            carried = f" State carried over: {', '.join(result.carried_over)}." if result.carried_over else ""
+            await ctx.send(f"🔄 Reloaded `{extension}` in {result.elapsed_ms:.0f} ms.{carried}")
+        else:
+            await ctx.send(f"❌ Reloading `{extension}` failed; the previous version is still running.\n```{result.error[:1500]}```")
+
+    @commands.command(name='membercache', hidden=True, help="Shows how many members are cached per server.")
+    @commands.is_owner()
+    async def membercache(self, ctx: commands.Context):
+        """Reports cached vs. total members for the servers with the largest caches."""
+        guilds = member_cache_summary(self.bot)
+        cached = sum(g['cached'] for g in guilds)
+        total = sum(g['total'] for g in guilds)
+        lines = [
+            f"`{g['name'][:24]}`: {g['cached']}/{g['total']}{' (chunked)' if g['chunked'] else ''}"
+            for g in guilds[:15]
+        ]
+        embed = discord.Embed(
+            title="Member Cache",
+            description="\n".join(lines) or "No servers.",
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"{cached}/{total} members cached across {len(guilds)} server(s)")
+        await ctx.send(embed=embed)
+
     @commands.command(name='qotd', help='Gets the quote of the day.')
     async def qotd(self, ctx: commands.Context):
         """Gets the quote of the day."""
         logger.info(f'QOTD command used by {ctx.author}')
         try:
+            import requests  # Deferred: only this command needs it, and it is slow to import at startup
             response = requests.get("https://zenquotes.io/api/today")
             response.raise_for_status()
             data = response.json()[0]
@@ -8,3 +8,65 @@ load_dotenv()
 # Bot configuration
 TOKEN = os.getenv('DISCORD_TOKEN')
 COMMAND_PREFIX = '!'
+
+
+# Sharding - see launcher.py for running shard ranges across several processes
+# SHARD_COUNT: total shards across all processes; unset lets Discord pick when AUTO_SHARD is on
+# SHARD_IDS: shards this process runs, e.g. "0-3" or "0,2"; unset runs all of SHARD_COUNT
+# CLUSTER_ID: label for this process in logs (set by launcher.py)
+AUTO_SHARD = os.getenv('AUTO_SHARD', 'false').lower() == 'true'
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = os.getenv('SHARD_IDS') or None
+CLUSTER_ID = int(os.getenv('CLUSTER_ID', '0'))
+CLUSTER_COUNT = int(os.getenv('CLUSTER_COUNT', '1'))
+
+
+# Startup
+# STARTUP_PROFILE: time every import and cog load, and log a report once the bot is ready
+# LAZY_COGS: extensions to import only when one of their commands is first used, e.g. "cogs.games" or "all"
+#            (cogs with listeners or background tasks are always loaded at startup)
+STARTUP_PROFILE = os.getenv('STARTUP_PROFILE', 'false').lower() == 'true'
+LAZY_COGS = [name.strip() for name in os.getenv('LAZY_COGS', '').split(',') if name.strip()]
+
+
+# Member cache - memory grows with every cached member, so large bots may want less than "all"
+# MEMBER_CACHE: "all" (default), "none", or a comma-separated list of "joined" and "voice"
+# CHUNK_GUILDS_AT_STARTUP: fetch every guild's full member list on connect (needs MEMBER_CACHE to include
+#                          joined members). When off, full lists are fetched only by the commands that need
+#                          them (admin grant/revoke, member reconciliation).
+MEMBER_CACHE = os.getenv('MEMBER_CACHE', 'all').lower()
+CHUNK_GUILDS_AT_STARTUP = os.getenv('CHUNK_GUILDS_AT_STARTUP', 'true').lower() == 'true'
+
+
+# Metrics - Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics; unset METRICS_PORT to disable.
+# Under launcher.py each cluster listens on METRICS_PORT + CLUSTER_ID.
+METRICS_PORT = int(os.getenv('METRICS_PORT')) + CLUSTER_ID if os.getenv('METRICS_PORT') else None
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+
+# Health checks - the bot checks its gateway connection, event loop and database every HEALTH_INTERVAL seconds.
+# HEALTH_FILE: where to write the latest result as JSON for container probes; "{cluster}" is replaced by
+#              CLUSTER_ID so launcher.py clusters don't share a file. The result is also served at
+#              /health and /ready on the metrics endpoint.
+# HEALTH_MAX_LOOP_LAG: seconds a check may run late before the bot counts as unresponsive
+HEALTH_FILE = os.getenv('HEALTH_FILE', '').format(cluster=CLUSTER_ID) or None
+HEALTH_INTERVAL = float(os.getenv('HEALTH_INTERVAL', '15'))
+HEALTH_MAX_LOOP_LAG = float(os.getenv('HEALTH_MAX_LOOP_LAG', '5'))
+
+
+# Event loop monitor - a stall is the event loop stuck in one callback (e.g. a blocking call) for
+# LOOP_STALL_THRESHOLD seconds. Stalls are logged with the blocking code's stack and summarized in the
+# bot-status channel at most once per LOOP_STALL_REPORT_INTERVAL seconds. LOOP_STALL_THRESHOLD=0 disables this.
+LOOP_STALL_THRESHOLD = float(os.getenv('LOOP_STALL_THRESHOLD', '1'))
+LOOP_STALL_REPORT_INTERVAL = float(os.getenv('LOOP_STALL_REPORT_INTERVAL', '300'))
+
+
+# Event loop - "asyncio" (default) or "uvloop"; uvloop falls back to asyncio if it isn't installed.
+# Compare the two on this machine with: python benchmark_loops.py
+EVENT_LOOP = os.getenv('EVENT_LOOP', 'asyncio').lower()
+
+
+# Graceful shutdown - on SIGTERM/SIGINT new games are refused, running games and slots spins get up to
+# SHUTDOWN_GRACE_PERIOD seconds to finish, then pending credits writes are flushed before the bot disconnects.
+# Whatever stops the bot (docker stop, launcher.py, systemd) must wait longer than this before killing it.
+SHUTDOWN_GRACE_PERIOD = float(os.getenv('SHUTDOWN_GRACE_PERIOD', '30'))
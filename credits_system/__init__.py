@@ -6,7 +6,15 @@ A standalone, reusable credits/points system for Discord bots.
 
 from .database import CreditsDatabase
 from .cog import CreditsCog
-from .models import UserCredits, Transaction, ServerInfo, UserInfo
+from .maintenance import DatabaseMaintenance, MaintenanceReport
+from .clock import ResetClock, reset_clock
+from .rewards import PeriodRewardTracker
+from .names import NameResolver
+from .leaderboard_cache import LeaderboardCache
+from .reconcile import GuildReconciler, ReconcileReport
+from .member_events import MemberUpdatePipeline
+from .members import guild_members
+from .models import UserCredits, Transaction, PeriodTotal, GlobalTotal, CreditHold, ServerInfo, UserInfo
 from .config import CreditsConfig, config
 
 __version__ = "1.0.0"
@@ -17,8 +25,22 @@ __license__ = "MIT"
 __all__ = [
     'CreditsDatabase',
     'CreditsCog', 
+    'DatabaseMaintenance',
+    'MaintenanceReport',
+    'ResetClock',
+    'reset_clock',
+    'PeriodRewardTracker',
+    'NameResolver',
+    'LeaderboardCache',
+    'GuildReconciler',
+    'ReconcileReport',
+    'MemberUpdatePipeline',
+    'guild_members',
     'UserCredits',
     'Transaction',
+    'PeriodTotal',
+    'GlobalTotal',
+    'CreditHold',
     'ServerInfo',
     'UserInfo',
     'CreditsConfig',
@@ -0,0 +1,82 @@
+import time
+import datetime
+import logging
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .config import config
+
+
+class ResetClock:
+    """
+    Daily reset boundaries in a fixed timezone.
+
+    The start and end of the current period (local midnight to local midnight) are
+    computed once as integer epoch seconds and recomputed only when the period rolls
+    over, so "has this already happened today?" is two integer comparisons instead of
+    a timezone conversion. Safe to share between threads: the period is swapped as a
+    single tuple.
+    """
+
+    def __init__(self, timezone_name: str):
+        self.logger = logging.getLogger('ResetClock')
+        try:
+            self.tz = ZoneInfo(timezone_name)
+        except ZoneInfoNotFoundError:
+            self.logger.error(f"Timezone {timezone_name!r} not found, using UTC for daily resets")
+            self.tz = ZoneInfo('UTC')
+        self._period: Tuple[int, int, datetime.date] = self._compute_period(time.time())
+
+    def _compute_period(self, now: float) -> Tuple[int, int, datetime.date]:
+        """Return (start, end, local date) of the period containing the epoch time now"""
+        day = datetime.datetime.fromtimestamp(now, self.tz).date()
+        start = datetime.datetime.combine(day, datetime.time(), tzinfo=self.tz)
+        end = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time(), tzinfo=self.tz)
+        return int(start.timestamp()), int(end.timestamp()), day
+
+    def _current(self) -> Tuple[int, int, datetime.date]:
+        period = self._period
+        now = time.time()
+        if now >= period[1] or now < period[0]:
+            period = self._compute_period(now)
+            self._period = period
+        return period
+
+    @property
+    def period_start(self) -> int:
+        """Epoch seconds of the start of the current period"""
+        return self._current()[0]
+
+    @property
+    def period_end(self) -> int:
+        """Epoch seconds of the start of the next period"""
+        return self._current()[1]
+
+    def today(self) -> datetime.date:
+        """The current local date in the reset timezone"""
+        return self._current()[2]
+
+    def seconds_until_reset(self) -> float:
+        return max(0.0, self._current()[1] - time.time())
+
+    def in_current_period(self, timestamp: Optional[float]) -> bool:
+        """True if the epoch time falls in the current period"""
+        if timestamp is None:
+            return False
+        start, end, _ = self._current()
+        return start <= timestamp < end
+
+    def local_day(self, when: Optional[datetime.datetime] = None) -> datetime.date:
+        """Local date in the reset timezone for a UTC time (naive times are treated as UTC), default now"""
+        if when is None:
+            return self.today()
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=datetime.timezone.utc)
+        start, end, day = self._current()
+        if start <= when.timestamp() < end:
+            return day
+        return when.astimezone(self.tz).date()
+
+
+# Shared clock for the configured daily reset timezone
+reset_clock = ResetClock(config.daily_reset_timezone_str)
@@ -1,11 +1,245 @@
 import discord
-from discord.ext import commands
-from typing import Optional, Union
+from discord import ui
+from discord.ext import commands, tasks
+from typing import Optional, Union, List, Tuple, Dict, Any
 from .database import CreditsDatabase
-from .models import UserCredits
+from .maintenance import DatabaseMaintenance
+from .names import NameResolver
+from .leaderboard_cache import LeaderboardCache
+from .reconcile import GuildReconciler
+from .member_events import MemberUpdatePipeline
+from .members import guild_members
+from .models import UserCredits, Transaction
 from .config import config
+from .clock import reset_clock
+import asyncio
 import logging
 import datetime
+import functools
+import time
+import sqlite3
+
+
+class TransactionHistoryView(ui.View):
+    """Button-paginated view over a user's transaction history"""
+
+    def __init__(self, db: CreditsDatabase, author: discord.abc.User, target: discord.abc.User,
+                 server_id: str, transaction_type: Optional[str] = None, page_size: int = 10):
+        """
+        Initialize the history view.
+
+        Args:
+            db: The credits database
+            author: The user who invoked the command (only they can page)
+            target: The user whose history is shown
+            server_id: The server the history belongs to
+            transaction_type: Optional transaction type filter
+            page_size: Transactions per page
+        """
+        super().__init__(timeout=180.0)
+        self.db = db
+        self.author = author
+        self.target = target
+        self.server_id = server_id
+        self.transaction_type = transaction_type
+        self.page_size = page_size
+        self.message: Optional[discord.Message] = None
+        # Keyset cursors of the pages already visited; the last one produced the current page
+        self.cursors: List[Optional[Tuple[datetime.datetime, int]]] = [None]
+        self.page: List[Transaction] = []
+        self.has_next = False
+
+    async def load_page(self, cursor: Optional[Tuple[datetime.datetime, int]]):
+        """Fetch the page that starts after the given cursor"""
+        # Fetch one extra row to know whether a next page exists without a COUNT(*)
+        rows = await self.db.run_read(
+            self.db.get_user_transactions,
+            str(self.target.id), self.server_id, self.page_size + 1,
+            before=cursor, transaction_type=self.transaction_type
+        )
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.previous_page.disabled = len(self.cursors) <= 1
+        self.next_page.disabled = not self.has_next
+
+    def build_embed(self) -> discord.Embed:
+        """Render the current page"""
+        title = f"📜 Transaction History - {self.target.display_name}"
+        if self.transaction_type:
+            title += f" ({self.transaction_type})"
+        embed = discord.Embed(title=title, color=discord.Color.blue())
+
+        lines = []
+        for tx in self.page:
+            timestamp = int(tx.created_at.replace(tzinfo=datetime.timezone.utc).timestamp())
+            lines.append(
+                f"`{tx.amount:+}` 💰 → {tx.new_balance} · {tx.description or tx.transaction_type} · <t:{timestamp}:R>"
+            )
+        embed.description = "\n".join(lines) if lines else "No transactions found."
+        embed.set_footer(text=f"Page {len(self.cursors)}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Only the invoking user can page through the history"""
+        if interaction.user.id != self.author.id:
+            await interaction.response.send_message("This is not your history view.", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        """Remove the buttons when the view times out"""
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+    @ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        """Go back one page"""
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.load_page(self.cursors[-1])
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @ui.button(label="Next", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        """Advance one page, continuing after the last row shown"""
+        if self.has_next and self.page:
+            last = self.page[-1]
+            self.cursors.append((last.created_at, last.transaction_id))
+            await self.load_page(self.cursors[-1])
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+
+class LeaderboardView(ui.View):
+    """Button-paginated view over a server's full leaderboard"""
+
+    def __init__(self, db: CreditsDatabase, names: NameResolver, author: discord.abc.User,
+                 guild: discord.Guild, total: int, page_size: int = 10):
+        """
+        Initialize the leaderboard view.
+
+        Args:
+            db: The credits database
+            names: Name resolver for the entries
+            author: The user who invoked the command (only they can page)
+            guild: The server the leaderboard belongs to
+            total: Number of ranked users, for the page count
+            page_size: Entries per page
+        """
+        super().__init__(timeout=180.0)
+        self.db = db
+        self.names = names
+        self.author = author
+        self.guild = guild
+        self.total = total
+        self.page_size = page_size
+        self.message: Optional[discord.Message] = None
+        # Keyset cursors of the pages already visited; the last one produced the current page
+        self.cursors: List[Optional[Tuple[int, str]]] = [None]
+        self.page: List[UserCredits] = []
+        self.page_names: Dict[str, str] = {}
+        self.has_next = False
+        # Background fetch of the page after the current one: (cursor, task)
+        self.prefetch: Optional[Tuple[Tuple[int, str], asyncio.Task]] = None
+
+    async def fetch_page(self, cursor: Optional[Tuple[int, str]]) -> Tuple[List[UserCredits], Dict[str, str]]:
+        """Fetch the page after the given cursor (plus one extra row) and resolve its names"""
+        # The extra row tells whether a next page exists without a COUNT(*)
+        rows = await self.db.run_read(self.db.get_leaderboard, str(self.guild.id), self.page_size + 1, cursor)
+        names = await self.names.resolve([entry.user_id for entry in rows[:self.page_size]], self.guild)
+        return rows, names
+
+    @staticmethod
+    def _prefetch_done(task: asyncio.Task):
+        """Retrieve the outcome of a prefetch nobody awaited, so a failure isn't reported as unretrieved"""
+        if not task.cancelled() and task.exception() is not None:
+            logging.getLogger('CreditsCog').debug(f"Leaderboard prefetch failed: {task.exception()}")
+
+    def discard_prefetch(self):
+        """Cancel the pending prefetch, if any"""
+        if self.prefetch:
+            self.prefetch[1].cancel()
+            self.prefetch = None
+
+    def start_prefetch(self):
+        """Start loading the next page in the background so Next responds immediately"""
+        self.discard_prefetch()
+        if self.has_next and self.page:
+            cursor = (self.page[-1].credits, self.page[-1].user_id)
+            task = asyncio.create_task(self.fetch_page(cursor))
+            task.add_done_callback(self._prefetch_done)
+            self.prefetch = (cursor, task)
+
+    async def load_page(self, cursor: Optional[Tuple[int, str]]):
+        """Show the page that starts after the given cursor, using the prefetched copy if there is one"""
+        if self.prefetch and self.prefetch[0] == cursor:
+            task = self.prefetch[1]
+            self.prefetch = None
+            try:
+                rows, names = await task
+            except Exception:
+                # A failed prefetch just falls back to a direct fetch
+                rows, names = await self.fetch_page(cursor)
+        else:
+            rows, names = await self.fetch_page(cursor)
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.page_names = names
+        self.previous_page.disabled = len(self.cursors) <= 1
+        self.next_page.disabled = not self.has_next
+        self.start_prefetch()
+
+    def build_embed(self) -> discord.Embed:
+        """Render the current page"""
+        embed = discord.Embed(title=f"🏆 Credits Leaderboard - {self.guild.name}", color=discord.Color.gold())
+        offset = (len(self.cursors) - 1) * self.page_size
+        lines = [
+            f"**{offset + i}.** {self.page_names.get(entry.user_id, f'User {entry.user_id}')} · {entry.credits} 💰"
+            for i, entry in enumerate(self.page, 1)
+        ]
+        embed.description = "\n".join(lines) if lines else "The leaderboard is empty!"
+        pages = max(1, -(-self.total // self.page_size))
+        embed.set_footer(text=f"Page {len(self.cursors)} of {pages} · {self.total} users")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Only the invoking user can page through the leaderboard"""
+        if interaction.user.id != self.author.id:
+            await interaction.response.send_message("This is not your leaderboard view.", ephemeral=True)
+            return False
+        return True
+
+    def stop(self):
+        self.discard_prefetch()
+        super().stop()
+
+    async def on_timeout(self):
+        """Remove the buttons when the view times out"""
+        self.discard_prefetch()
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+    @ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        """Go back one page"""
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.load_page(self.cursors[-1])
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @ui.button(label="Next", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        """Advance one page, continuing after the last entry shown"""
+        if self.has_next and self.page:
+            last = self.page[-1]
+            self.cursors.append((last.credits, last.user_id))
+            await self.load_page(self.cursors[-1])
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
 
 
 class CreditsCog(commands.Cog, name="Credits"):
@@ -21,32 +255,142 @@ class CreditsCog(commands.Cog, name="Credits"):
         """
         self.bot = bot
         self.db = CreditsDatabase(db_path)
+        self.maintenance = DatabaseMaintenance(self.db)
+        self.names = NameResolver(bot, self.db)
+        self.leaderboard_cache = LeaderboardCache()
+        self.db.add_balance_listener(self.leaderboard_cache.on_balance_change)
+        self.reconciler = GuildReconciler(bot, self.db)
+        self.reconcile_task: Optional[asyncio.Task] = None
+        self.member_updates = MemberUpdatePipeline(self.db)
+        self.member_updates.add_flush_listener(self._on_users_renamed)
+        self.member_updates.start()
         self.logger = logging.getLogger('CreditsCog')
+        if config.maintenance_enabled:
+            self.maintenance_task.start()
+        self.hold_sweep_task.start()
+        self.handed_over = False  # Set once export_state() gives the live state to a reloaded cog
+        self.shut_down = False  # Set once shutdown() has flushed and closed the database
 
         # Event listeners will be registered via decorators
         self.logger.info("CreditsCog initialized")
 
     def cog_unload(self):
         """Clean up when cog is unloaded"""
+        self.maintenance_task.cancel()
+        self.hold_sweep_task.cancel()
+        if not self.handed_over and not self.shut_down:
+            if self.reconcile_task:
+                self.reconcile_task.cancel()
+            self.member_updates.stop()
+            self.db.close()
         self.logger.info("CreditsCog unloaded")
 
+    async def shutdown(self):
+        """
+        Flush and close the database after the gateway has closed (called by utils.shutdown.GracefulShutdown).
+
+        Background tasks are stopped first so nothing writes behind the flush: pending
+        username updates are written, the WAL is checkpointed into the main database file
+        and truncated, and the connections are closed.
+        """
+        self.maintenance_task.cancel()
+        self.hold_sweep_task.cancel()
+        if self.reconcile_task:
+            self.reconcile_task.cancel()
+        self.member_updates.stop()
+        try:
+            busy, log_frames, checkpointed = await self.bot.loop.run_in_executor(None, self.maintenance.checkpoint, "TRUNCATE")
+            if busy:
+                self.logger.warning(f"Shutdown checkpoint was blocked, {checkpointed}/{log_frames} WAL frame(s) written back")
+            else:
+                self.logger.info(f"Shutdown checkpoint wrote back {checkpointed} WAL frame(s)")
+        except sqlite3.Error as e:
+            self.logger.error(f"Shutdown checkpoint failed: {e}")
+        self.db.close()
+        self.shut_down = True
+        self.logger.info("CreditsCog shut down")
+
+    def export_state(self) -> Dict[str, Any]:
+        """
+        Hand the live state to the cog that replaces this one on !reload.
+
+        The database (with its connections, read pool and balance listeners), caches,
+        member-update pipeline and any running reconciliation carry over as they are,
+        so games and views started before the reload keep a working database.
+        """
+        self.handed_over = True
+        return {
+            'db': self.db,
+            'maintenance': self.maintenance,
+            'names': self.names,
+            'leaderboard_cache': self.leaderboard_cache,
+            'reconciler': self.reconciler,
+            'reconcile_task': self.reconcile_task,
+            'member_updates': self.member_updates,
+        }
+
+    def import_state(self, state: Dict[str, Any]):
+        """Adopt the state exported by the cog this one replaces, discarding the fresh copies"""
+        if state['db'] is self.db:
+            self.handed_over = False  # The reload never happened; this cog keeps its own state
+            return
+        self.member_updates.stop()
+        self.db.close()
+        self.db = state['db']
+        self.maintenance = state['maintenance']
+        self.names = state['names']
+        self.leaderboard_cache = state['leaderboard_cache']
+        self.reconciler = state['reconciler']
+        self.reconcile_task = state['reconcile_task']
+        self.member_updates = state['member_updates']
+        self.member_updates.flush_listeners = [self._on_users_renamed]
+
+    @tasks.loop(minutes=config.maintenance_interval_minutes)
+    async def maintenance_task(self):
+        """Periodic WAL checkpoint, planner statistics and free-page reclamation"""
+        try:
+            await self.bot.loop.run_in_executor(None, self.maintenance.run)
+        except Exception as e:
+            self.logger.error(f"Database maintenance failed: {e}")
+
+    @maintenance_task.before_loop
+    async def before_maintenance_task(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=config.hold_sweep_interval_seconds)
+    async def hold_sweep_task(self):
+        """Delete expired escrow holds in bulk"""
+        try:
+            swept = await self.db.run_write(self.db.sweep_expired_holds)
+            if swept:
+                self.logger.info(f"Swept {swept} expired credit hold(s)")
+        except Exception as e:
+            self.logger.error(f"Expired hold sweep failed: {e}")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Reconcile the database with every guild's members once per process, in the background"""
+        if config.reconcile_on_startup and self.reconcile_task is None:
+            self.reconcile_task = asyncio.create_task(self.reconciler.run())
+
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         """Handle new members joining and initialize their credits"""
         try:
             # Ensure server is in database
-            self.db.ensure_server_exists(str(member.guild.id), member.guild.name)
+            await self.db.run_write(self.db.ensure_server_exists, str(member.guild.id), member.guild.name)
 
             # Ensure user is in database (discriminator is deprecated)
-            self.db.ensure_user_exists(
+            await self.db.run_write(
+                self.db.ensure_user_exists,
                 str(member.id),
                 member.name,
                 None # Pass None for discriminator as it's deprecated
             )
 
             # Initialize credits if they don't exist
-            if not self.db.user_has_credits(str(member.id), str(member.guild.id)):
-                self.db.initialize_user_credits(str(member.id), str(member.guild.id))
+            if not await self.db.run_read(self.db.user_has_credits, str(member.id), str(member.guild.id)):
+                await self.db.run_write(self.db.initialize_user_credits, str(member.id), str(member.guild.id))
                 self.logger.info(f"Initialized {config.initial_credits} credits for {member.name} in {member.guild.name}")
 
         except Exception as e:
@@ -54,25 +398,28 @@ class CreditsCog(commands.Cog, name="Credits"):
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
-        """Handle username changes (discriminator is deprecated)"""
-        # Check if username or global_name changed (discriminator is deprecated)
-        if before.name != after.name or (hasattr(before, 'global_name') and hasattr(after, 'global_name') and before.global_name != after.global_name):
-            try:
-                self.db.update_user_info(
-                    str(after.id),
-                    after.name,
-                    None # Pass None for discriminator as it's deprecated
-                )
-                self.logger.info(f"Updated user info for {after.id}: {before.name} -> {after.name}")
-            except Exception as e:
-                self.logger.error(f"Error updating user info for {after.id}: {e}")
+        """Queue username changes for a debounced batch write (discriminator is deprecated)"""
+        # Only the username is stored; nickname, role and global_name-only updates are no-ops here
+        if before.name == after.name:
+            if getattr(before, 'global_name', None) != getattr(after, 'global_name', None):
+                self._on_users_renamed([str(after.id)])
+            return
+        self.member_updates.submit(str(after.id), after.name)
+
+    def _on_users_renamed(self, user_ids: List[str]):
+        """Drop cached names and rendered boards for renamed users"""
+        for user_id in user_ids:
+            self.names.forget(user_id)
+            self.leaderboard_cache.invalidate_user(user_id)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild):
         """Handle bot joining new server"""
         try:
-            self.db.ensure_server_exists(str(guild.id), guild.name)
+            await self.db.run_write(self.db.ensure_server_exists, str(guild.id), guild.name)
             self.logger.info(f"Added server to credits database: {guild.name} ({guild.id})")
+            # Register the existing members in the background
+            asyncio.create_task(self.reconciler.reconcile_guild(guild))
         except Exception as e:
             self.logger.error(f"Error adding server {guild.id} to database: {e}")
 
@@ -98,14 +445,142 @@ class CreditsCog(commands.Cog, name="Credits"):
         """Format credit amount with emoji"""
         return f"{amount} 💰"
 
+    def _period_start_day(self, period: str) -> datetime.date:
+        """First local day (in the daily reset timezone) of a leaderboard period"""
+        today = reset_clock.today()
+        if period == "week":
+            return today - datetime.timedelta(days=today.weekday())
+        if period == "month":
+            return today.replace(day=1)
+        return today
+
+    async def _send_period_leaderboard(self, ctx: commands.Context, period: str, game: Optional[str], losers: bool):
+        """Send a leaderboard of net credit change over a period, read from the daily rollups"""
+        try:
+            transaction_types = config.GAME_TRANSACTION_TYPES[game] if game else None
+            entries = await self.db.run_read(
+                self.db.get_period_leaderboard,
+                str(ctx.guild.id),
+                self._period_start_day(period),
+                transaction_types,
+                config.leaderboard_size,
+                losers
+            )
+
+            if not entries:
+                await ctx.send("📊 Nobody has any activity in that period yet!")
+                return
+
+            period_label = {"today": "Today", "week": "This Week", "month": "This Month"}[period]
+            subject = f" at {game.capitalize()}" if game else ""
+            if losers:
+                title = f"📉 Biggest Losers{subject} {period_label} - {ctx.guild.name}"
+                color = discord.Color.dark_red()
+            else:
+                title = f"📈 Top Earners{subject} {period_label} - {ctx.guild.name}"
+                color = discord.Color.gold()
+            embed = discord.Embed(title=title, color=color)
+
+            names = await self.names.resolve([entry.user_id for entry in entries], ctx.guild)
+            for i, entry in enumerate(entries, 1):
+                username = names[entry.user_id]
+                embed.add_field(
+                    name=f"{i}. {username}",
+                    value=f"{entry.net:+} 💰",
+                    inline=False
+                )
+
+            embed.set_footer(text=f"Net credits since {self._period_start_day(period).isoformat()}")
+            await ctx.send(embed=embed)
+
+        except Exception as e:
+            self.logger.error(f"Error in period leaderboard command: {e}")
+            await ctx.send("❌ An error occurred while generating the leaderboard.")
+
+    async def _send_full_leaderboard(self, ctx: commands.Context):
+        """Send the paginated leaderboard of every ranked member"""
+        try:
+            total = await self.db.run_read(self.db.count_ranked_users, str(ctx.guild.id))
+            view = LeaderboardView(self.db, self.names, ctx.author, ctx.guild, total, config.leaderboard_size)
+            await view.load_page(None)
+            view.message = await ctx.send(embed=view.build_embed(), view=view)
+
+        except Exception as e:
+            self.logger.error(f"Error in full leaderboard command: {e}")
+            await ctx.send("❌ An error occurred while generating the leaderboard.")
+
+    async def _send_global_leaderboard(self, ctx: commands.Context):
+        """Send the leaderboard of balances summed across every server"""
+        try:
+            entries = await self.db.run_read(self.db.get_global_leaderboard, config.leaderboard_size)
+
+            if not entries:
+                await ctx.send("📊 The global leaderboard is empty!")
+                return
+
+            embed = discord.Embed(
+                title="🌍 Global Credits Leaderboard",
+                color=discord.Color.gold()
+            )
+
+            names = await self.names.resolve([entry.user_id for entry in entries])
+            for i, entry in enumerate(entries, 1):
+                username = names[entry.user_id]
+                servers = "server" if entry.server_count == 1 else "servers"
+                embed.add_field(
+                    name=f"{i}. {username}",
+                    value=f"{self._format_credits(entry.total_credits)} across {entry.server_count} {servers}",
+                    inline=False
+                )
+
+            embed.set_footer(text="Balances summed across every server the bot is in")
+            await ctx.send(embed=embed)
+
+        except Exception as e:
+            self.logger.error(f"Error in global leaderboard command: {e}")
+            await ctx.send("❌ An error occurred while generating the global leaderboard.")
+
     # Commands
 
 
     @commands.command(name='leaderboard', aliases=['rich', 'lead'])
-    async def leaderboard_command(self, ctx: commands.Context):
-        """Show the credits leaderboard (top 10)"""
+    async def leaderboard_command(self, ctx: commands.Context, *options: str):
+        """Show the credits leaderboard (top 10), every ranked member (`all`), the cross-server `global` ranking, or earnings over today/week/month, optionally per game (e.g. `week slots losers`)"""
+        options = [option.lower() for option in options]
+        if options == ["global"]:
+            await self._send_global_leaderboard(ctx)
+            return
+        if options == ["all"]:
+            await self._send_full_leaderboard(ctx)
+            return
+
+        period = next((o for o in options if o in config.LEADERBOARD_PERIODS), None)
+        game = next((o for o in options if o in config.GAME_TRANSACTION_TYPES), None)
+        losers = any(o in ("losers", "bottom") for o in options)
+        unknown = [o for o in options if o not in config.LEADERBOARD_PERIODS
+                   and o not in config.GAME_TRANSACTION_TYPES and o not in ("losers", "bottom")]
+
+        if unknown:
+            await ctx.send(
+                f"❌ Unknown leaderboard option `{unknown[0]}`. "
+                f"Periods: {', '.join(config.LEADERBOARD_PERIODS)}; "
+                f"games: {', '.join(config.GAME_TRANSACTION_TYPES)}; add `losers` to flip the ranking, "
+                f"or use `global` for the cross-server ranking or `all` to browse every ranked member."
+            )
+            return
+
+        if period or game or losers:
+            await self._send_period_leaderboard(ctx, period or "week", game, losers)
+            return
+
         try:
-            leaderboard = self.db.get_leaderboard(str(ctx.guild.id), 10)
+            cached = self.leaderboard_cache.get(str(ctx.guild.id), "leaderboard")
+            if cached:
+                await ctx.send(**cached)
+                return
+            generation = self.leaderboard_cache.generation(str(ctx.guild.id))
+
+            leaderboard = await self.db.run_read(self.db.get_leaderboard, str(ctx.guild.id), 10)
 
             if not leaderboard:
                 await ctx.send("📊 The leaderboard is empty!")
@@ -116,9 +591,9 @@ class CreditsCog(commands.Cog, name="Credits"):
                 color=discord.Color.gold()
             )
 
+            names = await self.names.resolve([entry.user_id for entry in leaderboard], ctx.guild)
             for i, entry in enumerate(leaderboard, 1):
-                user = self.bot.get_user(int(entry.user_id)) or await self.bot.fetch_user(int(entry.user_id))
-                username = user.display_name if user else f"User {entry.user_id}"
+                username = names[entry.user_id]
                 embed.add_field(
                     name=f"{i}. {username}",
                     value=f"{self._format_credits(entry.credits)}",
@@ -126,6 +601,10 @@ class CreditsCog(commands.Cog, name="Credits"):
                 )
 
             embed.set_footer(text=f"Showing top {len(leaderboard)} users")
+            self.leaderboard_cache.put(
+                str(ctx.guild.id), "leaderboard", {"embed": embed},
+                ((entry.user_id, entry.credits) for entry in leaderboard), limit=10, generation=generation
+            )
             await ctx.send(embed=embed)
 
         except Exception as e:
@@ -136,7 +615,13 @@ class CreditsCog(commands.Cog, name="Credits"):
     async def top_command(self, ctx: commands.Context):
         """Show the top 3 richest users"""
         try:
-            leaderboard = self.db.get_leaderboard(str(ctx.guild.id), 3)
+            cached = self.leaderboard_cache.get(str(ctx.guild.id), "top")
+            if cached:
+                await ctx.send(**cached)
+                return
+            generation = self.leaderboard_cache.generation(str(ctx.guild.id))
+
+            leaderboard = await self.db.run_read(self.db.get_leaderboard, str(ctx.guild.id), 3)
 
             if not leaderboard:
                 await ctx.send("📊 No users on the leaderboard yet!")
@@ -147,15 +632,19 @@ class CreditsCog(commands.Cog, name="Credits"):
                 color=discord.Color.gold()
             )
 
+            names = await self.names.resolve([entry.user_id for entry in leaderboard], ctx.guild)
             for i, entry in enumerate(leaderboard, 1):
-                user = self.bot.get_user(int(entry.user_id)) or await self.bot.fetch_user(int(entry.user_id))
-                username = user.display_name if user else f"User {entry.user_id}"
+                username = names[entry.user_id]
                 embed.add_field(
                     name=f"{i}. {username}",
                     value=f"{self._format_credits(entry.credits)}",
                     inline=False
                 )
 
+            self.leaderboard_cache.put(
+                str(ctx.guild.id), "top", {"embed": embed},
+                ((entry.user_id, entry.credits) for entry in leaderboard), limit=3, generation=generation
+            )
             await ctx.send(embed=embed)
 
         except Exception as e:
@@ -166,14 +655,23 @@ class CreditsCog(commands.Cog, name="Credits"):
     async def bottom_command(self, ctx: commands.Context):
         """Show the user(s) at the very bottom of the credit barrel"""
         try:
-            bottom_users = self.db.get_bottom_users(str(ctx.guild.id))
+            cached = self.leaderboard_cache.get(str(ctx.guild.id), "bottom")
+            if cached:
+                await ctx.send(**cached)
+                return
+            generation = self.leaderboard_cache.generation(str(ctx.guild.id))
+
+            bottom_users = await self.db.run_read(self.db.get_bottom_users, str(ctx.guild.id))
 
             if not bottom_users:
                 await ctx.send("📊 Everyone is equally broke or rich here.")
                 return
 
+            bottom_entries = [(entry.user_id, entry.credits) for entry in bottom_users]
             if len(bottom_users) > 3:
-                await ctx.send("🙄 Look at this bunch of losers! There are so many of you at the absolute bottom that I can't even pick one. Get some jobs!")
+                payload = {"content": "🙄 Look at this bunch of losers! There are so many of you at the absolute bottom that I can't even pick one. Get some jobs!"}
+                self.leaderboard_cache.put(str(ctx.guild.id), "bottom", payload, bottom_entries, ascending=True, generation=generation)
+                await ctx.send(**payload)
                 return
 
             embed = discord.Embed(
@@ -181,9 +679,9 @@ class CreditsCog(commands.Cog, name="Credits"):
                 color=discord.Color.dark_red()
             )
 
+            names = await self.names.resolve([entry.user_id for entry in bottom_users], ctx.guild)
             for i, entry in enumerate(bottom_users, 1):
-                user = self.bot.get_user(int(entry.user_id)) or await self.bot.fetch_user(int(entry.user_id))
-                username = user.display_name if user else f"User {entry.user_id}"
+                username = names[entry.user_id]
                 embed.add_field(
                     name=f"Lowest #{i}: {username}",
                     value=f"{self._format_credits(entry.credits)}",
@@ -191,28 +689,50 @@ class CreditsCog(commands.Cog, name="Credits"):
                 )
 
             embed.set_footer(text="The only way is up... hopefully.")
+            self.leaderboard_cache.put(str(ctx.guild.id), "bottom", {"embed": embed}, bottom_entries, ascending=True, generation=generation)
             await ctx.send(embed=embed)
 
         except Exception as e:
             self.logger.error(f"Error in bottom command: {e}")
             await ctx.send("❌ An error occurred while finding the bottom dwellers.")
 
+    @commands.command(name='history', aliases=['transactions'])
+    async def history_command(self, ctx: commands.Context, user: Optional[discord.Member] = None, transaction_type: Optional[str] = None):
+        """Show your (or another user's) transaction history, optionally filtered by type"""
+        target_user = user or ctx.author
+
+        if transaction_type is not None:
+            transaction_type = transaction_type.lower()
+            if transaction_type not in config.TRANSACTION_TYPES:
+                types = ", ".join(f"`{t}`" for t in config.TRANSACTION_TYPES)
+                await ctx.send(f"❌ Unknown transaction type. Valid types: {types}")
+                return
+
+        try:
+            view = TransactionHistoryView(self.db, ctx.author, target_user, str(ctx.guild.id), transaction_type)
+            await view.load_page(None)
+            view.message = await ctx.send(embed=view.build_embed(), view=view)
+
+        except Exception as e:
+            self.logger.error(f"Error in history command: {e}")
+            await ctx.send("❌ An error occurred while fetching transaction history.")
+
     @commands.command(name='daily')
     @commands.cooldown(1, config.command_cooldown, commands.BucketType.user)
     async def daily_command(self, ctx: commands.Context):
         """Claim your daily credit reward"""
         try:
             # Check if user can claim (to provide better error message)
-            if not self.db.can_claim_daily_reward(str(ctx.author.id), str(ctx.guild.id)):
-                await ctx.send("⏳ You've already claimed your daily reward today! Come back after midnight.")
+            if not await self.db.run_read(self.db.can_claim_daily_reward, str(ctx.author.id), str(ctx.guild.id)):
+                await ctx.send(f"⏳ You've already claimed your daily reward today! The next one is available <t:{reset_clock.period_end}:R>.")
                 return
 
-            success = self.db.claim_daily_reward(str(ctx.author.id), str(ctx.guild.id))
+            success = await self.db.run_write(self.db.claim_daily_reward, str(ctx.author.id), str(ctx.guild.id))
             
             if success:
                 await ctx.send(f"🎁 Daily reward claimed! You received {self._format_credits(config.daily_reward)}.")
             else:
-                await ctx.send("❌ Failed to claim daily reward. Please try again later.")
+                await ctx.send("❌ Failed to claim daily reward, nothing was changed. Please try again later.")
 
         except Exception as e:
             self.logger.error(f"Error in daily command: {e}")
@@ -245,8 +765,9 @@ class CreditsCog(commands.Cog, name="Credits"):
                 await ctx.send("🤖 You can't transfer credits to bots!")
                 return
             
-            # Perform transfer
-            success = self.db.transfer_credits(
+            # Perform transfer; a failed transfer is rolled back as a whole, so retrying it is safe
+            success = await self.db.run_write(
+                self.db.transfer_credits,
                 str(ctx.author.id),
                 str(recipient.id),
                 str(ctx.guild.id),
@@ -257,11 +778,11 @@ class CreditsCog(commands.Cog, name="Credits"):
                 await ctx.send(f"✅ Successfully transferred {self._format_credits(amount)} to {recipient.display_name}!")
             else:
                 # Check sender balance
-                sender_balance = self.db.get_user_credits(str(ctx.author.id), str(ctx.guild.id))
+                sender_balance = await self.db.run_read(self.db.get_user_credits, str(ctx.author.id), str(ctx.guild.id))
                 if sender_balance is not None and sender_balance < amount:
                     await ctx.send(f"❌ You don't have enough credits! You have {self._format_credits(sender_balance)}.")
                 else:
-                    await ctx.send("❌ Transfer failed. Please try again later.")
+                    await ctx.send("❌ Transfer failed and no credits were moved. Please try again later.")
 
         except ValueError:
             await ctx.send("❌ Invalid amount. Please enter a valid number.")
@@ -276,11 +797,11 @@ class CreditsCog(commands.Cog, name="Credits"):
             target_user = user or ctx.author
 
             try:
-                credits = self.db.get_user_credits(str(target_user.id), str(ctx.guild.id))
+                credits = await self.db.run_read(self.db.get_user_credits, str(target_user.id), str(ctx.guild.id))
 
                 if credits is None:
                     # Initialize credits if user doesn't have any
-                    self.db.initialize_user_credits(str(target_user.id), str(ctx.guild.id))
+                    await self.db.run_write(self.db.initialize_user_credits, str(target_user.id), str(ctx.guild.id))
                     credits = config.initial_credits
                     await ctx.send(f"🎉 Welcome {target_user.mention}! You've been credited with {self._format_credits(credits)}!")
                 else:
@@ -303,7 +824,10 @@ class CreditsCog(commands.Cog, name="Credits"):
                           "- `!admin add @user amount` - Add credits to a user\n"
                           "- `!admin remove @user amount` - Remove credits from a user\n"
                           "- `!admin set @user amount` - Set a user's credits\n"
+                          "- `!admin grant @role|everyone amount` - Add credits to every member of a role\n"
+                          "- `!admin revoke @role|everyone amount` - Remove credits from every member of a role\n"
                           "- `!admin stats` - Show server statistics\n"
+                          "- `!admin maintenance [run]` - Show or run database maintenance\n"
                           "- `!admin backup` - Create a database backup")
 
     @admin_top_level.command(name='add')
@@ -318,7 +842,8 @@ class CreditsCog(commands.Cog, name="Credits"):
                 await ctx.send("❌ Amount must be positive.")
                 return
             
-            success = self.db.add_credits(
+            success = await self.db.run_write(
+                self.db.add_credits,
                 str(user.id), 
                 str(ctx.guild.id), 
                 amount, 
@@ -348,7 +873,8 @@ class CreditsCog(commands.Cog, name="Credits"):
                 await ctx.send("❌ Amount must be positive.")
                 return
             
-            success = self.db.subtract_credits(
+            success = await self.db.run_write(
+                self.db.subtract_credits,
                 str(user.id), 
                 str(ctx.guild.id), 
                 amount, 
@@ -359,7 +885,7 @@ class CreditsCog(commands.Cog, name="Credits"):
                 await ctx.send(f"✅ Removed {self._format_credits(amount)} from {user.display_name}.")
             else:
                 # Check user balance
-                balance = self.db.get_user_credits(str(user.id), str(ctx.guild.id))
+                balance = await self.db.run_read(self.db.get_user_credits, str(user.id), str(ctx.guild.id))
                 if balance is not None and balance < amount:
                     await ctx.send(f"❌ User doesn't have enough credits! They have {self._format_credits(balance)}.")
                 else:
@@ -384,24 +910,26 @@ class CreditsCog(commands.Cog, name="Credits"):
                 return
             
             # Get current balance
-            current_balance = self.db.get_user_credits(str(user.id), str(ctx.guild.id))
+            current_balance = await self.db.run_read(self.db.get_user_credits, str(user.id), str(ctx.guild.id))
             if current_balance is None:
                 # Initialize if no record exists
-                self.db.initialize_user_credits(str(user.id), str(ctx.guild.id))
+                await self.db.run_write(self.db.initialize_user_credits, str(user.id), str(ctx.guild.id))
                 current_balance = config.initial_credits
             
             # Calculate difference
             difference = amount - current_balance
             
             if difference > 0:
-                success = self.db.add_credits(
+                success = await self.db.run_write(
+                    self.db.add_credits,
                     str(user.id), 
                     str(ctx.guild.id), 
                     difference, 
                     "admin_add"
                 )
             elif difference < 0:
-                success = self.db.subtract_credits(
+                success = await self.db.run_write(
+                    self.db.subtract_credits,
                     str(user.id), 
                     str(ctx.guild.id), 
                     -difference, 
@@ -423,6 +951,82 @@ class CreditsCog(commands.Cog, name="Credits"):
             self.logger.error(f"Error in admin set command: {e}")
             await ctx.send("❌ An error occurred while setting credits.")
 
+    async def _resolve_bulk_targets(self, ctx: commands.Context, target: str) -> Tuple[str, Optional[List[discord.Member]]]:
+        """
+        Resolve a role (or everyone) to a label and its non-bot members.
+
+        The members come from the guild's full member list, fetched on demand if the
+        member cache doesn't hold it. None means the list couldn't be fetched.
+        """
+        if target.lower() in ("everyone", "@everyone", "all"):
+            label, role = "everyone", None
+        else:
+            role = await commands.RoleConverter().convert(ctx, target)
+            label = role.mention
+        members, complete = await guild_members(ctx.guild)
+        if not complete:
+            return label, None
+        return label, [m for m in members if not m.bot and (role is None or m.get_role(role.id))]
+
+    async def _bulk_adjust(self, ctx: commands.Context, target: str, amount: int, revoke: bool):
+        """Shared implementation of admin grant/revoke"""
+        verb = "Revoking" if revoke else "Granting"
+        if amount <= 0:
+            await ctx.send("❌ Amount must be positive.")
+            return
+
+        try:
+            label, members = await self._resolve_bulk_targets(ctx, target)
+        except commands.BadArgument:
+            await ctx.send(f"❌ Role `{target}` not found. Mention a role, or use `everyone`.")
+            return
+        if members is None:
+            await ctx.send("❌ Couldn't load this server's member list. Please try again later.")
+            return
+        if not members:
+            await ctx.send(f"ℹ️ No members found for {label}.")
+            return
+
+        status = await ctx.send(f"⏳ {verb} {self._format_credits(amount)} for {len(members)} members of {label}...")
+        start = time.perf_counter()
+        try:
+            # One transaction for the whole batch, off the event loop
+            changed, skipped = await self.db.run_write(
+                self.db.bulk_adjust_credits,
+                str(ctx.guild.id),
+                [(str(m.id), m.name) for m in members],
+                -amount if revoke else amount,
+                "admin_remove" if revoke else "admin_add"
+            )
+        except Exception as e:
+            self.logger.error(f"Error in admin {'revoke' if revoke else 'grant'} command: {e}")
+            await status.edit(content=f"❌ An error occurred while {verb.lower()} credits. No balances were changed.")
+            return
+
+        elapsed = (time.perf_counter() - start) * 1000
+        action = "Removed" if revoke else "Added"
+        summary = f"✅ {action} {self._format_credits(amount)} for {changed} members of {label} in {elapsed:.0f} ms."
+        if skipped:
+            summary += f" Skipped {skipped} who didn't have enough credits."
+        await status.edit(content=summary)
+        self.logger.info(f"{ctx.author} {verb.lower()} {amount} credits for {changed} members of {label} in {ctx.guild.name} ({elapsed:.0f} ms)")
+
+    @admin_top_level.command(name='grant')
+    async def admin_grant_command(self, ctx: commands.Context, target: str, amount: int):
+        """Admin: Add credits to every member of a role (or `everyone`)"""
+        if not self._is_admin(ctx.author):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        await self._bulk_adjust(ctx, target, amount, revoke=False)
+
+    @admin_top_level.command(name='revoke')
+    async def admin_revoke_command(self, ctx: commands.Context, target: str, amount: int):
+        """Admin: Remove credits from every member of a role (or `everyone`)"""
+        if not self._is_admin(ctx.author):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+        await self._bulk_adjust(ctx, target, amount, revoke=True)
+
     @admin_top_level.command(name='stats')
     async def admin_stats_command(self, ctx: commands.Context):
         """Admin: Show server credit statistics"""
@@ -431,7 +1035,7 @@ class CreditsCog(commands.Cog, name="Credits"):
             return
         
         try:
-            stats = self.db.get_server_stats(str(ctx.guild.id))
+            stats = await self.db.run_read(self.db.get_server_stats, str(ctx.guild.id))
             
             if not stats:
                 await ctx.send("❌ No statistics available.")
@@ -453,6 +1057,41 @@ class CreditsCog(commands.Cog, name="Credits"):
             self.logger.error(f"Error in admin stats command: {e}")
             await ctx.send("❌ An error occurred while getting statistics.")
 
+    @admin_top_level.command(name='maintenance')
+    async def admin_maintenance_command(self, ctx: commands.Context, action: Optional[str] = None):
+        """Admin: Show the last database maintenance report, or `run` maintenance now"""
+        if not self._is_admin(ctx.author):
+            await ctx.send("❌ You don't have permission to use this command.")
+            return
+
+        try:
+            if action == "run":
+                report = await self.bot.loop.run_in_executor(None, functools.partial(self.maintenance.run, force_analyze=True))
+            else:
+                report = self.maintenance.last_report
+
+            if report is None:
+                await ctx.send("ℹ️ Database maintenance hasn't run yet. Use `!admin maintenance run` to run it now.")
+                return
+
+            embed = discord.Embed(
+                title="🧹 Database Maintenance",
+                color=discord.Color.orange() if report.errors else discord.Color.blue()
+            )
+            embed.add_field(name="🕒 Last Run", value=f"<t:{int(report.started_at.timestamp())}:R> ({report.duration_ms:.0f} ms)", inline=False)
+            embed.add_field(name="📄 WAL Size", value=f"{report.wal_bytes_before:,} → {report.wal_bytes_after:,} bytes", inline=True)
+            embed.add_field(name="✅ Checkpoint", value=f"{report.checkpoint_mode or 'skipped'}{' (busy)' if report.checkpoint_busy else ''}", inline=True)
+            embed.add_field(name="📈 Optimize / Analyze", value=f"{'yes' if report.optimized else 'no'} / {'yes' if report.analyzed else 'no'}", inline=True)
+            embed.add_field(name="♻️ Free Pages", value=f"{report.freelist_pages_before:,} → {report.freelist_pages_after:,} of {report.page_count:,} ({report.vacuum_mode or 'no vacuum'})", inline=False)
+            if report.errors:
+                embed.add_field(name="⚠️ Errors", value="\n".join(report.errors)[:1024], inline=False)
+            embed.set_footer(text=f"{self.maintenance.run_count} run(s) since startup")
+            await ctx.send(embed=embed)
+
+        except Exception as e:
+            self.logger.error(f"Error in admin maintenance command: {e}")
+            await ctx.send("❌ An error occurred while running database maintenance.")
+
     @admin_top_level.command(name='backup')
     async def admin_backup_command(self, ctx: commands.Context):
         """Admin: Create a database backup"""
@@ -461,7 +1100,7 @@ class CreditsCog(commands.Cog, name="Credits"):
             return
         
         try:
-            success = self.db.backup_database()
+            success = await self.bot.loop.run_in_executor(None, self.db.backup_database)
             
             if success:
                 await ctx.send("💾 Database backup created successfully!")
@@ -473,34 +1112,67 @@ class CreditsCog(commands.Cog, name="Credits"):
             await ctx.send("❌ An error occurred while creating backup.")
 
     # Utility methods for other cogs to use
-    def add_credits(self, user_id: str, server_id: str, amount: int, reason: str = "") -> bool:
-        """Add credits to a user (for use by other cogs)"""
+    async def add_credits(self, user_id: str, server_id: str, amount: int, reason: str = "", idempotency_key: Optional[str] = None) -> bool:
+        """Add credits to a user (for use by other cogs). Pass an idempotency_key to make retries safe."""
         try:
-            return self.db.add_credits(user_id, server_id, amount, reason)
+            return await self.db.run_write(self.db.add_credits, user_id, server_id, amount, reason, idempotency_key)
         except Exception as e:
             self.logger.error(f"Error adding credits: {e}")
             return False
 
-    def subtract_credits(self, user_id: str, server_id: str, amount: int, reason: str = "") -> bool:
-        """Subtract credits from a user (for use by other cogs)"""
+    async def subtract_credits(self, user_id: str, server_id: str, amount: int, reason: str = "", idempotency_key: Optional[str] = None) -> bool:
+        """Subtract credits from a user (for use by other cogs). Pass an idempotency_key to make retries safe."""
         try:
-            return self.db.subtract_credits(user_id, server_id, amount, reason)
+            return await self.db.run_write(self.db.subtract_credits, user_id, server_id, amount, reason, idempotency_key)
         except Exception as e:
             self.logger.error(f"Error subtracting credits: {e}")
             return False
 
-    def get_credits(self, user_id: str, server_id: str) -> Optional[int]:
+    async def get_credits(self, user_id: str, server_id: str) -> Optional[int]:
         """Get a user's credit balance (for use by other cogs)"""
         try:
-            return self.db.get_user_credits(user_id, server_id)
+            return await self.db.run_read(self.db.get_user_credits, user_id, server_id)
         except Exception as e:
             self.logger.error(f"Error getting credits: {e}")
             return None
 
-    def can_claim_daily(self, user_id: str, server_id: str) -> bool:
+    async def get_available_credits(self, user_id: str, server_id: str) -> Optional[int]:
+        """Get a user's balance minus escrow holds (for use by other cogs)"""
+        try:
+            return await self.db.run_read(self.db.get_available_credits, user_id, server_id)
+        except Exception as e:
+            self.logger.error(f"Error getting available credits: {e}")
+            return None
+
+    async def hold_credits(self, user_id: str, server_id: str, amount: int, ttl: float, reason: str = "") -> Optional[int]:
+        """Reserve credits for a pending wager; returns a hold ID or None (for use by other cogs)"""
+        try:
+            return await self.db.run_write(self.db.hold, user_id, server_id, amount, ttl, reason)
+        except Exception as e:
+            self.logger.error(f"Error placing hold: {e}")
+            return None
+
+    async def capture_hold(self, hold_id: int, reason: str = "", recipient_id: Optional[str] = None,
+                           recipient_reason: str = "", idempotency_key: Optional[str] = None) -> bool:
+        """Settle a hold, optionally paying it to another user (for use by other cogs)"""
+        try:
+            return await self.db.run_write(self.db.capture, hold_id, reason, recipient_id, recipient_reason, idempotency_key)
+        except Exception as e:
+            self.logger.error(f"Error capturing hold: {e}")
+            return False
+
+    async def release_hold(self, hold_id: int) -> bool:
+        """Cancel a hold (for use by other cogs)"""
+        try:
+            return await self.db.run_write(self.db.release, hold_id)
+        except Exception as e:
+            self.logger.error(f"Error releasing hold: {e}")
+            return False
+
+    async def can_claim_daily(self, user_id: str, server_id: str) -> bool:
         """Check if user can claim daily reward (for use by other cogs)"""
         try:
-            return self.db.can_claim_daily_reward(user_id, server_id)
+            return await self.db.run_read(self.db.can_claim_daily_reward, user_id, server_id)
         except Exception as e:
             self.logger.error(f"Error checking daily reward: {e}")
             return False
@@ -3,6 +3,16 @@ import sys
 from dataclasses import dataclass, field
 from typing import List, Optional
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _load_timezone(name: str) -> ZoneInfo:
+    """Resolve a timezone once per name, falling back to UTC if it isn't available"""
+    try:
+        return ZoneInfo(name)
+    except ZoneInfoNotFoundError:
+        return ZoneInfo('UTC')
 
 
 @dataclass
@@ -14,6 +24,40 @@ class CreditsConfig:
     db_backup_path: str = "backups/credits_backup.db"
     auto_backup: bool = True
     backup_interval_hours: int = 24
+    read_pool_size: int = int(os.getenv('CREDITS_READ_POOL_SIZE', min(4, os.cpu_count() or 1)))  # Read-only query threads
+    write_retry_attempts: int = 5         # Retries on SQLITE_BUSY/SQLITE_LOCKED before giving up
+    write_retry_base_delay: float = 0.02  # seconds; doubled per attempt, with full jitter
+    write_retry_max_delay: float = 0.5    # seconds; cap for a single backoff sleep
+    write_busy_budget: float = 5.0        # seconds; total lock wait per write, across all retries
+
+    # Database maintenance
+    # Only one process per database file should run it (launcher.py enables it on cluster 0 only)
+    maintenance_enabled: bool = os.getenv('CREDITS_MAINTENANCE', 'true').lower() == 'true'
+    maintenance_interval_minutes: int = 15
+    wal_checkpoint_threshold_bytes: int = 4 * 1024 * 1024    # PASSIVE checkpoint above this WAL size
+    wal_truncate_threshold_bytes: int = 64 * 1024 * 1024     # TRUNCATE checkpoint above this WAL size
+    analyze_interval_hours: int = 24
+    vacuum_free_ratio: float = 0.25        # Full VACUUM (once, to enable incremental) above this free-page ratio
+    incremental_vacuum_pages: int = 1000   # Pages reclaimed per maintenance run
+
+    # Escrow holds
+    hold_sweep_interval_seconds: int = 60  # How often expired holds are deleted in bulk
+
+    # Startup member reconciliation
+    reconcile_on_startup: bool = True
+    reconcile_chunk_size: int = 500             # Members diffed and written per transaction
+    reconcile_chunk_delay_seconds: float = 0.5  # Pause between chunks so command traffic goes first
+
+    # Full member lists (fetched on demand when the bot doesn't cache every member)
+    member_chunk_timeout_seconds: float = 60.0  # Max wait for a guild's member list
+
+    # Member update pipeline
+    member_update_debounce_seconds: float = 2.0  # Username changes are collected this long before a write
+    member_update_batch_size: int = 500          # Max users per write transaction
+
+    # Once-per-period rewards
+    period_reward_cache_size: int = 10000     # Claims remembered in memory per tracker for the current period
+    period_reward_retention_days: int = 7     # Older claim records are pruned during maintenance
 
     # Initial credits settings
     initial_credits: int = 500
@@ -34,15 +78,15 @@ class CreditsConfig:
     
     @property
     def DAILY_RESET_TIMEZONE(self) -> ZoneInfo:
-        try:
-            return ZoneInfo(self.daily_reset_timezone_str)
-        except ZoneInfoNotFoundError:
-            # We can't easily log here without a logger, but we can print to stderr
-            # as a fallback, or just return UTC.
-            return ZoneInfo('UTC')
+        # Period checks should go through credits_system.clock.reset_clock instead
+        return _load_timezone(self.daily_reset_timezone_str)
 
     # Leaderboard settings
     leaderboard_size: int = 10
+    leaderboard_cache_ttl_seconds: int = 300  # Upper bound on how long a rendered board is reused
+    name_cache_ttl_seconds: int = 600      # How long resolved display names are reused
+    name_cache_size: int = 5000            # Max names kept in memory
+    name_fetch_concurrency: int = 10       # Max concurrent REST user lookups (a cold top 10 is one round trip)
 
     # Transaction types
     TRANSACTION_TYPES = {
@@ -55,9 +99,29 @@ class CreditsConfig:
         "admin_add": "Admin addition",
         "admin_remove": "Admin removal",
         "purchase": "Purchase",
-        "reward": "Special reward"
+        "reward": "Special reward",
+        "slot_machine_bet": "Slot machine bet",
+        "slot_machine_win": "Slot machine win",
+        "rfi_success": "RFI success reward",
+        "rfi_critical_success": "RFI critical success reward",
+        "rfi_bet_win": "RFI challenge bet won",
+        "rfi_bet_loss": "RFI challenge bet lost",
+        "coinflip_win": "Coinflip challenge win"
+    }
+
+    # Transaction types that make up each game, for per-game leaderboards
+    GAME_TRANSACTION_TYPES = {
+        "slots": ["slot_machine_bet", "slot_machine_win"],
+        "rfi": ["rfi_success", "rfi_critical_success", "rfi_bet_win", "rfi_bet_loss"],
+        "coinflip": ["coinflip_win"]
     }
 
+    # Transaction types that are not "earnings" and are left out of time-windowed leaderboards
+    PERIOD_LEADERBOARD_EXCLUDED_TYPES = ["initial", "transfer_in", "transfer_out", "admin_add", "admin_remove"]
+
+    # Time windows available to time-windowed leaderboards
+    LEADERBOARD_PERIODS = ["today", "week", "month"]
+
 
 # Global configuration instance
 config = CreditsConfig()
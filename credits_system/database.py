@@ -1,12 +1,37 @@
 import sqlite3
 import os
+import asyncio
 import datetime
-from typing import Optional, List, Dict, Any, Tuple
+import functools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple, Set, Callable, TypeVar
 from pathlib import Path
 import logging
 
-from .models import UserCredits, Transaction, ServerInfo, UserInfo
+from .models import UserCredits, Transaction, PeriodTotal, GlobalTotal, CreditHold, ServerInfo, UserInfo
 from .config import config
+from .clock import reset_clock
+
+T = TypeVar("T")
+
+
+def _timed(method):
+    """Report each call's duration to the database's query listeners (if any)"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self._query_listeners:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._notify_query_listeners(name, time.perf_counter() - start)
+    return wrapper
 
 
 class CreditsDatabase:
@@ -24,6 +49,67 @@ class CreditsDatabase:
         self._ensure_database_directory()
         self._initialize_database()
 
+        # Read-only connections, one per thread, used by the query methods so
+        # they can run in parallel with the single writer under WAL.
+        self._read_local = threading.local()
+        self._read_connections: List[sqlite3.Connection] = []
+        self._read_connections_lock = threading.Lock()
+        self.read_executor = ThreadPoolExecutor(
+            max_workers=config.read_pool_size,
+            thread_name_prefix="credits-read"
+        )
+        # The single writer: writes from the event loop run here, one at a time and in
+        # the order they were issued, so their busy waits and retries never block the loop.
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="credits-write")
+
+        # Balance change notifications. Changes made inside a write transaction are
+        # collected per thread and delivered only once that transaction commits.
+        self._balance_listeners: List[Callable[[Optional[str], Optional[str], Optional[int]], None]] = []
+        self._write_local = threading.local()
+
+        # Query timing callbacks, called as listener(method_name, seconds)
+        self._query_listeners: List[Callable[[str, float], None]] = []
+
+    def add_balance_listener(self, listener: Callable[[Optional[str], Optional[str], Optional[int]], None]):
+        """
+        Register a callback run after every committed balance change.
+
+        The listener is called as listener(server_id, user_id, new_balance), from whichever
+        thread performed the write. All three are None when every balance may have changed
+        (e.g. after a restore).
+        """
+        self._balance_listeners.append(listener)
+
+    def add_query_listener(self, listener: Callable[[str, float], None]):
+        """
+        Register a callback run after every public query method, e.g. to export timings.
+
+        The listener is called as listener(method_name, seconds) from whichever thread ran
+        the query, including failed calls. It should be cheap and must not raise.
+        """
+        self._query_listeners.append(listener)
+
+    def _notify_query_listeners(self, name: str, elapsed: float):
+        for listener in self._query_listeners:
+            try:
+                listener(name, elapsed)
+            except Exception as e:
+                self.logger.error(f"Query listener failed: {e}")
+
+    def _record_balance_change(self, server_id: str, user_id: str, new_balance: int):
+        """Queue a balance change for delivery when the current write transaction commits"""
+        changes = getattr(self._write_local, 'balance_changes', None)
+        if changes is not None:
+            changes.append((server_id, user_id, new_balance))
+
+    def _notify_balance_listeners(self, changes: List[Tuple[Optional[str], Optional[str], Optional[int]]]):
+        for change in changes:
+            for listener in self._balance_listeners:
+                try:
+                    listener(*change)
+                except Exception as e:
+                    self.logger.error(f"Balance listener failed: {e}")
+
     def _ensure_database_directory(self):
         """Ensure the directory for the database exists"""
         db_dir = Path(self.db_path).parent
@@ -39,6 +125,158 @@ class CreditsDatabase:
         conn.row_factory = sqlite3.Row  # Return rows as dictionaries
         return conn
 
+    def _get_read_connection(self) -> sqlite3.Connection:
+        """Get this thread's read-only connection, opening it on first use"""
+        conn = getattr(self._read_local, 'conn', None)
+        if conn is None:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            # check_same_thread is off only so close() can run from any thread;
+            # each connection is still used exclusively by the thread that opened it.
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only=ON")     # Refuse writes even if mode=ro is ignored
+            conn.execute("PRAGMA busy_timeout=5000")  # 5 second busy timeout
+            conn.row_factory = sqlite3.Row
+            self._read_local.conn = conn
+            with self._read_connections_lock:
+                self._read_connections.append(conn)
+        return conn
+
+    async def run_read(self, method: Callable, *args, **kwargs):
+        """
+        Run a read-only query method on the read thread pool.
+
+        Args:
+            method: A bound read method of this database (e.g. self.get_leaderboard)
+            *args, **kwargs: Arguments passed to the method
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.read_executor, functools.partial(method, *args, **kwargs))
+
+    async def run_write(self, method: Callable, *args, **kwargs):
+        """
+        Run a write method on the writer thread.
+
+        Args:
+            method: A bound write method of this database (e.g. self.transfer_credits)
+            *args, **kwargs: Arguments passed to the method
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.write_executor, functools.partial(method, *args, **kwargs))
+
+    def close(self):
+        """Finish queued writes, shut down the read pool and close all read-only connections"""
+        self.write_executor.shutdown(wait=True)
+        self.read_executor.shutdown(wait=True)
+        with self._read_connections_lock:
+            for conn in self._read_connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    self.logger.error(f"Error closing read connection: {e}")
+            self._read_connections.clear()
+        self._read_local = threading.local()
+
+    def check_writable(self) -> bool:
+        """
+        Check that the database accepts writes, e.g. for a health check.
+
+        Takes the write lock and inserts a row that is rolled back, so a read-only file
+        or a lock held past busy_timeout shows up without changing anything.
+        """
+        conn = self._get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO servers (server_id, server_name) VALUES ('__health_check__', '')")
+            return True
+        except sqlite3.Error as e:
+            self.logger.warning(f"Database is not writable: {e}")
+            return False
+        finally:
+            try:
+                conn.rollback()
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _is_busy_error(error: sqlite3.Error) -> bool:
+        """Check whether an error is SQLITE_BUSY/SQLITE_LOCKED (including extended codes)"""
+        code = getattr(error, 'sqlite_errorcode', None)
+        if code is not None:
+            return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+        message = str(error).lower()
+        return "locked" in message or "busy" in message
+
+    @staticmethod
+    def _is_idempotency_conflict(error: sqlite3.IntegrityError) -> bool:
+        """Check whether an integrity error came from the idempotency key unique index"""
+        return "transactions.idempotency_key" in str(error)
+
+    def _execute_write(self, operation: Callable[[sqlite3.Cursor], T], idempotency_key: Optional[str] = None) -> T:
+        """
+        Run a write operation in its own transaction, retrying on SQLITE_BUSY/SQLITE_LOCKED.
+
+        The transaction is opened with BEGIN IMMEDIATE so lock contention surfaces up front
+        (where busy_timeout applies) rather than mid-transaction. Busy/locked errors are
+        retried with jittered exponential backoff. The waits of all attempts together
+        (busy_timeout plus backoff) are capped at config.write_busy_budget, so one
+        contended write never holds up the writes queued behind it on the writer thread
+        (see run_write) for long. The operation is committed unless it returns False, in
+        which case it is rolled back as a whole.
+
+        Args:
+            operation: Callable performing the writes with the given cursor
+            idempotency_key: Optional caller-supplied key. If a ledger row already carries
+                it, the operation is skipped and treated as already applied (returns True).
+
+        Raises:
+            sqlite3.Error: If the operation fails for a non-busy reason or retries run out
+        """
+        attempt = 0
+        deadline = time.monotonic() + config.write_busy_budget
+        while True:
+            conn = self._get_connection()
+            try:
+                # Later attempts only wait for the lock as long as the budget has left
+                busy_ms = max(1, int((deadline - time.monotonic()) * 1000))
+                conn.execute(f"PRAGMA busy_timeout={busy_ms}")
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+
+                if idempotency_key is not None:
+                    cursor.execute("SELECT 1 FROM transactions WHERE idempotency_key = ?", (idempotency_key,))
+                    if cursor.fetchone() is not None:
+                        conn.rollback()
+                        self.logger.info(f"Skipping already applied operation {idempotency_key}")
+                        return True
+
+                self._write_local.balance_changes = []
+                result = operation(cursor)
+                if result is False:
+                    conn.rollback()
+                else:
+                    conn.commit()
+                    self._notify_balance_listeners(self._write_local.balance_changes)
+                return result
+            except sqlite3.IntegrityError as e:
+                conn.rollback()
+                if idempotency_key is not None and self._is_idempotency_conflict(e):
+                    # A concurrent writer applied the same operation between our check and insert
+                    self.logger.info(f"Operation {idempotency_key} was applied concurrently")
+                    return True
+                raise
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                remaining = deadline - time.monotonic()
+                if not self._is_busy_error(e) or attempt >= config.write_retry_attempts or remaining <= 0:
+                    raise
+                delay = random.uniform(0, min(config.write_retry_max_delay, config.write_retry_base_delay * (2 ** attempt), remaining))
+                attempt += 1
+                self.logger.warning(f"Database busy ({e}), retry {attempt}/{config.write_retry_attempts} in {delay:.3f}s")
+                time.sleep(delay)
+            finally:
+                self._write_local.balance_changes = None
+                conn.close()
+
     def _initialize_database(self):
         """Create tables if they don't exist"""
         try:
@@ -95,12 +333,120 @@ class CreditsDatabase:
                 )
                 """)
 
+                # Idempotency keys for retried mutations; only one ledger row per operation carries the key
+                cursor.execute("PRAGMA table_info(transactions)")
+                if "idempotency_key" not in [column['name'] for column in cursor.fetchall()]:
+                    cursor.execute("ALTER TABLE transactions ADD COLUMN idempotency_key TEXT")
+                cursor.execute(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_idempotency ON transactions(idempotency_key) "
+                    "WHERE idempotency_key IS NOT NULL"
+                )
+
                 # Create indexes for performance
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_credits_user ON user_credits(user_id)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_credits_server ON user_credits(server_id)")
+                # Leaderboard order, so top-N and keyset pages are index range scans
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_credits_rank ON user_credits(server_id, credits DESC, user_id)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_server ON transactions(server_id)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(transaction_type)")
+                # Per-day rollup of the ledger for time-windowed leaderboards.
+                # `day` is the local date in the daily reset timezone.
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_user_totals'")
+                rollup_exists = cursor.fetchone() is not None
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS daily_user_totals (
+                    server_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    net INTEGER NOT NULL DEFAULT 0,
+                    transaction_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (server_id, day, type, user_id)
+                ) WITHOUT ROWID
+                """)
+                if not rollup_exists:
+                    self._backfill_daily_totals_internal(conn)
+
+                # Per-user balance summed across servers for the global leaderboard.
+                # Triggers keep it in step with every write to user_credits.
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_global_totals'")
+                global_totals_exist = cursor.fetchone() is not None
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_global_totals (
+                    user_id TEXT PRIMARY KEY,
+                    total_credits INTEGER NOT NULL DEFAULT 0,
+                    server_count INTEGER NOT NULL DEFAULT 0
+                )
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_global_totals_credits ON user_global_totals(total_credits DESC, user_id)")
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_user_credits_global_insert AFTER INSERT ON user_credits
+                BEGIN
+                    INSERT INTO user_global_totals (user_id, total_credits, server_count)
+                    VALUES (NEW.user_id, NEW.credits, 1)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        total_credits = total_credits + excluded.total_credits,
+                        server_count = server_count + 1;
+                END
+                """)
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_user_credits_global_update AFTER UPDATE OF credits ON user_credits
+                WHEN NEW.credits != OLD.credits
+                BEGIN
+                    UPDATE user_global_totals SET total_credits = total_credits + NEW.credits - OLD.credits
+                    WHERE user_id = NEW.user_id;
+                END
+                """)
+                cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_user_credits_global_delete AFTER DELETE ON user_credits
+                BEGIN
+                    UPDATE user_global_totals SET
+                        total_credits = total_credits - OLD.credits,
+                        server_count = server_count - 1
+                    WHERE user_id = OLD.user_id;
+                END
+                """)
+                if not global_totals_exist:
+                    cursor.execute("""
+                    INSERT INTO user_global_totals (user_id, total_credits, server_count)
+                    SELECT user_id, SUM(credits), COUNT(*) FROM user_credits GROUP BY user_id
+                    """)
+
+                # Keyset pagination of a user's history, optionally filtered by type
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_history ON transactions(user_id, server_id, created_at, transaction_id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_history_type ON transactions(user_id, server_id, transaction_type, created_at, transaction_id)")
+
+                # Escrow holds. Unexpired holds count against the available balance;
+                # expired ones stop counting immediately and are deleted in bulk later.
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS credit_holds (
+                    hold_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    server_id TEXT NOT NULL,
+                    amount INTEGER NOT NULL CHECK (amount > 0),
+                    reason TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at REAL NOT NULL,
+                    FOREIGN KEY (user_id, server_id) REFERENCES user_credits(user_id, server_id) ON DELETE CASCADE
+                )
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_credit_holds_user ON credit_holds(user_id, server_id, expires_at)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_credit_holds_expires ON credit_holds(expires_at)")
+
+                # Once-per-period rewards: one row per claim, keyed by the reset period it was claimed in
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS period_reward_claims (
+                    reward TEXT NOT NULL,
+                    server_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    period_start INTEGER NOT NULL,
+                    amount INTEGER NOT NULL,
+                    claimed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (reward, server_id, user_id, period_start)
+                ) WITHOUT ROWID
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_period_reward_claims_period ON period_reward_claims(period_start)")
 
                 conn.commit()
                 self.logger.info(f"Database initialized at {self.db_path}")
@@ -109,69 +455,69 @@ class CreditsDatabase:
             self.logger.error(f"Database initialization failed: {e}")
             raise
 
+    @_timed
     def ensure_server_exists(self, server_id: str, server_name: str) -> bool:
         """Ensure a server exists in the database"""
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            cursor.execute(
+                "INSERT OR IGNORE INTO servers (server_id, server_name) VALUES (?, ?)",
+                (server_id, server_name)
+            )
+            
+            # Update server name and last_updated if it already exists
+            cursor.execute(
+                "UPDATE servers SET server_name = ?, last_updated = CURRENT_TIMESTAMP WHERE server_id = ?",
+                (server_name, server_id)
+            )
+            return True
+
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT OR IGNORE INTO servers (server_id, server_name) VALUES (?, ?)",
-                    (server_id, server_name)
-                )
-                
-                # Update server name and last_updated if it already exists
-                cursor.execute(
-                    "UPDATE servers SET server_name = ?, last_updated = CURRENT_TIMESTAMP WHERE server_id = ?",
-                    (server_name, server_id)
-                )
-                
-                conn.commit()
-                return True
+            return self._execute_write(operation)
         except sqlite3.Error as e:
             self.logger.error(f"Error ensuring server exists: {e}")
             return False
 
+    @_timed
     def ensure_user_exists(self, user_id: str, username: str, discriminator: Optional[str] = None) -> bool:
         """Ensure a user exists in the database"""
-        try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Check if user exists
-                cursor.execute("SELECT username, discriminator FROM users WHERE user_id = ?", (user_id,)) # Select discriminator too
-                existing_user = cursor.fetchone()
-                
-                if existing_user:
-                    # Update username, discriminator and last_seen if changed
-                    # Compare existing discriminator from DB with the new one
-                    if existing_user['username'] != username or existing_user['discriminator'] != discriminator:
-                        cursor.execute(
-                            "UPDATE users SET username = ?, discriminator = ?, last_seen = CURRENT_TIMESTAMP, last_username_change = CURRENT_TIMESTAMP WHERE user_id = ?",
-                            (username, discriminator, user_id)
-                        )
-                    else:
-                        # Only update last_seen if username/discriminator didn't change
-                        cursor.execute(
-                            "UPDATE users SET last_seen = CURRENT_TIMESTAMP WHERE user_id = ?",
-                            (user_id,)
-                        )
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            # Check if user exists
+            cursor.execute("SELECT username, discriminator FROM users WHERE user_id = ?", (user_id,)) # Select discriminator too
+            existing_user = cursor.fetchone()
+            
+            if existing_user:
+                # Update username, discriminator and last_seen if changed
+                # Compare existing discriminator from DB with the new one
+                if existing_user['username'] != username or existing_user['discriminator'] != discriminator:
+                    cursor.execute(
+                        "UPDATE users SET username = ?, discriminator = ?, last_seen = CURRENT_TIMESTAMP, last_username_change = CURRENT_TIMESTAMP WHERE user_id = ?",
+                        (username, discriminator, user_id)
+                    )
                 else:
-                    # Insert new user
+                    # Only update last_seen if username/discriminator didn't change
                     cursor.execute(
-                        "INSERT INTO users (user_id, username, discriminator) VALUES (?, ?, ?)",
-                        (user_id, username, discriminator)
+                        "UPDATE users SET last_seen = CURRENT_TIMESTAMP WHERE user_id = ?",
+                        (user_id,)
                     )
-                
-                conn.commit()
-                return True
+            else:
+                # Insert new user
+                cursor.execute(
+                    "INSERT INTO users (user_id, username, discriminator) VALUES (?, ?, ?)",
+                    (user_id, username, discriminator)
+                )
+            return True
+
+        try:
+            return self._execute_write(operation)
         except sqlite3.Error as e:
             self.logger.error(f"Error ensuring user exists: {e}")
             return False
 
+    @_timed
     def user_has_credits(self, user_id: str, server_id: str) -> bool:
         """Check if a user has a credits record for a server"""
         try:
-            with self._get_connection() as conn:
+            with self._get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "SELECT 1 FROM user_credits WHERE user_id = ? AND server_id = ?",
@@ -192,11 +538,25 @@ class CreditsDatabase:
         result = cursor.fetchone()
         return result['credits'] if result else None
 
-    def _log_transaction_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str, amount: int, transaction_type: str, description: str = "") -> bool:
+    def _get_held_credits_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str) -> int:
+        """Internal method to sum a user's unexpired holds using an existing cursor."""
+        cursor.execute(
+            "SELECT COALESCE(SUM(amount), 0) FROM credit_holds WHERE user_id = ? AND server_id = ? AND expires_at > ?",
+            (user_id, server_id, time.time())
+        )
+        return cursor.fetchone()[0]
+
+    def _get_available_credits_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str) -> Optional[int]:
+        """Internal method to get a user's balance minus unexpired holds using an existing cursor."""
+        balance = self._get_user_credits_internal(cursor, user_id, server_id)
+        if balance is None:
+            return None
+        return balance - self._get_held_credits_internal(cursor, user_id, server_id)
+
+    def _log_transaction_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str, amount: int, transaction_type: str, description: str = "", idempotency_key: Optional[str] = None) -> bool:
         """Internal method to log a transaction using an existing cursor."""
-        # Get current balance for the new_balance in transaction record.
-        # This will be the balance *before* the current transaction.
-        # The new_balance field in the transactions table should reflect the balance *after* the transaction.
+        # Callers update the balance first, so the stored balance already is the
+        # balance *after* this transaction, which is what new_balance records.
         current_balance = self._get_user_credits_internal(cursor, user_id, server_id)
         if current_balance is None:
             # This should ideally not happen if user_credits record exists
@@ -206,26 +566,65 @@ class CreditsDatabase:
         cursor.execute(
             """
             INSERT INTO transactions 
-            (user_id, server_id, amount, new_balance, transaction_type, description)
-            VALUES (?, ?, ?, ?, ?, ?)
+            (user_id, server_id, amount, new_balance, transaction_type, description, idempotency_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (user_id, server_id, amount, current_balance + amount, transaction_type, description) # new_balance should be the balance AFTER this transaction
+            (user_id, server_id, amount, current_balance, transaction_type, description, idempotency_key)
         )
+        self._rollup_transaction_internal(cursor, user_id, server_id, amount, transaction_type)
         return True
 
+    def _local_day(self, when: Optional[datetime.datetime] = None) -> str:
+        """Return the rollup day (ISO date in the daily reset timezone) for a UTC time, default now."""
+        return reset_clock.local_day(when).isoformat()
+
+    def _rollup_transaction_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str, amount: int, transaction_type: str):
+        """Internal method to fold a new ledger row into daily_user_totals using an existing cursor."""
+        self._rollup_transactions_internal(cursor, [(user_id, server_id, amount, transaction_type)])
+
+    def _rollup_transactions_internal(self, cursor: sqlite3.Cursor, rows: List[Tuple[str, str, int, str]]):
+        """Internal method to fold (user_id, server_id, amount, transaction_type) ledger rows into daily_user_totals."""
+        day = self._local_day()
+        cursor.executemany(
+            """
+            INSERT INTO daily_user_totals (server_id, user_id, day, type, net, transaction_count)
+            VALUES (?, ?, ?, ?, ?, 1)
+            ON CONFLICT (server_id, day, type, user_id)
+            DO UPDATE SET net = net + excluded.net, transaction_count = transaction_count + 1
+            """,
+            [(server_id, user_id, day, transaction_type, amount) for user_id, server_id, amount, transaction_type in rows]
+        )
+
+    def _backfill_daily_totals_internal(self, conn: sqlite3.Connection):
+        """Build daily_user_totals from the existing ledger (run once, when the table is created)."""
+        conn.create_function(
+            "rollup_day", 1,
+            lambda created_at: self._local_day(datetime.datetime.fromisoformat(created_at)),
+            deterministic=True
+        )
+        conn.execute(
+            """
+            INSERT INTO daily_user_totals (server_id, user_id, day, type, net, transaction_count)
+            SELECT server_id, user_id, rollup_day(created_at), transaction_type, SUM(amount), COUNT(*)
+            FROM transactions
+            GROUP BY 1, 2, 3, 4
+            """
+        )
+
     def _initialize_user_credits_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str) -> bool:
         """Internal method to initialize a user's credits for a server using an existing cursor."""
         cursor.execute(
             "INSERT INTO user_credits (user_id, server_id, credits) VALUES (?, ?, ?)",
             (user_id, server_id, config.initial_credits)
         )
+        self._record_balance_change(server_id, user_id, config.initial_credits)
         self._log_transaction_internal(
             cursor, user_id, server_id, config.initial_credits,
             "initial", "Initial credits"
         )
         return True
 
-    def _add_credits_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str, amount: int, reason: str = "") -> bool:
+    def _add_credits_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str, amount: int, reason: str = "", idempotency_key: Optional[str] = None) -> bool:
         """Internal method to add credits to a user's balance using an existing cursor."""
         if amount <= 0:
             return False
@@ -241,21 +640,25 @@ class CreditsDatabase:
             "UPDATE user_credits SET credits = ?, last_transaction = CURRENT_TIMESTAMP WHERE user_id = ? AND server_id = ?",
             (new_balance, user_id, server_id)
         )
+        self._record_balance_change(server_id, user_id, new_balance)
         
         transaction_type = reason if reason in config.TRANSACTION_TYPES else "reward"
         self._log_transaction_internal(
             cursor, user_id, server_id, amount, transaction_type, 
-            config.TRANSACTION_TYPES.get(transaction_type, reason)
+            config.TRANSACTION_TYPES.get(transaction_type, reason), idempotency_key
         )
         return True
 
-    def _subtract_credits_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str, amount: int, reason: str = "") -> bool:
-        """Internal method to subtract credits from a user's balance using an existing cursor."""
+    def _subtract_credits_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str, amount: int, reason: str = "", idempotency_key: Optional[str] = None) -> bool:
+        """Internal method to subtract credits from a user's balance using an existing cursor.
+
+        Only the available balance (excluding escrow holds) can be spent.
+        """
         if amount <= 0:
             return False
             
         current_balance = self._get_user_credits_internal(cursor, user_id, server_id)
-        if current_balance is None or current_balance < amount:
+        if current_balance is None or current_balance - self._get_held_credits_internal(cursor, user_id, server_id) < amount:
             return False
             
         new_balance = current_balance - amount
@@ -263,69 +666,194 @@ class CreditsDatabase:
             "UPDATE user_credits SET credits = ?, last_transaction = CURRENT_TIMESTAMP WHERE user_id = ? AND server_id = ?",
             (new_balance, user_id, server_id)
         )
+        self._record_balance_change(server_id, user_id, new_balance)
         
         transaction_type = reason if reason in config.TRANSACTION_TYPES else "purchase"
         self._log_transaction_internal(
             cursor, user_id, server_id, -amount, transaction_type, 
-            config.TRANSACTION_TYPES.get(transaction_type, reason)
+            config.TRANSACTION_TYPES.get(transaction_type, reason), idempotency_key
         )
         return True
 
+    def _initialize_many_user_credits_internal(self, cursor: sqlite3.Cursor, server_id: str, user_ids: List[str]):
+        """Internal method to give many users their initial credits in a server using an existing cursor."""
+        cursor.executemany(
+            "INSERT INTO user_credits (user_id, server_id, credits) VALUES (?, ?, ?)",
+            [(user_id, server_id, config.initial_credits) for user_id in user_ids]
+        )
+        cursor.executemany(
+            """
+            INSERT INTO transactions (user_id, server_id, amount, new_balance, transaction_type, description)
+            VALUES (?, ?, ?, ?, 'initial', 'Initial credits')
+            """,
+            [(user_id, server_id, config.initial_credits, config.initial_credits) for user_id in user_ids]
+        )
+        self._rollup_transactions_internal(
+            cursor, [(user_id, server_id, config.initial_credits, "initial") for user_id in user_ids]
+        )
+        for user_id in user_ids:
+            self._record_balance_change(server_id, user_id, config.initial_credits)
+
+    def _upsert_users_internal(self, cursor: sqlite3.Cursor, users: List[Tuple[str, str]]):
+        """Internal method to insert users or update their usernames in bulk using an existing cursor."""
+        cursor.executemany(
+            """
+            INSERT INTO users (user_id, username, discriminator) VALUES (?, ?, NULL)
+            ON CONFLICT (user_id) DO UPDATE SET
+                username = excluded.username,
+                discriminator = NULL,
+                last_seen = CURRENT_TIMESTAMP,
+                last_username_change = CASE WHEN users.username != excluded.username
+                                            THEN CURRENT_TIMESTAMP ELSE users.last_username_change END
+            """,
+            users
+        )
+
+    @_timed
+    def update_users_info(self, users: List[Tuple[str, str]]) -> bool:
+        """Insert or rename many users in one transaction; users is a list of (user_id, username)"""
+        if not users:
+            return True
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            self._upsert_users_internal(cursor, users)
+            return True
+
+        try:
+            return self._execute_write(operation)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error updating {len(users)} users: {e}")
+            return False
+
+    @_timed
+    def sync_members(self, server_id: str, users: List[Tuple[str, str]], initialize: List[str]) -> Optional[int]:
+        """
+        Apply one batch of member reconciliation in a single transaction.
+
+        Args:
+            server_id: The server's ID (must already exist, see ensure_server_exists)
+            users: (user_id, username) of users to insert or rename
+            initialize: Users that should get their initial credits in this server
+
+        Returns:
+            The number of balances actually created (users who got one since the caller's
+            snapshot are skipped), or None if the write failed
+        """
+        if not users and not initialize:
+            return 0
+        created = 0
+
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            nonlocal created
+            created = 0  # Reset on busy retries
+            if users:
+                self._upsert_users_internal(cursor, users)
+            if initialize:
+                # Skip anyone who got a balance since the caller's snapshot
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_targets (user_id TEXT PRIMARY KEY)")
+                cursor.execute("DELETE FROM bulk_targets")
+                cursor.executemany("INSERT INTO bulk_targets (user_id) VALUES (?)", [(user_id,) for user_id in initialize])
+                cursor.execute(
+                    """
+                    SELECT t.user_id FROM bulk_targets t
+                    WHERE NOT EXISTS (SELECT 1 FROM user_credits uc WHERE uc.user_id = t.user_id AND uc.server_id = ?)
+                    """,
+                    (server_id,)
+                )
+                missing = [row['user_id'] for row in cursor.fetchall()]
+                if missing:
+                    self._initialize_many_user_credits_internal(cursor, server_id, missing)
+                created = len(missing)
+            return True
+
+        try:
+            self._execute_write(operation)
+            return created
+        except sqlite3.Error as e:
+            self.logger.error(f"Error syncing {len(users)} users / {len(initialize)} balances in server {server_id}: {e}")
+            return None
+
+    @_timed
+    def get_server_user_ids(self, server_id: str) -> Set[str]:
+        """IDs of every user with a balance in a server"""
+        try:
+            with self._get_read_connection() as conn:
+                cursor = conn.execute("SELECT user_id FROM user_credits WHERE server_id = ?", (server_id,))
+                return {row['user_id'] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting server user IDs: {e}")
+            return set()
+
+    @_timed
     def initialize_user_credits(self, user_id: str, server_id: str) -> bool:
         """Initialize a user's credits for a server"""
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                success = self._initialize_user_credits_internal(cursor, user_id, server_id)
-                conn.commit()
-                return success
+            return self._execute_write(
+                lambda cursor: self._initialize_user_credits_internal(cursor, user_id, server_id)
+            )
         except sqlite3.Error as e:
             self.logger.error(f"Error initializing user credits: {e}")
             return False
 
+    @_timed
     def get_user_credits(self, user_id: str, server_id: str) -> Optional[int]:
         """Get a user's current credit balance"""
         try:
-            with self._get_connection() as conn:
+            with self._get_read_connection() as conn:
                 return self._get_user_credits_internal(conn.cursor(), user_id, server_id)
         except sqlite3.Error as e:
             self.logger.error(f"Error getting user credits: {e}")
             return None
 
-    def add_credits(self, user_id: str, server_id: str, amount: int, reason: str = "") -> bool:
-        """Add credits to a user's balance"""
+    @_timed
+    def add_credits(self, user_id: str, server_id: str, amount: int, reason: str = "", idempotency_key: Optional[str] = None) -> bool:
+        """
+        Add credits to a user's balance.
+
+        Args:
+            idempotency_key: Optional caller-supplied key; retrying with the same key never applies twice
+        """
         if amount <= 0:
             self.logger.warning(f"Invalid amount to add: {amount}")
             return False
             
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                success = self._add_credits_internal(cursor, user_id, server_id, amount, reason)
-                conn.commit()
-                return success
+            return self._execute_write(
+                lambda cursor: self._add_credits_internal(cursor, user_id, server_id, amount, reason, idempotency_key),
+                idempotency_key
+            )
         except sqlite3.Error as e:
             self.logger.error(f"Error adding credits: {e}")
             return False
 
-    def subtract_credits(self, user_id: str, server_id: str, amount: int, reason: str = "") -> bool:
-        """Subtract credits from a user's balance"""
+    @_timed
+    def subtract_credits(self, user_id: str, server_id: str, amount: int, reason: str = "", idempotency_key: Optional[str] = None) -> bool:
+        """
+        Subtract credits from a user's balance.
+
+        Args:
+            idempotency_key: Optional caller-supplied key; retrying with the same key never applies twice
+        """
         if amount <= 0:
             self.logger.warning(f"Invalid amount to subtract: {amount}")
             return False
             
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                success = self._subtract_credits_internal(cursor, user_id, server_id, amount, reason)
-                conn.commit()
-                return success
+            return self._execute_write(
+                lambda cursor: self._subtract_credits_internal(cursor, user_id, server_id, amount, reason, idempotency_key),
+                idempotency_key
+            )
         except sqlite3.Error as e:
             self.logger.error(f"Error subtracting credits: {e}")
             return False
 
-    def transfer_credits(self, from_user_id: str, to_user_id: str, server_id: str, amount: int) -> bool:
-        """Transfer credits between users atomically"""
+    @_timed
+    def transfer_credits(self, from_user_id: str, to_user_id: str, server_id: str, amount: int, idempotency_key: Optional[str] = None) -> bool:
+        """
+        Transfer credits between users atomically.
+
+        Args:
+            idempotency_key: Optional caller-supplied key; retrying with the same key never applies twice
+        """
         if amount <= 0:
             self.logger.warning(f"Invalid transfer amount: {amount}")
             return False
@@ -337,86 +865,367 @@ class CreditsDatabase:
         if amount < config.min_transfer_amount:
             self.logger.warning(f"Transfer amount {amount} below minimum {config.min_transfer_amount}")
             return False
-            
-        conn = None
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # Check sender balance
-            sender_balance = self._get_user_credits_internal(cursor, from_user_id, server_id)
+
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            # Check sender balance (escrow holds can't be transferred)
+            sender_balance = self._get_available_credits_internal(cursor, from_user_id, server_id)
             if sender_balance is None or sender_balance < amount:
                 self.logger.warning(f"Sender {from_user_id} has insufficient funds")
                 return False
             
             # Ensure recipient exists and initialize if necessary
-            # We first check if user has credits using a method that gets its own connection
-            # because _initialize_user_credits_internal assumes user_credits table exists
-            if not self.user_has_credits(to_user_id, server_id):
+            if self._get_user_credits_internal(cursor, to_user_id, server_id) is None:
                 if not self._initialize_user_credits_internal(cursor, to_user_id, server_id):
                     return False
 
-            # Subtract from sender
-            if not self._subtract_credits_internal(cursor, from_user_id, server_id, amount, "transfer_out"):
-                conn.rollback()
+            # Subtract from sender (this ledger row carries the idempotency key)
+            if not self._subtract_credits_internal(cursor, from_user_id, server_id, amount, "transfer_out", idempotency_key):
                 return False
             
-            # Add to recipient
-            if not self._add_credits_internal(cursor, to_user_id, server_id, amount, "transfer_in"):
-                conn.rollback() # This rollback should cover both subtract and add operations in this transaction
-                return False
-            
-            # Log transfer transaction for sender
-            # The new_balance in the transaction log will reflect the balance after the subtraction
-            self._log_transaction_internal(
-                cursor, from_user_id, server_id, -amount, "transfer_out",
-                f"Transferred {amount} credits to user {to_user_id}"
+            # Add to recipient; returning False rolls back the subtraction as well.
+            # Both calls write their own ledger (and rollup) row, one per side of the transfer.
+            return self._add_credits_internal(cursor, to_user_id, server_id, amount, "transfer_in")
+
+        try:
+            return self._execute_write(operation, idempotency_key)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error transferring credits: {e}")
+            return False
+
+    @_timed
+    def bulk_adjust_credits(self, server_id: str, members: List[Tuple[str, str]], amount: int,
+                            transaction_type: str, idempotency_key: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """
+        Add (amount > 0) or remove (amount < 0) the same amount for many users in one transaction.
+
+        Balances are read with a single join against a temporary table of targets, and the
+        user, balance and ledger rows are written with executemany. On addition, users
+        without a balance are initialized first, as add_credits would. On removal, users
+        without a balance, or whose available balance (excluding escrow holds) can't cover
+        the amount, are skipped, as subtract_credits would.
+
+        Args:
+            server_id: The server's ID
+            members: (user_id, username) of every target
+            amount: Credits to add (positive) or remove (negative)
+            transaction_type: Transaction type for the ledger rows
+            idempotency_key: Optional caller-supplied key; retrying with the same key never applies twice
+
+        Returns:
+            (users changed, users skipped), or None if the key was already applied
+
+        Raises:
+            sqlite3.Error: If the write fails; nothing has been changed
+        """
+        if amount == 0 or not members:
+            return 0, 0
+        members = list(dict(members).items())  # De-duplicate, keeping the last username
+        description = config.TRANSACTION_TYPES.get(transaction_type, transaction_type)
+        outcome: Optional[Tuple[int, int]] = None  # Stays None when the key was already applied
+
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            nonlocal outcome
+            outcome = None  # Reset on busy retries
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_targets (user_id TEXT PRIMARY KEY)")
+            cursor.execute("DELETE FROM bulk_targets")
+            cursor.executemany("INSERT INTO bulk_targets (user_id) VALUES (?)", [(user_id,) for user_id, _ in members])
+            cursor.execute(
+                """
+                SELECT t.user_id, uc.credits,
+                       (SELECT COALESCE(SUM(h.amount), 0) FROM credit_holds h
+                        WHERE h.user_id = t.user_id AND h.server_id = ? AND h.expires_at > ?) AS held
+                FROM bulk_targets t
+                LEFT JOIN user_credits uc ON uc.user_id = t.user_id AND uc.server_id = ?
+                """,
+                (server_id, time.time(), server_id)
             )
-            
-            # Log transfer transaction for recipient
-            # The new_balance in the transaction log will reflect the balance after the addition
-            self._log_transaction_internal(
-                cursor, to_user_id, server_id, amount, "transfer_in",
-                f"Received {amount} credits from user {from_user_id}"
+            current = {row['user_id']: (row['credits'], row['held']) for row in cursor.fetchall()}
+
+            new_users = [user_id for user_id, (credits, _) in current.items() if credits is None] if amount > 0 else []
+            if new_users:
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO users (user_id, username, discriminator) VALUES (?, ?, NULL)",
+                    [(user_id, username) for user_id, username in members if current[user_id][0] is None]
+                )
+                self._initialize_many_user_credits_internal(cursor, server_id, new_users)
+                for user_id in new_users:
+                    current[user_id] = (config.initial_credits, current[user_id][1])
+
+            updates = [
+                (user_id, credits + amount)
+                for user_id, (credits, held) in current.items()
+                if amount > 0 or (credits is not None and credits - held >= -amount)
+            ]
+            if not updates:
+                outcome = (0, len(current))
+                return True  # Keep any initializations
+
+            cursor.executemany(
+                "UPDATE user_credits SET credits = ?, last_transaction = CURRENT_TIMESTAMP WHERE user_id = ? AND server_id = ?",
+                [(new_balance, user_id, server_id) for user_id, new_balance in updates]
             )
-            
-            conn.commit()
+            # The idempotency key goes on the first ledger row only (the index is unique)
+            cursor.executemany(
+                """
+                INSERT INTO transactions (user_id, server_id, amount, new_balance, transaction_type, description, idempotency_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (user_id, server_id, amount, new_balance, transaction_type, description, idempotency_key if i == 0 else None)
+                    for i, (user_id, new_balance) in enumerate(updates)
+                ]
+            )
+            self._rollup_transactions_internal(
+                cursor, [(user_id, server_id, amount, transaction_type) for user_id, _ in updates]
+            )
+            for user_id, new_balance in updates:
+                self._record_balance_change(server_id, user_id, new_balance)
+            outcome = (len(updates), len(current) - len(updates))
             return True
+
+        try:
+            self._execute_write(operation, idempotency_key)
         except sqlite3.Error as e:
-            if conn:
-                conn.rollback()
-            self.logger.error(f"Error transferring credits: {e}")
+            self.logger.error(f"Error adjusting credits for {len(members)} users in server {server_id}: {e}")
+            raise
+        return outcome
+
+    @_timed
+    def get_available_credits(self, user_id: str, server_id: str) -> Optional[int]:
+        """Get a user's balance minus credits reserved by unexpired holds"""
+        try:
+            with self._get_read_connection() as conn:
+                return self._get_available_credits_internal(conn.cursor(), user_id, server_id)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting available credits: {e}")
+            return None
+
+    @_timed
+    def hold(self, user_id: str, server_id: str, amount: int, ttl: float, reason: str = "") -> Optional[int]:
+        """
+        Reserve credits against a user's available balance.
+
+        Args:
+            user_id: The user's ID
+            server_id: The server's ID
+            amount: Credits to reserve
+            ttl: Seconds until the hold expires and the credits become available again
+            reason: What the hold is for (for logging/debugging)
+
+        Returns:
+            The hold ID, or None if the user can't cover the amount
+        """
+        if amount <= 0:
+            self.logger.warning(f"Invalid hold amount: {amount}")
+            return None
+
+        def operation(cursor: sqlite3.Cursor):
+            available = self._get_available_credits_internal(cursor, user_id, server_id)
+            if available is None or available < amount:
+                return False
+            cursor.execute(
+                "INSERT INTO credit_holds (user_id, server_id, amount, reason, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (user_id, server_id, amount, reason, time.time() + ttl)
+            )
+            return cursor.lastrowid
+
+        try:
+            return self._execute_write(operation) or None
+        except sqlite3.Error as e:
+            self.logger.error(f"Error placing hold: {e}")
+            return None
+
+    def _pop_hold_internal(self, cursor: sqlite3.Cursor, hold_id: int) -> Optional[CreditHold]:
+        """Internal method to delete an unexpired hold and return it using an existing cursor."""
+        cursor.execute(
+            "SELECT hold_id, user_id, server_id, amount, reason, expires_at FROM credit_holds WHERE hold_id = ?",
+            (hold_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute("DELETE FROM credit_holds WHERE hold_id = ?", (hold_id,))
+        if row['expires_at'] <= time.time():
+            return None
+        return CreditHold(
+            hold_id=row['hold_id'],
+            user_id=row['user_id'],
+            server_id=row['server_id'],
+            amount=row['amount'],
+            reason=row['reason'],
+            expires_at=row['expires_at']
+        )
+
+    @_timed
+    def capture(self, hold_id: int, reason: str = "", recipient_id: Optional[str] = None,
+                recipient_reason: str = "", idempotency_key: Optional[str] = None) -> bool:
+        """
+        Settle a hold: debit the held credits and optionally credit them to another user, atomically.
+
+        Args:
+            hold_id: The hold to capture
+            reason: Transaction type for the debit from the holder
+            recipient_id: Optional user (same server) who receives the credits
+            recipient_reason: Transaction type for the credit to the recipient
+            idempotency_key: Optional caller-supplied key; retrying with the same key never applies twice
+
+        Returns:
+            True if captured, False if the hold is missing or expired
+        """
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            hold = self._pop_hold_internal(cursor, hold_id)
+            if hold is None:
+                return False
+            # The hold was just removed, so its amount is part of the available balance again
+            if not self._subtract_credits_internal(cursor, hold.user_id, hold.server_id, hold.amount, reason, idempotency_key):
+                return False
+            if recipient_id is not None:
+                return self._add_credits_internal(cursor, recipient_id, hold.server_id, hold.amount, recipient_reason)
+            return True
+
+        try:
+            return self._execute_write(operation, idempotency_key)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error capturing hold {hold_id}: {e}")
             return False
-        finally:
-            if conn:
-                conn.close()
 
+    @_timed
+    def release(self, hold_id: int) -> bool:
+        """Cancel a hold, returning the credits to the available balance"""
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            cursor.execute("DELETE FROM credit_holds WHERE hold_id = ?", (hold_id,))
+            return cursor.rowcount > 0
+
+        try:
+            return self._execute_write(operation)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error releasing hold {hold_id}: {e}")
+            return False
+
+    @_timed
+    def sweep_expired_holds(self) -> int:
+        """Delete all expired holds in one statement; returns how many were removed"""
+        def operation(cursor: sqlite3.Cursor) -> int:
+            cursor.execute("DELETE FROM credit_holds WHERE expires_at <= ?", (time.time(),))
+            return cursor.rowcount
+
+        try:
+            return self._execute_write(operation)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error sweeping expired holds: {e}")
+            return 0
+
+    @_timed
+    def has_claimed_period_reward(self, reward: str, user_id: str, server_id: str, period_start: int) -> bool:
+        """Check whether a user already claimed a once-per-period reward"""
+        try:
+            with self._get_read_connection() as conn:
+                cursor = conn.execute(
+                    """
+                    SELECT 1 FROM period_reward_claims
+                    WHERE reward = ? AND server_id = ? AND user_id = ? AND period_start = ?
+                    """,
+                    (reward, server_id, user_id, period_start)
+                )
+                return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            self.logger.error(f"Error checking {reward} claim for user {user_id}: {e}")
+            # Fail closed: a lookup error must not hand out a second reward
+            return True
+
+    @_timed
+    def claim_period_reward(self, reward: str, user_id: str, server_id: str, period_start: int,
+                            amount: int, transaction_type: str, idempotency_key: Optional[str] = None) -> bool:
+        """
+        Record a once-per-period reward claim and pay it, atomically.
+
+        Args:
+            reward: Name of the reward (e.g. "rfi")
+            user_id: User claiming the reward
+            server_id: Server the reward is for
+            period_start: Epoch seconds of the reset period being claimed (see clock.reset_clock)
+            amount: Credits to award
+            transaction_type: Transaction type for the ledger entry
+            idempotency_key: Optional caller-supplied key; retrying with the same key never applies twice
+
+        Returns:
+            True if the reward was paid, False if it was already claimed this period or the payment failed
+        """
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO period_reward_claims (reward, server_id, user_id, period_start, amount)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (reward, server_id, user_id, period_start, amount)
+            )
+            if cursor.rowcount == 0:
+                return False
+            return self._add_credits_internal(cursor, user_id, server_id, amount, transaction_type, idempotency_key)
+
+        try:
+            return self._execute_write(operation, idempotency_key)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error claiming {reward} reward for user {user_id} in server {server_id}: {e}")
+            return False
+
+    @_timed
+    def prune_period_reward_claims(self, before: int) -> int:
+        """Delete claim records for periods that started before the given epoch time; returns how many were removed"""
+        def operation(cursor: sqlite3.Cursor) -> int:
+            cursor.execute("DELETE FROM period_reward_claims WHERE period_start < ?", (before,))
+            return cursor.rowcount
+
+        try:
+            return self._execute_write(operation)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error pruning period reward claims: {e}")
+            return 0
+
+    @_timed
     def log_transaction(self, user_id: str, server_id: str, amount: int, transaction_type: str, description: str = "") -> bool:
         """Log a transaction in the transactions table"""
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                success = self._log_transaction_internal(cursor, user_id, server_id, amount, transaction_type, description)
-                conn.commit()
-                return success
+            return self._execute_write(
+                lambda cursor: self._log_transaction_internal(cursor, user_id, server_id, amount, transaction_type, description)
+            )
         except sqlite3.Error as e:
             self.logger.error(f"Error logging transaction: {e}")
             return False
 
-    def get_leaderboard(self, server_id: str, limit: int = 10) -> List[UserCredits]:
-        """Get the leaderboard for a server"""
+    @_timed
+    def get_leaderboard(self, server_id: str, limit: int = 10,
+                        after: Optional[Tuple[int, str]] = None) -> List[UserCredits]:
+        """
+        Get the leaderboard for a server, richest first (ties broken by user ID).
+
+        Args:
+            server_id: The server's ID
+            limit: Maximum number of entries to return
+            after: Keyset cursor (credits, user_id) of the last entry of the previous
+                page; only entries ranked below it are returned
+        """
+        conditions = ["server_id = ?"]
+        params: List[Any] = [server_id]
+        if after:
+            credits, user_id = after
+            # credits <= ? bounds the index range; the OR only filters the tie group at the boundary
+            conditions.append("credits <= ? AND (credits < ? OR user_id > ?)")
+            params.extend([credits, credits, user_id])
+        params.append(limit)
+
         try:
-            with self._get_connection() as conn:
+            with self._get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    """
+                    f"""
                     SELECT user_id, server_id, credits, last_transaction, last_daily_reward
                     FROM user_credits
-                    WHERE server_id = ?
-                    ORDER BY credits DESC
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY credits DESC, user_id
                     LIMIT ?
                     """,
-                    (server_id, limit)
+                    params
                 )
                 
                 return [
@@ -433,10 +1242,38 @@ class CreditsDatabase:
             self.logger.error(f"Error getting leaderboard: {e}")
             return []
 
+    @_timed
+    def count_ranked_users(self, server_id: str) -> int:
+        """Number of users with a balance in a server"""
+        try:
+            with self._get_read_connection() as conn:
+                return conn.execute("SELECT COUNT(*) FROM user_credits WHERE server_id = ?", (server_id,)).fetchone()[0]
+        except sqlite3.Error as e:
+            self.logger.error(f"Error counting users: {e}")
+            return 0
+
+    @_timed
+    def get_usernames(self, user_ids: List[str]) -> Dict[str, str]:
+        """Get stored usernames for a batch of users; users without a row are left out"""
+        if not user_ids:
+            return {}
+        try:
+            with self._get_read_connection() as conn:
+                placeholders = ", ".join("?" for _ in user_ids)
+                cursor = conn.execute(
+                    f"SELECT user_id, username FROM users WHERE user_id IN ({placeholders})",
+                    list(user_ids)
+                )
+                return {row['user_id']: row['username'] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting usernames: {e}")
+            return {}
+
+    @_timed
     def get_bottom_users(self, server_id: str) -> List[UserCredits]:
         """Get the users with the lowest credit amount in a server"""
         try:
-            with self._get_connection() as conn:
+            with self._get_read_connection() as conn:
                 cursor = conn.cursor()
                 # Find the minimum credit amount
                 cursor.execute(
@@ -473,21 +1310,45 @@ class CreditsDatabase:
             self.logger.error(f"Error getting bottom users: {e}")
             return []
 
-    def get_user_transactions(self, user_id: str, server_id: str, limit: int = 10) -> List[Transaction]:
-        """Get a user's transaction history"""
+    @_timed
+    def get_user_transactions(self, user_id: str, server_id: str, limit: int = 10,
+                              before: Optional[Tuple[datetime.datetime, int]] = None,
+                              transaction_type: Optional[str] = None) -> List[Transaction]:
+        """
+        Get a user's transaction history, newest first.
+
+        Args:
+            user_id: The user's ID
+            server_id: The server's ID
+            limit: Maximum number of transactions to return
+            before: Keyset cursor (created_at, transaction_id) of the last row of the
+                previous page; only older transactions are returned
+            transaction_type: Optional transaction type to filter on
+        """
+        conditions = ["user_id = ?", "server_id = ?"]
+        params: List[Any] = [user_id, server_id]
+        if transaction_type:
+            conditions.append("transaction_type = ?")
+            params.append(transaction_type)
+        if before:
+            created_at, transaction_id = before
+            conditions.append("(created_at, transaction_id) < (?, ?)")
+            params.extend([created_at.isoformat(sep=' '), transaction_id])
+        params.append(limit)
+
         try:
-            with self._get_connection() as conn:
+            with self._get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    """
+                    f"""
                     SELECT transaction_id, user_id, server_id, amount, new_balance, 
                            transaction_type, description, created_at
                     FROM transactions
-                    WHERE user_id = ? AND server_id = ?
-                    ORDER BY created_at DESC
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY created_at DESC, transaction_id DESC
                     LIMIT ?
                     """,
-                    (user_id, server_id, limit)
+                    params
                 )
                 
                 return [
@@ -507,64 +1368,129 @@ class CreditsDatabase:
             self.logger.error(f"Error getting user transactions: {e}")
             return []
 
-    def can_claim_daily_reward(self, user_id: str, server_id: str) -> bool:
-        """Check if a user can claim their daily reward based on a fixed daily reset time."""
+    @_timed
+    def get_period_leaderboard(self, server_id: str, since_day: datetime.date,
+                               transaction_types: Optional[List[str]] = None,
+                               limit: int = 10, ascending: bool = False) -> List[PeriodTotal]:
+        """
+        Rank users by net credit change since a given local day, from the daily rollups.
+
+        Args:
+            server_id: The server's ID
+            since_day: First local day (inclusive) of the window
+            transaction_types: Only count these types; defaults to every type except
+                config.PERIOD_LEADERBOARD_EXCLUDED_TYPES
+            limit: Maximum number of users to return
+            ascending: Rank biggest losers first instead of biggest earners
+        """
+        params: List[Any] = [server_id, since_day.isoformat()]
+        if transaction_types:
+            type_filter = f"type IN ({', '.join('?' for _ in transaction_types)})"
+            params.extend(transaction_types)
+        else:
+            type_filter = f"type NOT IN ({', '.join('?' for _ in config.PERIOD_LEADERBOARD_EXCLUDED_TYPES)})"
+            params.extend(config.PERIOD_LEADERBOARD_EXCLUDED_TYPES)
+        params.append(limit)
+
         try:
-            with self._get_connection() as conn:
+            with self._get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    "SELECT last_daily_reward FROM user_credits WHERE user_id = ? AND server_id = ?",
-                    (user_id, server_id)
+                    f"""
+                    SELECT user_id, SUM(net) AS net, SUM(transaction_count) AS transaction_count
+                    FROM daily_user_totals
+                    WHERE server_id = ? AND day >= ? AND {type_filter}
+                    GROUP BY user_id
+                    ORDER BY net {'ASC' if ascending else 'DESC'}, user_id
+                    LIMIT ?
+                    """,
+                    params
                 )
-                
-                result = cursor.fetchone()
-                if not result or not result['last_daily_reward']:
-                    return True # User has never claimed, so they can claim
-
-                last_reward_str = result['last_daily_reward']
-                
-                # SQLite stores TIMESTAMP as string in ISO format. It's usually UTC unless specified.
-                # Assume stored timestamps are UTC.
-                last_reward_utc = datetime.datetime.fromisoformat(last_reward_str).replace(tzinfo=datetime.timezone.utc)
-                
-                # Convert last_reward to the configured daily reset timezone
-                last_reward_local = last_reward_utc.astimezone(config.DAILY_RESET_TIMEZONE)
-
-                # Get the current time in the configured daily reset timezone
-                now_local = datetime.datetime.now(config.DAILY_RESET_TIMEZONE)
+                return [
+                    PeriodTotal(
+                        user_id=row['user_id'],
+                        server_id=server_id,
+                        net=row['net'],
+                        transaction_count=row['transaction_count']
+                    )
+                    for row in cursor.fetchall()
+                ]
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting period leaderboard: {e}")
+            return []
 
-                # Calculate today's midnight in the configured daily reset timezone
-                today_midnight_local = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
+    @_timed
+    def get_global_leaderboard(self, limit: int = 10) -> List[GlobalTotal]:
+        """Get the users with the most credits summed across all servers"""
+        try:
+            with self._get_read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT user_id, total_credits, server_count
+                    FROM user_global_totals
+                    WHERE server_count > 0
+                    ORDER BY total_credits DESC, user_id
+                    LIMIT ?
+                    """,
+                    (limit,)
+                )
+                return [
+                    GlobalTotal(
+                        user_id=row['user_id'],
+                        total_credits=row['total_credits'],
+                        server_count=row['server_count']
+                    )
+                    for row in cursor.fetchall()
+                ]
+        except sqlite3.Error as e:
+            self.logger.error(f"Error getting global leaderboard: {e}")
+            return []
 
-                # If the last reward was before today's midnight in the local timezone, they can claim
-                return last_reward_local < today_midnight_local
+    def _can_claim_daily_internal(self, cursor: sqlite3.Cursor, user_id: str, server_id: str) -> bool:
+        """Internal method to check daily reward eligibility using an existing cursor."""
+        cursor.execute(
+            "SELECT CAST(strftime('%s', last_daily_reward) AS INTEGER) FROM user_credits WHERE user_id = ? AND server_id = ?",
+            (user_id, server_id)
+        )
+        result = cursor.fetchone()
+        # Stored timestamps are UTC; a claim inside the current reset period blocks another one
+        return not result or not reset_clock.in_current_period(result[0])
 
-        except Exception as e: # Catch general Exception for robustness, including ZoneInfo-related errors
+    @_timed
+    def can_claim_daily_reward(self, user_id: str, server_id: str) -> bool:
+        """Check if a user can claim their daily reward based on a fixed daily reset time."""
+        try:
+            with self._get_read_connection() as conn:
+                return self._can_claim_daily_internal(conn.cursor(), user_id, server_id)
+        except sqlite3.Error as e:
             self.logger.error(f"Error checking daily reward eligibility: {e}")
             return False
 
+    @_timed
     def claim_daily_reward(self, user_id: str, server_id: str) -> bool:
         """Claim daily reward for a user"""
         if not self.can_claim_daily_reward(user_id, server_id):
             return False
-            
-        success_add = self.add_credits(user_id, server_id, config.daily_reward, "daily")
-        
-        if success_add:
-            try:
-                with self._get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "UPDATE user_credits SET last_daily_reward = CURRENT_TIMESTAMP WHERE user_id = ? AND server_id = ?",
-                        (user_id, server_id)
-                    )
-                    conn.commit()
-                    return True
-            except sqlite3.Error as e:
-                self.logger.error(f"Error updating last_daily_reward for user {user_id} in server {server_id}: {e}")
-                # If updating fails, consider rolling back the add_credits or handling as a partial failure
+
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            # Re-check under the write lock so two concurrent claims can't both pass
+            if not self._can_claim_daily_internal(cursor, user_id, server_id):
+                return False
+            if not self._add_credits_internal(cursor, user_id, server_id, config.daily_reward, "daily"):
                 return False
-        return False
+            cursor.execute(
+                "UPDATE user_credits SET last_daily_reward = CURRENT_TIMESTAMP WHERE user_id = ? AND server_id = ?",
+                (user_id, server_id)
+            )
+            return True
+
+        try:
+            # The reward and the claim timestamp commit together, so a failure can't pay out twice
+            return self._execute_write(operation)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error claiming daily reward for user {user_id} in server {server_id}: {e}")
+            return False
 
     def backup_database(self, backup_path: Optional[str] = None) -> bool:
         """Create a backup of the database"""
@@ -595,6 +1521,7 @@ class CreditsDatabase:
             # Copy backup file over main database
             import shutil
             shutil.copy2(backup_path, self.db_path)
+            self._notify_balance_listeners([(None, None, None)])
 
             self.logger.info(f"Database restored from {backup_path}")
             return True
@@ -602,10 +1529,11 @@ class CreditsDatabase:
             self.logger.error(f"Restore failed: {e}")
             return False
 
+    @_timed
     def get_server_stats(self, server_id: str) -> Dict[str, Any]:
         """Get statistics for a server"""
         try:
-            with self._get_connection() as conn:
+            with self._get_read_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Total users with credits
@@ -634,37 +1562,36 @@ class CreditsDatabase:
             self.logger.error(f"Error getting server stats: {e}")
             return {}
 
+    @_timed
     def update_user_info(self, user_id: str, username: str, discriminator: Optional[str] = None) -> bool:
         """Update user information"""
-        try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Check if username or discriminator changed
-                cursor.execute("SELECT username, discriminator FROM users WHERE user_id = ?", (user_id,))
-                existing = cursor.fetchone()
-                
-                if existing:
-                    if existing['username'] != username or existing['discriminator'] != discriminator:
-                        cursor.execute(
-                            "UPDATE users SET username = ?, discriminator = ?, last_username_change = CURRENT_TIMESTAMP WHERE user_id = ?",
-                            (username, discriminator, user_id)
-                        )
-                    
-                    # Always update last_seen, regardless of username/discriminator change
-                    cursor.execute(
-                        "UPDATE users SET last_seen = CURRENT_TIMESTAMP WHERE user_id = ?",
-                        (user_id,)
-                    )
-                else:
-                    # User doesn't exist, add them (this handles cases where a user might be seen without being explicitly "ensured")
+        def operation(cursor: sqlite3.Cursor) -> bool:
+            # Check if username or discriminator changed
+            cursor.execute("SELECT username, discriminator FROM users WHERE user_id = ?", (user_id,))
+            existing = cursor.fetchone()
+            
+            if existing:
+                if existing['username'] != username or existing['discriminator'] != discriminator:
                     cursor.execute(
-                        "INSERT INTO users (user_id, username, discriminator) VALUES (?, ?, ?)",
-                        (user_id, username, discriminator)
+                        "UPDATE users SET username = ?, discriminator = ?, last_username_change = CURRENT_TIMESTAMP WHERE user_id = ?",
+                        (username, discriminator, user_id)
                     )
                 
-                conn.commit()
-                return True
+                # Always update last_seen, regardless of username/discriminator change
+                cursor.execute(
+                    "UPDATE users SET last_seen = CURRENT_TIMESTAMP WHERE user_id = ?",
+                    (user_id,)
+                )
+            else:
+                # User doesn't exist, add them (this handles cases where a user might be seen without being explicitly "ensured")
+                cursor.execute(
+                    "INSERT INTO users (user_id, username, discriminator) VALUES (?, ?, ?)",
+                    (user_id, username, discriminator)
+                )
+            return True
+
+        try:
+            return self._execute_write(operation)
         except sqlite3.Error as e:
             self.logger.error(f"Error updating user info: {e}")
             return False
\ No newline at end of file
@@ -0,0 +1,120 @@
+import time
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, FrozenSet, Tuple, Iterable
+
+from .config import config
+
+
+@dataclass
+class _CachedBoard:
+    """A rendered leaderboard and what it takes for a balance change to alter it"""
+    payload: Dict[str, Any]    # Keyword arguments for ctx.send (embed and/or content)
+    user_ids: FrozenSet[str]   # Users shown on the board
+    threshold: int             # Balance a user must reach (top) or fall to (bottom) to get on the board
+    ascending: bool            # False for top-N boards, True for bottom boards
+    full: bool                 # Top-N boards only: False if fewer than N users exist, so anyone gets on
+    expires_at: float
+
+
+class LeaderboardCache:
+    """
+    Per-guild cache of rendered leaderboard payloads.
+
+    Boards are dropped only when a committed balance change could alter them: a change
+    for someone already on the board, or a new balance that crosses the board's entry
+    threshold. Everything else (the vast majority of writes in a busy guild) leaves the
+    cache alone, so repeated !leaderboard/!top/!bottom calls need no DB or REST work.
+    Balance changes arrive from CreditsDatabase on writer threads, hence the lock.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else config.leaderboard_cache_ttl_seconds
+        self._boards: Dict[str, Dict[str, _CachedBoard]] = {}  # server_id -> board key -> board
+        self._generations: Dict[Optional[str], int] = {}  # server_id -> balance changes seen (None: global resets)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, server_id: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached send() payload for a board, or None"""
+        with self._lock:
+            board = self._boards.get(server_id, {}).get(key)
+            if board is None or board.expires_at <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return board.payload
+
+    def generation(self, server_id: str) -> Tuple[int, int]:
+        """Token to take before querying a board; put() discards boards whose data may have changed since"""
+        with self._lock:
+            return self._generations.get(None, 0), self._generations.get(server_id, 0)
+
+    def put(self, server_id: str, key: str, payload: Dict[str, Any], entries: Iterable[Tuple[str, int]],
+            ascending: bool = False, limit: Optional[int] = None, generation: Optional[Tuple[int, int]] = None):
+        """
+        Cache a rendered board.
+
+        Args:
+            server_id: Guild the board belongs to
+            key: Board name (e.g. "leaderboard", "top", "bottom")
+            payload: Keyword arguments for ctx.send
+            entries: (user_id, credits) for every user on the board
+            ascending: True for boards of the lowest balances
+            limit: The board's size limit, if it has one
+            generation: Token from generation() taken before the board was queried
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        balances = [credits for _, credits in entries]
+        board = _CachedBoard(
+            payload=payload,
+            user_ids=frozenset(user_id for user_id, _ in entries),
+            threshold=max(balances) if ascending else min(balances),
+            ascending=ascending,
+            full=limit is None or len(entries) >= limit,
+            expires_at=time.monotonic() + self.ttl
+        )
+        with self._lock:
+            current = (self._generations.get(None, 0), self._generations.get(server_id, 0))
+            if generation is not None and generation != current:
+                return  # A balance changed while the board was being built
+            self._boards.setdefault(server_id, {})[key] = board
+
+    @staticmethod
+    def _affects(board: _CachedBoard, user_id: str, new_balance: int) -> bool:
+        if user_id in board.user_ids:
+            return True
+        if board.ascending:
+            return new_balance <= board.threshold
+        return not board.full or new_balance >= board.threshold
+
+    def on_balance_change(self, server_id: Optional[str], user_id: Optional[str], new_balance: Optional[int]):
+        """CreditsDatabase balance listener: drop every board the change could alter"""
+        with self._lock:
+            self._generations[server_id] = self._generations.get(server_id, 0) + 1
+            if server_id is None:
+                self._boards.clear()
+                return
+            boards = self._boards.get(server_id)
+            if not boards:
+                return
+            for key in [key for key, board in boards.items() if self._affects(board, user_id, new_balance)]:
+                del boards[key]
+
+    def invalidate_user(self, user_id: str):
+        """Drop every board showing a user, in any guild (e.g. after a rename)"""
+        with self._lock:
+            for boards in self._boards.values():
+                for key in [key for key, board in boards.items() if user_id in board.user_ids]:
+                    del boards[key]
+
+    def invalidate(self, server_id: Optional[str] = None):
+        """Drop all boards for a guild, or for every guild"""
+        with self._lock:
+            if server_id is None:
+                self._boards.clear()
+            else:
+                self._boards.pop(server_id, None)
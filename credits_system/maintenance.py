@@ -0,0 +1,157 @@
+import os
+import time
+import sqlite3
+import logging
+import datetime
+from dataclasses import dataclass, field
+from typing import Optional, List
+
+from .database import CreditsDatabase
+from .config import config
+from .clock import reset_clock
+
+
+@dataclass
+class MaintenanceReport:
+    """Metrics produced by one maintenance run"""
+    started_at: datetime.datetime
+    duration_ms: float = 0.0
+    wal_bytes_before: int = 0
+    wal_bytes_after: int = 0
+    checkpoint_mode: Optional[str] = None     # PASSIVE, TRUNCATE or None if skipped
+    checkpoint_busy: bool = False             # True if readers/writers prevented a full checkpoint
+    checkpoint_frames: int = 0                # Frames in the WAL when checkpointing
+    checkpointed_frames: int = 0              # Frames copied back into the database
+    optimized: bool = False
+    analyzed: bool = False
+    vacuum_mode: Optional[str] = None         # incremental, full or None if skipped
+    page_count: int = 0
+    page_size: int = 0
+    freelist_pages_before: int = 0
+    freelist_pages_after: int = 0
+    reward_claims_pruned: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def pages_reclaimed(self) -> int:
+        return max(0, self.freelist_pages_before - self.freelist_pages_after)
+
+    def summary(self) -> str:
+        """One-line summary for logs"""
+        return (
+            f"WAL {self.wal_bytes_before} -> {self.wal_bytes_after} bytes "
+            f"(checkpoint: {self.checkpoint_mode or 'skipped'}{', busy' if self.checkpoint_busy else ''}), "
+            f"optimize: {self.optimized}, analyze: {self.analyzed}, "
+            f"free pages {self.freelist_pages_before} -> {self.freelist_pages_after} of {self.page_count} "
+            f"(vacuum: {self.vacuum_mode or 'skipped'}), "
+            f"pruned {self.reward_claims_pruned} reward claims, took {self.duration_ms:.1f} ms"
+        )
+
+
+class DatabaseMaintenance:
+    """
+    Periodic SQLite housekeeping for the credits database.
+
+    Each run checkpoints the WAL once it passes a size threshold (PASSIVE, or TRUNCATE
+    above a larger threshold), runs PRAGMA optimize, runs ANALYZE on a longer interval,
+    reclaims free pages and prunes old reward claims. run() is blocking and is meant
+    to be called off the event loop.
+    """
+
+    def __init__(self, db: CreditsDatabase):
+        self.db = db
+        self.logger = logging.getLogger('CreditsMaintenance')
+        self.last_analyze: Optional[float] = None
+        self.last_report: Optional[MaintenanceReport] = None
+        self.run_count = 0
+
+    @property
+    def wal_path(self) -> str:
+        return f"{self.db.db_path}-wal"
+
+    def _wal_size(self) -> int:
+        try:
+            return os.path.getsize(self.wal_path)
+        except OSError:
+            return 0
+
+    def checkpoint(self, mode: str = "PASSIVE") -> tuple:
+        """Run a WAL checkpoint and return SQLite's (busy, log_frames, checkpointed_frames)"""
+        with self.db._get_connection() as conn:
+            return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+    def run(self, force_analyze: bool = False) -> MaintenanceReport:
+        """Run one maintenance pass and return its metrics"""
+        report = MaintenanceReport(started_at=datetime.datetime.now(datetime.timezone.utc))
+        start = time.perf_counter()
+        report.wal_bytes_before = self._wal_size()
+
+        # WAL checkpoint, only once the log has grown past the threshold
+        if report.wal_bytes_before >= config.wal_checkpoint_threshold_bytes:
+            mode = "TRUNCATE" if report.wal_bytes_before >= config.wal_truncate_threshold_bytes else "PASSIVE"
+            try:
+                busy, log_frames, checkpointed = self.checkpoint(mode)
+                report.checkpoint_mode = mode
+                report.checkpoint_busy = bool(busy)
+                report.checkpoint_frames = log_frames
+                report.checkpointed_frames = checkpointed
+            except sqlite3.Error as e:
+                report.errors.append(f"checkpoint: {e}")
+
+        # Claim records are only consulted for the current period; keep a short history
+        retention = config.period_reward_retention_days * 86400
+        report.reward_claims_pruned = self.db.prune_period_reward_claims(reset_clock.period_start - retention)
+
+        conn = self.db._get_connection()
+        try:
+            # Planner statistics
+            try:
+                conn.execute("PRAGMA optimize")
+                report.optimized = True
+                analyze_due = (
+                    self.last_analyze is None
+                    or time.monotonic() - self.last_analyze >= config.analyze_interval_hours * 3600
+                )
+                if force_analyze or analyze_due:
+                    conn.execute("ANALYZE")
+                    conn.commit()
+                    self.last_analyze = time.monotonic()
+                    report.analyzed = True
+            except sqlite3.Error as e:
+                report.errors.append(f"optimize/analyze: {e}")
+
+            # Free-page reclamation
+            try:
+                report.page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                report.page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+                report.freelist_pages_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+                free_ratio = report.freelist_pages_before / report.page_count if report.page_count else 0.0
+
+                if auto_vacuum == 2 and report.freelist_pages_before > 0:
+                    # executescript steps the pragma to completion; execute() frees a single page
+                    conn.executescript(f"PRAGMA incremental_vacuum({config.incremental_vacuum_pages});")
+                    report.vacuum_mode = "incremental"
+                elif auto_vacuum != 2 and free_ratio >= config.vacuum_free_ratio:
+                    # A full VACUUM is needed once to switch the file to incremental auto-vacuum;
+                    # after that, free pages are reclaimed a chunk at a time.
+                    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    conn.execute("VACUUM")
+                    report.vacuum_mode = "full"
+
+                report.freelist_pages_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                report.page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            except sqlite3.Error as e:
+                report.errors.append(f"vacuum: {e}")
+        finally:
+            conn.close()
+
+        report.wal_bytes_after = self._wal_size()
+        report.duration_ms = (time.perf_counter() - start) * 1000
+        self.run_count += 1
+        self.last_report = report
+
+        if report.errors:
+            self.logger.warning(f"Database maintenance finished with errors: {'; '.join(report.errors)}")
+        self.logger.info(f"Database maintenance: {report.summary()}")
+        return report
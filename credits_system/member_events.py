@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from typing import Optional, List, Dict, Tuple, Callable
+
+from .database import CreditsDatabase
+from .config import config
+
+
+class MemberUpdatePipeline:
+    """
+    Debounced, batched username updates.
+
+    Event handlers call submit(), which only records the latest name per user and, the
+    first time a user goes pending, puts their ID on a queue: O(1) on the event loop.
+    A consumer task waits out a debounce window after the first pending user, drains
+    the queue and writes every pending rename in one transaction off the loop. Repeated
+    updates for the same user inside the window collapse into a single write.
+    """
+
+    def __init__(self, db: CreditsDatabase, debounce: Optional[float] = None, batch_size: Optional[int] = None):
+        self.db = db
+        self.debounce = debounce if debounce is not None else config.member_update_debounce_seconds
+        self.batch_size = batch_size or config.member_update_batch_size
+        self.logger = logging.getLogger('MemberUpdatePipeline')
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self.pending: Dict[str, str] = {}  # user_id -> latest username
+        self.flush_listeners: List[Callable[[List[str]], None]] = []
+        self.task: Optional[asyncio.Task] = None
+        self.events_received = 0
+        self.writes = 0
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._consume())
+
+    def submit(self, user_id: str, username: str):
+        """Record a username change; the write happens later, batched with others"""
+        self.events_received += 1
+        if user_id not in self.pending:
+            self.queue.put_nowait(user_id)
+        self.pending[user_id] = username
+
+    def add_flush_listener(self, listener: Callable[[List[str]], None]):
+        """Register a callback run with the user IDs of every batch after it is written"""
+        self.flush_listeners.append(listener)
+
+    def _take_batch(self) -> List[Tuple[str, str]]:
+        batch = []
+        while len(batch) < self.batch_size and not self.queue.empty():
+            user_id = self.queue.get_nowait()
+            username = self.pending.pop(user_id, None)
+            if username is not None:
+                batch.append((user_id, username))
+        return batch
+
+    def _notify(self, batch: List[Tuple[str, str]]):
+        user_ids = [user_id for user_id, _ in batch]
+        for listener in self.flush_listeners:
+            try:
+                listener(user_ids)
+            except Exception as e:
+                self.logger.error(f"Member update flush listener failed: {e}")
+
+    async def _consume(self):
+        while True:
+            # Wait for the first pending user, then let the window fill up
+            first = await self.queue.get()
+            self.queue.put_nowait(first)
+            await asyncio.sleep(self.debounce)
+            while not self.queue.empty():
+                batch = self._take_batch()
+                if not batch:
+                    continue
+                try:
+                    written = await self.db.run_write(self.db.update_users_info, batch)
+                except Exception as e:
+                    self.logger.error(f"Error flushing username updates: {e}")
+                    continue
+                if written:
+                    self.writes += 1
+                    self._notify(batch)
+                else:
+                    self.logger.error(f"Failed to write {len(batch)} username update(s)")
+
+    def flush(self):
+        """Write everything still pending right away (blocking), e.g. on unload or shutdown"""
+        while not self.queue.empty():
+            batch = self._take_batch()
+            if batch and self.db.update_users_info(batch):
+                self.writes += 1
+                self._notify(batch)
+
+    def stop(self):
+        """Stop the consumer and flush what is pending"""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        self.flush()
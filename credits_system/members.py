@@ -0,0 +1,47 @@
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+
+import discord
+
+from .config import config
+
+logger = logging.getLogger('CreditsMembers')
+
+# Member list requests in flight, per guild; concurrent callers share one request
+_requests: Dict[int, "asyncio.Task[Tuple[List[discord.Member], bool]]"] = {}
+
+
+async def _request_members(guild: discord.Guild) -> Tuple[List[discord.Member], bool]:
+    # The same check discord.py's member converters use to decide whether to cache query results
+    cache = guild._state.member_cache_flags.joined
+    try:
+        members = await asyncio.wait_for(guild.chunk(cache=cache), timeout=config.member_chunk_timeout_seconds)
+        return members, True
+    except (asyncio.TimeoutError, discord.ClientException, discord.HTTPException) as e:
+        logger.warning(f"Could not fetch the member list of {guild.name} ({guild.id}): {e!r}")
+        return list(guild.members), False
+
+
+async def guild_members(guild: discord.Guild) -> Tuple[List[discord.Member], bool]:
+    """
+    A guild's full member list, fetched from the gateway if the cache doesn't hold it.
+
+    With a reduced member cache, or with chunking at startup turned off, guild.members
+    only holds the members seen so far. For such a guild the full list is requested on
+    demand. It is kept in the cache only if the bot's cache policy keeps joined members;
+    otherwise it is dropped once the caller is done with it.
+
+    Returns:
+        (members, complete). If the request fails, the cached members are returned
+        with complete=False.
+    """
+    if guild.chunked:
+        return list(guild.members), True
+    request = _requests.get(guild.id)
+    if request is None:
+        request = asyncio.ensure_future(_request_members(guild))
+        _requests[guild.id] = request
+        request.add_done_callback(lambda _: _requests.pop(guild.id, None))
+    # Shielded so one caller giving up doesn't cancel the request for the others
+    return await asyncio.shield(request)
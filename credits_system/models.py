@@ -26,6 +26,34 @@ class Transaction:
     created_at: Optional[datetime.datetime] = None
 
 
+@dataclass
+class PeriodTotal:
+    """Represents a user's net credit change over a time window"""
+    user_id: str
+    server_id: str
+    net: int
+    transaction_count: int = 0
+
+
+@dataclass
+class GlobalTotal:
+    """Represents a user's credit balance summed across every server"""
+    user_id: str
+    total_credits: int
+    server_count: int
+
+
+@dataclass
+class CreditHold:
+    """Represents credits reserved (escrowed) against a user's available balance"""
+    hold_id: int
+    user_id: str
+    server_id: str
+    amount: int
+    reason: str
+    expires_at: float  # Unix timestamp
+
+
 @dataclass
 class ServerInfo:
     """Represents server information"""
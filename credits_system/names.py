@@ -0,0 +1,102 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
+
+import discord
+from discord.ext import commands
+
+from .database import CreditsDatabase
+from .config import config
+
+
+class NameResolver:
+    """
+    Resolves user IDs to display names for leaderboards.
+
+    Lookups go from cheapest to most expensive: the guild member cache, the bot's user
+    cache, a TTL cache of earlier results, the usernames stored in the credits database
+    (one batched query), and finally REST lookups for whatever is left, run concurrently
+    with a bounded gather. A leaderboard therefore costs at most one round trip of REST
+    latency no matter how cold the caches are.
+    """
+
+    def __init__(self, bot: commands.Bot, db: CreditsDatabase):
+        self.bot = bot
+        self.db = db
+        self.logger = logging.getLogger('NameResolver')
+        self._cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # user_id -> (name, expires at)
+        self._fetch_semaphore = asyncio.Semaphore(config.name_fetch_concurrency)
+
+    def _cached(self, user_id: str) -> Optional[str]:
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return None
+        name, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._cache[user_id]
+            return None
+        self._cache.move_to_end(user_id)
+        return name
+
+    def _remember(self, user_id: str, name: str):
+        self._cache[user_id] = (name, time.monotonic() + config.name_cache_ttl_seconds)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > config.name_cache_size:
+            self._cache.popitem(last=False)
+
+    def forget(self, user_id: str):
+        """Drop a cached name, e.g. after the user renames themselves"""
+        self._cache.pop(user_id, None)
+
+    async def _fetch(self, user_id: str) -> Optional[str]:
+        async with self._fetch_semaphore:
+            try:
+                user = await self.bot.fetch_user(int(user_id))
+                return user.display_name
+            except (discord.NotFound, discord.HTTPException) as e:
+                self.logger.warning(f"Could not fetch user {user_id}: {e}")
+                return None
+
+    async def resolve(self, user_ids: List[str], guild: Optional[discord.Guild] = None) -> Dict[str, str]:
+        """
+        Resolve display names for a batch of users.
+
+        Args:
+            user_ids: User IDs to resolve
+            guild: Guild whose member nicknames should be preferred, if any
+
+        Returns:
+            A name for every requested ID; unresolvable users get "User <id>"
+        """
+        names: Dict[str, str] = {}
+        missing: List[str] = []
+
+        for user_id in dict.fromkeys(user_ids):
+            member = guild.get_member(int(user_id)) if guild else None
+            user = member or self.bot.get_user(int(user_id))
+            if user:
+                names[user_id] = user.display_name
+                continue
+            cached = self._cached(user_id)
+            if cached is not None:
+                names[user_id] = cached
+            else:
+                missing.append(user_id)
+
+        if missing:
+            stored = await self.db.run_read(self.db.get_usernames, missing)
+            for user_id, username in stored.items():
+                names[user_id] = username
+                self._remember(user_id, username)
+            missing = [user_id for user_id in missing if user_id not in stored]
+
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch(user_id) for user_id in missing))
+            for user_id, name in zip(missing, fetched):
+                # Cache failures too, so a deleted account isn't fetched on every request
+                names[user_id] = name or f"User {user_id}"
+                self._remember(user_id, names[user_id])
+
+        return names
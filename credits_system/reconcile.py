@@ -0,0 +1,106 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List
+
+import discord
+from discord.ext import commands
+
+from .database import CreditsDatabase
+from .config import config
+from .members import guild_members
+
+
+@dataclass
+class ReconcileReport:
+    """What one guild's reconciliation changed"""
+    server_id: str
+    members: int = 0
+    users_upserted: int = 0     # New users plus renames
+    balances_created: int = 0   # Members who had no balance in this server
+    departed: int = 0           # Balances whose owner is no longer a member (kept, only counted)
+    duration_ms: float = 0.0
+
+
+class GuildReconciler:
+    """
+    Brings servers, users and user_credits back in line with the guilds after downtime.
+
+    Each guild's full member list (fetched on demand if the member cache doesn't hold
+    it) is walked in chunks. A chunk is diffed against the
+    database with set operations (one batched username lookup per chunk against one
+    snapshot of the guild's balances) and whatever differs is written in a single
+    transaction. Reads use the read pool, writes run off the event loop, and the job
+    sleeps between chunks so it never crowds out command traffic.
+    """
+
+    def __init__(self, bot: commands.Bot, db: CreditsDatabase):
+        self.bot = bot
+        self.db = db
+        self.logger = logging.getLogger('GuildReconciler')
+        self.running = False
+        self.reports: List[ReconcileReport] = []
+
+    async def run(self):
+        """Reconcile every guild the bot is in, one at a time"""
+        if self.running:
+            return
+        self.running = True
+        start = time.perf_counter()
+        try:
+            self.reports = []
+            for guild in list(self.bot.guilds):
+                try:
+                    self.reports.append(await self.reconcile_guild(guild))
+                except Exception as e:
+                    self.logger.error(f"Reconciliation failed for {guild.name} ({guild.id}): {e}")
+            self.logger.info(
+                f"Reconciled {len(self.reports)} guild(s) in {time.perf_counter() - start:.1f}s: "
+                f"{sum(r.users_upserted for r in self.reports)} users upserted, "
+                f"{sum(r.balances_created for r in self.reports)} balances created"
+            )
+        finally:
+            self.running = False
+
+    async def _write(self, func, *args):
+        return await self.db.run_write(func, *args)
+
+    async def reconcile_guild(self, guild: discord.Guild) -> ReconcileReport:
+        """Diff one guild's members against the database and apply the differences"""
+        start = time.perf_counter()
+        server_id = str(guild.id)
+        report = ReconcileReport(server_id=server_id)
+
+        await self._write(self.db.ensure_server_exists, server_id, guild.name)
+        known_balances = await self.db.run_read(self.db.get_server_user_ids, server_id)
+
+        members, complete = await guild_members(guild)
+        report.members = len(members)
+        member_ids = set()
+        for i in range(0, len(members), config.reconcile_chunk_size):
+            chunk = {str(m.id): m.name for m in members[i:i + config.reconcile_chunk_size]}
+            member_ids.update(chunk)
+
+            stored_names = await self.db.run_read(self.db.get_usernames, list(chunk))
+            upserts = [(user_id, name) for user_id, name in chunk.items() if stored_names.get(user_id) != name]
+            initialize = list(chunk.keys() - known_balances)
+
+            if upserts or initialize:
+                created = await self._write(self.db.sync_members, server_id, upserts, initialize)
+                if created is not None:
+                    report.users_upserted += len(upserts)
+                    report.balances_created += created
+            await asyncio.sleep(config.reconcile_chunk_delay_seconds)
+
+        # Only meaningful once the member list is complete
+        if complete:
+            report.departed = len(known_balances - member_ids)
+
+        report.duration_ms = (time.perf_counter() - start) * 1000
+        self.logger.info(
+            f"Reconciled {guild.name} ({server_id}): {report.members} members, "
+            f"{report.users_upserted} users upserted, {report.balances_created} balances created, "
+            f"{report.departed} departed, took {report.duration_ms:.0f} ms"
+        )
+        return report
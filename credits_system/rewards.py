@@ -0,0 +1,70 @@
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .database import CreditsDatabase
+from .clock import ResetClock, reset_clock
+from .config import config
+
+
+class PeriodRewardTracker:
+    """
+    Once-per-period reward claims, persisted in the credits database.
+
+    Claims are stored per (user_id, server_id, period) so they survive restarts and
+    are independent per server. A small LRU of claims made in the current period sits
+    in front of the database; it is cleared when the reset clock rolls over and never
+    holds more than cache_size entries, so memory stays flat however many users claim.
+    """
+
+    def __init__(self, db: CreditsDatabase, reward: str, clock: ResetClock = reset_clock,
+                 cache_size: Optional[int] = None):
+        self.db = db
+        self.reward = reward
+        self.clock = clock
+        self.cache_size = cache_size or config.period_reward_cache_size
+        self.logger = logging.getLogger('PeriodRewardTracker')
+        self._period = clock.period_start
+        self._claimed: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+
+    def _current_period(self) -> int:
+        period = self.clock.period_start
+        if period != self._period:
+            # New period: every cached claim belongs to the previous one
+            self._claimed.clear()
+            self._period = period
+        return period
+
+    def _remember(self, user_id: str, server_id: str):
+        key = (user_id, server_id)
+        self._claimed[key] = None
+        self._claimed.move_to_end(key)
+        if len(self._claimed) > self.cache_size:
+            self._claimed.popitem(last=False)
+
+    async def has_claimed(self, user_id: str, server_id: str) -> bool:
+        """True if the user already claimed this reward in the current period"""
+        period = self._current_period()
+        if (user_id, server_id) in self._claimed:
+            self._claimed.move_to_end((user_id, server_id))
+            return True
+        if await self.db.run_read(self.db.has_claimed_period_reward, self.reward, user_id, server_id, period):
+            self._remember(user_id, server_id)
+            return True
+        return False
+
+    async def claim(self, user_id: str, server_id: str, amount: int, transaction_type: str,
+                    idempotency_key: Optional[str] = None) -> bool:
+        """Pay the reward if it hasn't been claimed this period; returns True if it was paid"""
+        period = self._current_period()
+        if (user_id, server_id) in self._claimed:
+            return False
+        claimed = await self.db.run_write(
+            self.db.claim_period_reward, self.reward, user_id, server_id, period, amount, transaction_type, idempotency_key
+        )
+        if claimed:
+            self._remember(user_id, server_id)
+        return claimed
+
+    def __len__(self) -> int:
+        return len(self._claimed)
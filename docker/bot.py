@@ -3,13 +3,19 @@ import os
 import discord
 from discord.ext import commands
 from discord.ext.commands import Context
-import asyncio
 import logging
 import traceback
-import signal
-from config import TOKEN, COMMAND_PREFIX
+from config import (
+    TOKEN, COMMAND_PREFIX, AUTO_SHARD, SHARD_COUNT, SHARD_IDS, CLUSTER_ID, MEMBER_CACHE, CHUNK_GUILDS_AT_STARTUP,
+    HEALTH_FILE, HEALTH_INTERVAL, HEALTH_MAX_LOOP_LAG, EVENT_LOOP, SHUTDOWN_GRACE_PERIOD
+)
 from utils.logger import setup_logger
 from utils.discord_error_handler import DiscordErrorHandler
+from utils.sharding import parse_shard_ids, log_shard_summary
+from utils.member_cache import member_cache_flags, log_member_cache
+from utils.health import HealthMonitor
+from utils.event_loop import run
+from utils.shutdown import GracefulShutdown
 
 
 # Get the directory of the current script
@@ -25,11 +31,32 @@ intents.reactions = True
 intents.guilds = True
 intents.messages = True  # Explicitly enable messages intent
 intents.members = True   # Enable member events for welcome messages
-bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents, case_insensitive=True, help_command=None)
+
+# Member cache policy: chunking at startup only makes sense if chunked members stay cached
+cache_flags = member_cache_flags(MEMBER_CACHE)
+chunk_at_startup = CHUNK_GUILDS_AT_STARTUP and cache_flags.joined
+bot_options = dict(
+    command_prefix=COMMAND_PREFIX, intents=intents, case_insensitive=True, help_command=None,
+    member_cache_flags=cache_flags, chunk_guilds_at_startup=chunk_at_startup
+)
+
+# Shard when asked to (AUTO_SHARD) or when a shard layout is given (SHARD_COUNT/SHARD_IDS)
+shard_ids = parse_shard_ids(SHARD_IDS)
+if AUTO_SHARD or SHARD_COUNT or shard_ids:
+    bot = commands.AutoShardedBot(**bot_options, shard_count=SHARD_COUNT, shard_ids=shard_ids)
+    logger.info(f"Cluster {CLUSTER_ID}: sharded mode, shard count {SHARD_COUNT or 'auto'}, shards {shard_ids or 'all'}")
+else:
+    bot = commands.Bot(**bot_options)
 
 # Initialize Discord error handler (will be fully initialized in on_ready)
 discord_error_handler = DiscordErrorHandler(bot)
 
+# Feeds the container HEALTHCHECK through HEALTH_FILE
+health = HealthMonitor(bot, HEALTH_FILE, HEALTH_INTERVAL, HEALTH_MAX_LOOP_LAG)
+
+# SIGTERM/SIGINT let cogs finish their work before disconnecting
+shutdown = GracefulShutdown(bot, SHUTDOWN_GRACE_PERIOD)
+
 # Load cogs
 async def load_cogs():
     """Dynamically loads all cogs from the 'cogs' directory."""
@@ -73,6 +100,8 @@ async def on_ready():
         if len(guild_names) > 100:
             guild_names = guild_names[:97] + '...'
         logger.info(f"Connected to {guild_count} guild(s): {guild_names}")
+    log_shard_summary(bot, logger)
+    log_member_cache(bot, logger)
 
     # Generate invite link with explicit permissions
     invite_link = discord.utils.oauth_url(
@@ -99,6 +128,18 @@ async def on_message(message):
 
     await bot.process_commands(message)
 
+@bot.event
+async def on_command_completion(ctx: Context):
+    health.command_completed()
+
+@bot.event
+async def on_shard_ready(shard_id):
+    logger.info(f'Shard {shard_id} is ready')
+
+@bot.event
+async def on_shard_resumed(shard_id):
+    logger.info(f'Shard {shard_id} resumed its session')
+
 @bot.event
 async def on_guild_join(guild):
     logger.info(f'Bot joined new guild: {guild.name} (id: {guild.id})')
@@ -136,59 +177,31 @@ async def on_command_error(ctx: Context, error: commands.CommandError):
         traceback.print_exception(type(error), error, error.__traceback__)
         await ctx.send("An error occurred while executing the command.")
 
-# Global shutdown flag
-shutdown_event = asyncio.Event()
-
-def signal_handler(sig, frame):
-    """Handle SIGTERM and SIGINT for graceful shutdown."""
-    print(f"Received signal {sig}, initiating graceful shutdown...")
-    shutdown_event.set()
-
-async def check_shutdown():
-    """Periodically check for shutdown signal."""
-    while not shutdown_event.is_set():
-        await asyncio.sleep(1)
-    
-    if not bot.is_closed():
-        print("Shutdown signal received, closing bot...")
-        await bot.close()
-        logger.info("Bot connection closed gracefully.")
-
 async def main():
-    # Set up signal handlers
-    loop = asyncio.get_running_loop()
-    loop.add_signal_handler(signal.SIGTERM, signal_handler)
-    loop.add_signal_handler(signal.SIGINT, signal_handler)
-    
     try:
         await load_cogs()
-        
-        # Start shutdown checker in background
-        shutdown_task = asyncio.create_task(check_shutdown())
-        
-        # Start the bot
+        health.start()
+        shutdown.install()
+
+        # Start the bot; SIGTERM (docker stop) or SIGINT ends this once the shutdown has run
         await bot.start(TOKEN)
-        
+        await shutdown.wait()
+
     except KeyboardInterrupt:
         logger.info("KeyboardInterrupt received, shutting down.")
     except Exception as e:
         logger.error(f"Unexpected error in main: {e}")
         traceback.print_exc()
     finally:
-        # Cancel shutdown task if still running
-        shutdown_task.cancel()
-        try:
-            await shutdown_task
-        except asyncio.CancelledError:
-            pass
-        
+        health.stop()
+
         if not bot.is_closed():
             await bot.close()
             logger.info("Bot connection closed.")
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run(main(), EVENT_LOOP)
     except (KeyboardInterrupt, SystemExit):
         logger.info("Bot shutdown complete.")
     except Exception as e:
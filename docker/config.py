@@ -15,4 +15,30 @@ COMMAND_PREFIX = os.getenv('COMMAND_PREFIX', '!')
 # Additional configuration options that can be set via environment variables
 DEBUG_MODE = os.getenv('DEBUG_MODE', 'False').lower() == 'true'
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-LOG_DIR = os.getenv('LOG_DIR', '/app/logs')
\ No newline at end of file
+LOG_DIR = os.getenv('LOG_DIR', '/app/logs')
+
+# Sharding: set AUTO_SHARD=true to let Discord pick the shard count, or give an explicit layout.
+# To split shards across containers, give each one the same SHARD_COUNT and its own SHARD_IDS (e.g. "0-3").
+AUTO_SHARD = os.getenv('AUTO_SHARD', 'False').lower() == 'true'
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = os.getenv('SHARD_IDS') or None
+CLUSTER_ID = int(os.getenv('CLUSTER_ID', '0'))
+
+# Member cache: "all" (default), "none", or a comma-separated list of "joined" and "voice".
+# In a memory-capped container, MEMBER_CACHE=none (or voice) with CHUNK_GUILDS_AT_STARTUP=false keeps
+# memory flat as guilds grow.
+MEMBER_CACHE = os.getenv('MEMBER_CACHE', 'all').lower()
+CHUNK_GUILDS_AT_STARTUP = os.getenv('CHUNK_GUILDS_AT_STARTUP', 'true').lower() == 'true'
+
+# Health checks: the bot writes its latest health check to HEALTH_FILE every HEALTH_INTERVAL seconds, and the
+# container HEALTHCHECK reads it. The bot counts as unresponsive if a check runs HEALTH_MAX_LOOP_LAG seconds late.
+HEALTH_FILE = os.getenv('HEALTH_FILE', '/tmp/rfibot-health.json')
+HEALTH_INTERVAL = float(os.getenv('HEALTH_INTERVAL', '15'))
+HEALTH_MAX_LOOP_LAG = float(os.getenv('HEALTH_MAX_LOOP_LAG', '5'))
+
+# Event loop: "asyncio" (default) or "uvloop" (installed in the image); falls back to asyncio if uvloop is missing
+EVENT_LOOP = os.getenv('EVENT_LOOP', 'asyncio').lower()
+
+# Graceful shutdown: on SIGTERM (docker stop) running work gets up to SHUTDOWN_GRACE_PERIOD seconds to finish
+# before the bot disconnects; the compose file's stop_grace_period must be longer
+SHUTDOWN_GRACE_PERIOD = float(os.getenv('SHUTDOWN_GRACE_PERIOD', '30'))
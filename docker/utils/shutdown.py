@@ -0,0 +1,79 @@
+import time
+import signal
+import asyncio
+import logging
+from typing import Optional
+
+from discord.ext import commands
+
+logger = logging.getLogger('discord_bot')
+
+
+class GracefulShutdown:
+    """
+    Shuts the bot down in order on SIGTERM/SIGINT, so a restart doesn't lose credits.
+
+    1. Drain: every cog with an async drain(timeout) stops taking new work and gets up
+       to `grace` seconds (shared) to let running work finish; the gateway stays
+       connected meanwhile so button presses can still settle games.
+    2. The gateway connection is closed, which ends bot.start(). No command, button
+       press or event reaches the cogs after this.
+    3. Flush: every cog with an async shutdown() writes out buffered state and closes
+       its resources (for credits: pending writes, WAL checkpoint, database). Call
+       wait() once bot.start() returns so the flush finishes before the loop stops.
+
+    Cogs opt in by defining the hooks, like export_state()/import_state() for !reload.
+    A second signal while draining is logged and otherwise ignored; `grace` bounds the wait.
+    """
+
+    def __init__(self, bot: commands.Bot, grace: float = 30.0):
+        self.bot = bot
+        self.grace = grace
+        self.task: Optional[asyncio.Task] = None
+
+    def install(self):
+        """Handle SIGTERM and SIGINT on the running loop (where the platform allows it)"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request, sig)
+            except (NotImplementedError, RuntimeError):
+                # e.g. Windows: Ctrl+C still raises KeyboardInterrupt and closes the bot
+                logger.warning(f"Graceful shutdown on {sig.name} is not supported on this platform")
+
+    def request(self, sig: Optional[signal.Signals] = None):
+        """Start the shutdown sequence once; later calls only log"""
+        reason = f"signal {sig.name}" if sig else "request"
+        if self.task:
+            logger.info(f"Shutdown already in progress, ignoring {reason}")
+            return
+        logger.info(f"Graceful shutdown started by {reason}")
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.grace
+        cogs = list(self.bot.cogs.values())
+
+        for cog in cogs:
+            if hasattr(cog, 'drain'):
+                try:
+                    await cog.drain(max(0.0, deadline - time.monotonic()))
+                except Exception as e:
+                    logger.error(f"Failed to drain cog {cog.qualified_name}: {e}")
+
+        logger.info(f"Drained in {time.perf_counter() - start:.1f}s, closing the gateway connection")
+        await self.bot.close()
+
+        for cog in cogs:
+            if hasattr(cog, 'shutdown'):
+                try:
+                    await cog.shutdown()
+                except Exception as e:
+                    logger.error(f"Failed to shut down cog {cog.qualified_name}: {e}")
+        logger.info(f"Shutdown finished in {time.perf_counter() - start:.1f}s")
+
+    async def wait(self):
+        """Wait for a started shutdown to finish flushing (returns at once if none was started)"""
+        if self.task:
+            await asyncio.shield(self.task)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Cluster launcher: runs the bot as several processes, each owning a range of shards.
+
+Environment:
+    DISCORD_TOKEN    Bot token (also used to ask Discord for a shard count)
+    SHARD_COUNT      Total shards; defaults to Discord's recommendation
+    CLUSTER_COUNT    Number of bot processes (default: 1)
+
+Each worker gets SHARD_COUNT, SHARD_IDS and CLUSTER_ID in its environment and runs
+bot.py unchanged. All workers share the credits database: SQLite WAL plus the busy
+retries in CreditsDatabase make concurrent writers safe, and every guild lives on
+exactly one shard, so per-guild caches stay correct. Database maintenance runs on
+cluster 0 only. Crashed workers are restarted with backoff; SIGINT/SIGTERM are
+forwarded to every worker.
+"""
+import os
+import sys
+import time
+import signal
+import subprocess
+from typing import Optional, Dict, List
+
+import requests
+
+from config import TOKEN, SHARD_COUNT, CLUSTER_COUNT, SHUTDOWN_GRACE_PERIOD
+from utils.logger import setup_logger
+from utils.sharding import shard_ranges
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+os.chdir(BASE_DIR)
+
+logger = setup_logger(log_dir=BASE_DIR)
+
+RESTART_BACKOFF_MAX = 60  # seconds
+HEALTHY_UPTIME = 300      # a worker up this long has its backoff reset
+STOP_TIMEOUT = SHUTDOWN_GRACE_PERIOD + 15  # the bot's drain plus time to flush and disconnect
+
+
+def recommended_shard_count() -> int:
+    """Ask Discord how many shards the bot should run"""
+    response = requests.get(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {TOKEN}"},
+        timeout=10
+    )
+    response.raise_for_status()
+    return int(response.json()["shards"])
+
+
+class Worker:
+    """One bot process and the shards it owns"""
+
+    def __init__(self, cluster_id: int, shard_ids: List[int], shard_count: int):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.backoff = 1.0
+        self.restart_at = 0.0
+
+    @property
+    def env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update({
+            "SHARD_COUNT": str(self.shard_count),
+            "SHARD_IDS": ",".join(map(str, self.shard_ids)),
+            "CLUSTER_ID": str(self.cluster_id),
+            # One maintenance runner per database file
+            "CREDITS_MAINTENANCE": "true" if self.cluster_id == 0 else "false",
+        })
+        return env
+
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, "bot.py")], env=self.env)
+        self.started_at = time.monotonic()
+        logger.info(f"Cluster {self.cluster_id}: started pid {self.process.pid} for shards {self.shard_ids[0]}-{self.shard_ids[-1]}")
+
+
+def main():
+    if not TOKEN:
+        logger.error("DISCORD_TOKEN is not set")
+        sys.exit(1)
+
+    shard_count = SHARD_COUNT or recommended_shard_count()
+    ranges = shard_ranges(shard_count, CLUSTER_COUNT)
+    logger.info(f"Launching {len(ranges)} cluster(s) for {shard_count} shard(s)")
+    workers = [Worker(cluster_id, shard_ids, shard_count) for cluster_id, shard_ids in enumerate(ranges)]
+
+    stopping = False
+
+    def stop(sig, frame):
+        nonlocal stopping
+        stopping = True
+        logger.info(f"Received signal {sig}, stopping clusters")
+        for worker in workers:
+            if worker.process and worker.process.poll() is None:
+                worker.process.send_signal(sig)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for worker in workers:
+        worker.start()
+        # Stagger gateway identifies so clusters don't all start at once
+        time.sleep(5)
+
+    while not stopping:
+        time.sleep(1)
+        now = time.monotonic()
+        for worker in workers:
+            code = worker.process.poll()
+            if code is None:
+                if now - worker.started_at >= HEALTHY_UPTIME:
+                    worker.backoff = 1.0
+                continue
+            if worker.restart_at == 0.0:
+                logger.warning(f"Cluster {worker.cluster_id}: exited with code {code}, restarting in {worker.backoff:.0f}s")
+                worker.restart_at = now + worker.backoff
+                worker.backoff = min(RESTART_BACKOFF_MAX, worker.backoff * 2)
+            elif now >= worker.restart_at and not stopping:
+                worker.restart_at = 0.0
+                worker.start()
+
+    for worker in workers:
+        if worker.process:
+            try:
+                worker.process.wait(timeout=STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"Cluster {worker.cluster_id}: did not exit in time, killing")
+                worker.process.kill()
+    logger.info("All clusters stopped")
+
+
+if __name__ == "__main__":
+    main()
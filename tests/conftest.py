@@ -0,0 +1,25 @@
+import pytest
+
+from credits_system.database import CreditsDatabase
+
+SERVER = "server-1"
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh credits database in a temporary file, with one server"""
+    database = CreditsDatabase(str(tmp_path / "credits.db"))
+    database.ensure_server_exists(SERVER, "Test Server")
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def member(db):
+    """Create users with their initial credits in the test server; returns their IDs"""
+    def create(*user_ids: str):
+        for user_id in user_ids:
+            assert db.ensure_user_exists(user_id, f"user-{user_id}")
+            assert db.initialize_user_credits(user_id, SERVER)
+        return user_ids
+    return create
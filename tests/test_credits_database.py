@@ -0,0 +1,283 @@
+import asyncio
+import datetime
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from credits_system.config import config
+from conftest import SERVER
+
+
+def transaction_types(db, user_id):
+    return [t.transaction_type for t in db.get_user_transactions(user_id, SERVER, limit=100)]
+
+
+# Keyset pagination
+
+def test_history_pages_cover_every_transaction_once(db, member):
+    member("alice")
+    for amount in range(1, 8):
+        assert db.add_credits("alice", SERVER, amount, "admin_add")
+
+    everything = db.get_user_transactions("alice", SERVER, limit=100)
+    pages, before = [], None
+    while True:
+        page = db.get_user_transactions("alice", SERVER, limit=3, before=before)
+        if not page:
+            break
+        pages.append(page)
+        before = (page[-1].created_at, page[-1].transaction_id)
+
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert [t.transaction_id for page in pages for t in page] == [t.transaction_id for t in everything]
+    assert everything[-1].transaction_type == "initial"
+
+
+def test_history_type_filter(db, member):
+    member("alice", "bob")
+    assert db.transfer_credits("alice", "bob", SERVER, 50)
+    assert db.add_credits("alice", SERVER, 10, "admin_add")
+
+    history = db.get_user_transactions("alice", SERVER, transaction_type="transfer_out")
+    assert [(t.amount, t.new_balance) for t in history] == [(-50, 450)]
+
+
+# Holds
+
+def test_hold_reserves_available_balance(db, member):
+    member("alice")
+    hold_id = db.hold("alice", SERVER, 300, ttl=60)
+
+    assert hold_id is not None
+    assert db.get_user_credits("alice", SERVER) == 500
+    assert db.get_available_credits("alice", SERVER) == 200
+    assert db.hold("alice", SERVER, 300, ttl=60) is None
+    assert not db.transfer_credits("alice", "bob", SERVER, 250)
+
+
+def test_capture_pays_recipient(db, member):
+    member("alice", "bob")
+    hold_id = db.hold("alice", SERVER, 200, ttl=60)
+
+    assert db.capture(hold_id, "game_loss", recipient_id="bob", recipient_reason="game_win")
+    assert db.get_user_credits("alice", SERVER) == 300
+    assert db.get_available_credits("alice", SERVER) == 300
+    assert db.get_user_credits("bob", SERVER) == 700
+    # A hold settles once
+    assert not db.capture(hold_id, "game_loss", recipient_id="bob", recipient_reason="game_win")
+    assert not db.release(hold_id)
+
+
+def test_release_returns_credits(db, member):
+    member("alice")
+    hold_id = db.hold("alice", SERVER, 200, ttl=60)
+
+    assert db.release(hold_id)
+    assert db.get_available_credits("alice", SERVER) == 500
+    assert db.get_user_credits("alice", SERVER) == 500
+
+
+def test_expired_hold_stops_counting_and_is_swept(db, member):
+    member("alice")
+    hold_id = db.hold("alice", SERVER, 200, ttl=-1)
+
+    assert db.get_available_credits("alice", SERVER) == 500
+    assert not db.capture(hold_id, "game_loss")
+    assert db.get_user_credits("alice", SERVER) == 500
+
+    db.hold("alice", SERVER, 100, ttl=-1)
+    db.hold("alice", SERVER, 100, ttl=60)
+    assert db.sweep_expired_holds() == 2  # Including the expired hold that failed to capture
+    assert db.get_available_credits("alice", SERVER) == 400
+
+
+# Idempotent replays
+
+def test_add_credits_replay_applies_once(db, member):
+    member("alice")
+    assert db.add_credits("alice", SERVER, 100, "game_win", idempotency_key="settle:1")
+    assert db.add_credits("alice", SERVER, 100, "game_win", idempotency_key="settle:1")
+
+    assert db.get_user_credits("alice", SERVER) == 600
+    assert transaction_types(db, "alice") == ["game_win", "initial"]
+
+
+def test_transfer_replay_applies_once(db, member):
+    member("alice", "bob")
+    assert db.transfer_credits("alice", "bob", SERVER, 100, idempotency_key="transfer:1")
+    assert db.transfer_credits("alice", "bob", SERVER, 100, idempotency_key="transfer:1")
+
+    assert db.get_user_credits("alice", SERVER) == 400
+    assert db.get_user_credits("bob", SERVER) == 600
+
+
+def test_capture_replay_applies_once(db, member):
+    member("alice", "bob")
+    hold_id = db.hold("alice", SERVER, 100, ttl=60)
+    assert db.capture(hold_id, "game_loss", "bob", "game_win", idempotency_key="game:1")
+    assert db.capture(hold_id, "game_loss", "bob", "game_win", idempotency_key="game:1")
+
+    assert db.get_user_credits("alice", SERVER) == 400
+    assert db.get_user_credits("bob", SERVER) == 600
+
+
+def test_failed_transfer_changes_nothing(db, member):
+    member("alice", "bob")
+    assert not db.transfer_credits("alice", "bob", SERVER, 501)
+    assert db.get_user_credits("alice", SERVER) == 500
+    assert transaction_types(db, "alice") == ["initial"]
+
+
+# Busy retries
+
+@pytest.fixture
+def lock_writes(db):
+    """Take the write lock from an outside connection; returns a function that releases it"""
+    conn = sqlite3.connect(db.db_path, check_same_thread=False)
+
+    def lock():
+        conn.execute("BEGIN IMMEDIATE")
+        return conn.rollback
+
+    yield lock
+    conn.close()
+
+
+def test_busy_write_gives_up_within_budget(db, member, lock_writes, monkeypatch):
+    member("alice")
+    monkeypatch.setattr(config, "write_busy_budget", 0.3)
+    unlock = lock_writes()
+
+    start = time.monotonic()
+    assert not db.add_credits("alice", SERVER, 10, "admin_add")
+    assert time.monotonic() - start < 1.5
+    unlock()
+    assert db.get_user_credits("alice", SERVER) == 500
+
+
+def test_busy_write_succeeds_once_lock_is_released(db, member, lock_writes):
+    member("alice")
+    timer = threading.Timer(0.3, lock_writes())
+    timer.start()
+    try:
+        assert db.add_credits("alice", SERVER, 10, "admin_add")
+    finally:
+        timer.join()
+    assert db.get_user_credits("alice", SERVER) == 510
+
+
+# Rollups
+
+def rollup(db, user_id):
+    with sqlite3.connect(db.db_path) as conn:
+        rows = conn.execute(
+            "SELECT type, net, transaction_count FROM daily_user_totals WHERE server_id = ? AND user_id = ?",
+            (SERVER, user_id)
+        )
+        return {transaction_type: (net, count) for transaction_type, net, count in rows}
+
+
+def test_rollup_counts_each_transfer_side_once(db, member):
+    member("alice", "bob")
+    assert db.transfer_credits("alice", "bob", SERVER, 100)
+    assert db.transfer_credits("alice", "bob", SERVER, 50)
+
+    assert rollup(db, "alice") == {"initial": (500, 1), "transfer_out": (-150, 2)}
+    assert rollup(db, "bob") == {"initial": (500, 1), "transfer_in": (150, 2)}
+
+
+def test_period_leaderboard_excludes_transfers(db, member):
+    member("alice", "bob")
+    assert db.add_credits("bob", SERVER, 30, "game_win")
+    assert db.transfer_credits("alice", "bob", SERVER, 100)
+
+    totals = db.get_period_leaderboard(SERVER, since_day=datetime.date.min)
+    assert [(t.user_id, t.net) for t in totals] == [("bob", 30)]
+
+
+def test_global_totals_follow_balances(db, member):
+    member("alice", "bob")
+    db.ensure_server_exists("server-2", "Other Server")
+    assert db.add_credits("alice", "server-2", 100, "admin_add")  # Initializes alice there first
+    assert db.transfer_credits("alice", "bob", SERVER, 200)
+
+    totals = {t.user_id: (t.total_credits, t.server_count) for t in db.get_global_leaderboard()}
+    assert totals == {"alice": (300 + 600, 2), "bob": (700, 1)}
+
+
+# Bulk adjustments
+
+def test_bulk_remove_skips_members_who_cannot_cover(db, member):
+    member("alice", "carol")
+    db.hold("carol", SERVER, 300, ttl=60)
+    members = [("alice", "Alice"), ("bob", "Bob"), ("carol", "Carol")]
+
+    assert db.bulk_adjust_credits(SERVER, members, -250, "admin_remove") == (1, 2)
+    assert db.get_user_credits("alice", SERVER) == 250
+    assert db.get_user_credits("bob", SERVER) is None
+    assert db.get_user_credits("carol", SERVER) == 500
+
+
+def test_bulk_add_initializes_missing_balances(db, member):
+    member("alice")
+    members = [("alice", "Alice"), ("bob", "Bob"), ("bob", "Bobby")]
+
+    assert db.bulk_adjust_credits(SERVER, members, 100, "admin_add") == (2, 0)
+    assert db.get_user_credits("alice", SERVER) == 600
+    assert db.get_user_credits("bob", SERVER) == 600
+    assert db.get_usernames(["bob"]) == {"bob": "Bobby"}
+
+
+def test_bulk_replay_returns_none(db, member):
+    member("alice")
+    members = [("alice", "Alice")]
+
+    assert db.bulk_adjust_credits(SERVER, members, 100, "admin_add", idempotency_key="grant:1") == (1, 0)
+    assert db.bulk_adjust_credits(SERVER, members, 100, "admin_add", idempotency_key="grant:1") is None
+    assert db.get_user_credits("alice", SERVER) == 600
+
+
+def test_bulk_failure_raises_and_rolls_back(db, member):
+    member("alice")
+    with pytest.raises(sqlite3.Error):
+        db.bulk_adjust_credits(SERVER, [("alice", "Alice"), ("bob", "Bob")], 100, None)
+    assert db.get_user_credits("alice", SERVER) == 500
+    assert db.get_user_credits("bob", SERVER) is None
+
+
+# Period rewards and reconciliation
+
+def test_period_reward_pays_once_per_period(db, member):
+    member("alice")
+    assert db.claim_period_reward("rfi", "alice", SERVER, 1000, 50, "rfi_reward")
+    assert not db.claim_period_reward("rfi", "alice", SERVER, 1000, 50, "rfi_reward")
+    assert db.has_claimed_period_reward("rfi", "alice", SERVER, 1000)
+    assert not db.has_claimed_period_reward("rfi", "alice", SERVER, 2000)
+    assert db.claim_period_reward("rfi", "alice", SERVER, 2000, 50, "rfi_reward")
+
+    assert db.get_user_credits("alice", SERVER) == 600
+    assert db.prune_period_reward_claims(before=2000) == 1
+
+
+def test_sync_members_counts_created_balances(db, member):
+    member("alice")
+    users = [("alice", "Alice"), ("bob", "Bob")]
+
+    assert db.sync_members(SERVER, users, ["alice", "bob"]) == 1
+    assert db.sync_members(SERVER, users, ["alice", "bob"]) == 0
+    assert db.get_server_user_ids(SERVER) == {"alice", "bob"}
+    assert db.get_usernames(["alice"]) == {"alice": "Alice"}
+
+
+# Executors
+
+def test_run_read_and_run_write(db, member):
+    member("alice")
+
+    async def scenario():
+        assert await db.run_write(db.add_credits, "alice", SERVER, 25, reason="admin_add")
+        return await db.run_read(db.get_user_credits, "alice", SERVER)
+
+    assert asyncio.run(scenario()) == 525
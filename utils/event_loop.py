@@ -0,0 +1,35 @@
+import asyncio
+import logging
+from typing import Optional, Callable, Coroutine, Any
+
+logger = logging.getLogger('discord_bot')
+
+EVENT_LOOPS = ('asyncio', 'uvloop')
+
+
+def loop_factory(name: str) -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """
+    The event loop factory for an EVENT_LOOP setting, or None for asyncio's default loop.
+
+    "uvloop" uses uvloop if it is installed and falls back to asyncio's loop with a
+    warning if it isn't, so the setting is safe to leave on where uvloop can't be
+    installed (e.g. Windows).
+    """
+    if name not in EVENT_LOOPS:
+        logger.warning(f"Unknown EVENT_LOOP '{name}', using asyncio (choose from: {', '.join(EVENT_LOOPS)})")
+        return None
+    if name == 'uvloop':
+        try:
+            import uvloop
+        except ImportError:
+            logger.warning("EVENT_LOOP=uvloop but uvloop is not installed, using asyncio")
+            return None
+        logger.info(f"Using uvloop {uvloop.__version__} event loop")
+        return uvloop.new_event_loop
+    return None
+
+
+def run(main: Coroutine[Any, Any, Any], name: str = 'asyncio'):
+    """asyncio.run() on the event loop chosen by an EVENT_LOOP setting"""
+    with asyncio.Runner(loop_factory=loop_factory(name)) as runner:
+        return runner.run(main)
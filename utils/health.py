@@ -0,0 +1,150 @@
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+import discord
+
+logger = logging.getLogger('discord_bot')
+
+
+@dataclass
+class HealthStatus:
+    """The result of one health check"""
+    checked_at: float                    # Unix time
+    loop_lag_ms: float                   # How late the check itself was scheduled
+    gateway_connected: bool
+    db_writable: Optional[bool]          # None when the credits system isn't loaded
+    last_command_at: Optional[float]     # Unix time of the last command that completed
+    live: bool                           # The process is responsive
+    ready: bool                          # ...and connected, with a writable database
+
+
+def gateway_connected(bot: discord.Client) -> bool:
+    """True once the bot is ready and every shard it runs has a live heartbeat"""
+    if bot.is_closed() or not bot.is_ready():
+        return False
+    if isinstance(bot, discord.AutoShardedClient):
+        return all(not shard.is_closed() and math.isfinite(shard.latency) for shard in bot.shards.values())
+    return math.isfinite(bot.latency)
+
+
+class HealthMonitor:
+    """
+    Checks the running bot every `interval` seconds for container probes.
+
+    Each check measures how late it was woken (event loop lag), whether the gateway is
+    connected and whether the credits database takes writes, and records when a command
+    last completed. The result is kept in `status` and, if `path` is set, written there
+    as JSON. The file is only written by a running check, so a stale file means a
+    stalled event loop, and a probe can test its age and "ready" field without starting
+    Python.
+    """
+
+    def __init__(self, bot: discord.Client, path: Optional[str] = None, interval: float = 15.0, max_loop_lag: float = 5.0):
+        self.bot = bot
+        self.path = path
+        self.interval = interval
+        self.max_loop_lag = max_loop_lag
+        self.status: Optional[HealthStatus] = None
+        self.last_command_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def command_completed(self):
+        """Record a successful command (call from on_command_completion)"""
+        self.last_command_at = time.time()
+
+    @property
+    def live(self) -> bool:
+        """The latest check passed and is recent, i.e. the checks are still running"""
+        return (
+            self.status is not None and self.status.live
+            and time.time() - self.status.checked_at < self.interval * 3
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.live and self.status.ready
+
+    def start(self):
+        if self.task is None or self.task.done():
+            if self.path:
+                # Never let a file left by a previous run vouch for this one
+                self._remove_file()
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        if self.path:
+            self._remove_file()
+
+    async def check(self, loop_lag: float = 0.0) -> HealthStatus:
+        """Run every check once"""
+        db_writable = None
+        credits_cog = self.bot.get_cog("Credits")
+        if credits_cog is not None and hasattr(credits_cog, 'db'):
+            try:
+                db_writable = await asyncio.to_thread(credits_cog.db.check_writable)
+            except Exception as e:
+                logger.warning(f"Database health check failed: {e}")
+                db_writable = False
+        connected = gateway_connected(self.bot)
+        live = loop_lag <= self.max_loop_lag
+        return HealthStatus(
+            checked_at=time.time(),
+            loop_lag_ms=round(loop_lag * 1000, 1),
+            gateway_connected=connected,
+            db_writable=db_writable,
+            last_command_at=self.last_command_at,
+            live=live,
+            ready=live and connected and db_writable is not False
+        )
+
+    async def _run(self):
+        lag = 0.0
+        while True:
+            try:
+                status = await self.check(lag)
+            except Exception as e:
+                logger.error(f"Health check failed: {e}")
+            else:
+                if self.status is not None and status.ready != self.status.ready:
+                    logger.info(f"Health: {'ready' if status.ready else 'not ready'} ({self._describe(status)})")
+                self.status = status
+                if self.path:
+                    self._write_file(status)
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+
+    @staticmethod
+    def _describe(status: HealthStatus) -> str:
+        return (
+            f"gateway {'up' if status.gateway_connected else 'down'}, "
+            f"database {'n/a' if status.db_writable is None else 'writable' if status.db_writable else 'not writable'}, "
+            f"loop lag {status.loop_lag_ms:.0f} ms"
+        )
+
+    def _write_file(self, status: HealthStatus):
+        """Replace the health file atomically so a probe never reads half of it"""
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(asdict(status), f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write health file {self.path}: {e}")
+
+    def _remove_file(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove health file {self.path}: {e}")
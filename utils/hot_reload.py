@@ -0,0 +1,77 @@
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Any
+
+from discord.ext import commands
+
+logger = logging.getLogger('discord_bot')
+
+
+@dataclass
+class ReloadResult:
+    """What a reload did"""
+    extension: str
+    ok: bool
+    elapsed_ms: float
+    carried_over: List[str] = field(default_factory=list)  # Cogs whose state was handed to the new instance
+    error: Optional[str] = None
+
+
+def resolve_extension(bot: commands.Bot, name: str) -> Optional[str]:
+    """
+    Find a loaded (or lazily deferred) extension by full name, module name or cog name.
+
+    "cogs.games", "games" and "Games" all resolve to "cogs.games"; "credits" resolves
+    to "credits_system.cog" through its cog name.
+    """
+    lazy = getattr(bot, 'lazy_cogs', None)
+    extensions = list(bot.extensions) + (list(lazy.pending) if lazy else [])
+    lowered = name.lower()
+    for extension in extensions:
+        if lowered in (extension.lower(), extension.rsplit('.', 1)[-1].lower()):
+            return extension
+    for cog in bot.cogs.values():
+        if cog.qualified_name.lower() == lowered and cog.__module__ in extensions:
+            return cog.__module__
+    return None
+
+
+async def reload_extension(bot: commands.Bot, extension: str) -> ReloadResult:
+    """
+    Reload an extension in place, handing each of its cogs' state to the new instance.
+
+    Cogs opt in by defining export_state() -> dict, called just before the old cog is
+    unloaded, and import_state(state), called on the new cog once it is added. If the
+    new code fails to load, discord.py restores the old module and the state goes to
+    the restored cog instead, so nothing is lost either way.
+    """
+    start = time.perf_counter()
+    states: Dict[str, Any] = {}
+    for cog in list(bot.cogs.values()):
+        if cog.__module__ == extension and hasattr(cog, 'export_state'):
+            states[cog.qualified_name] = cog.export_state()
+
+    error = None
+    try:
+        await bot.reload_extension(extension)
+    except Exception as e:
+        error = str(getattr(e, 'original', e))
+        logger.error(f"Failed to reload {extension}, previous version kept: {error}")
+
+    carried_over = []
+    for name, state in states.items():
+        cog = bot.get_cog(name)
+        if cog is None or not hasattr(cog, 'import_state'):
+            logger.warning(f"Dropped state of cog {name} on reload of {extension}: no cog to import it")
+            continue
+        try:
+            cog.import_state(state)
+            carried_over.append(name)
+        except Exception as e:
+            logger.error(f"Failed to import state into cog {name}: {e}")
+
+    result = ReloadResult(extension, error is None, (time.perf_counter() - start) * 1000, carried_over, error)
+    if result.ok:
+        logger.info(f"Reloaded {extension} in {result.elapsed_ms:.0f} ms, state carried over for: {', '.join(carried_over) or 'none'}")
+    return result
@@ -0,0 +1,211 @@
+import os
+import ast
+import json
+import asyncio
+import logging
+import importlib.util
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Dict, List
+
+from discord.ext import commands
+
+logger = logging.getLogger('discord_bot')
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class StubSpec:
+    """What a placeholder needs to stand in for one command"""
+    name: str
+    aliases: List[str] = field(default_factory=list)
+    help: Optional[str] = None
+    hidden: bool = False
+    usage: str = ''  # Parameters in the help command's format, e.g. "<user> [amount]"
+
+
+@dataclass
+class CogManifest:
+    """The commands an extension registers, read from its source without importing it"""
+    extension: str
+    cog_name: Optional[str] = None
+    commands: List[StubSpec] = field(default_factory=list)
+    reason: Optional[str] = None  # Why the extension can't be loaded lazily, if it can't
+
+    @property
+    def lazy_safe(self) -> bool:
+        return self.reason is None
+
+
+def _is_attr(node: ast.AST, owner: str, names: tuple) -> bool:
+    """True for owner.<one of names>, e.g. commands.command"""
+    return isinstance(node, ast.Attribute) and node.attr in names and isinstance(node.value, ast.Name) and node.value.id == owner
+
+
+def _usage(func) -> str:
+    """Render a command's parameters the way the help command does"""
+    args = func.args
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    params = []
+    for arg, default in list(zip(positional, defaults))[2:]:  # Skip self and ctx
+        params.append(f'[{arg.arg}]' if default is not None else f'<{arg.arg}>')
+    if args.vararg:
+        params.append(f'[{args.vararg.arg}...]')
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        params.append(f'[{arg.arg}]' if default is not None else f'<{arg.arg}>')
+    return ' '.join(params)
+
+
+def _scan_source(extension: str, source: str) -> CogManifest:
+    manifest = CogManifest(extension)
+    tree = ast.parse(source)
+    cogs = [
+        node for node in tree.body
+        if isinstance(node, ast.ClassDef) and any(_is_attr(base, 'commands', ('Cog',)) for base in node.bases)
+    ]
+    if len(cogs) != 1:
+        manifest.reason = f"defines {len(cogs)} cogs"
+        return manifest
+    cog = cogs[0]
+    manifest.cog_name = cog.name
+    for keyword in cog.keywords:
+        if keyword.arg == 'name' and isinstance(keyword.value, ast.Constant):
+            manifest.cog_name = keyword.value.value
+
+    command_decorators = set()
+    for func in cog.body:
+        if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in func.decorator_list:
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            if isinstance(target, ast.Attribute) and target.attr == 'listener':  # commands.Cog.listener
+                manifest.reason = f"listens for events ({func.name})"
+                return manifest
+            if _is_attr(target, 'tasks', ('loop',)):
+                manifest.reason = f"runs a background task ({func.name})"
+                return manifest
+            if not _is_attr(target, 'commands', ('command', 'group')):
+                continue
+            command_decorators.add(id(decorator))
+            kwargs = {k.arg: k.value for k in decorator.keywords} if isinstance(decorator, ast.Call) else {}
+            try:
+                spec = StubSpec(
+                    name=ast.literal_eval(kwargs['name']) if 'name' in kwargs else func.name,
+                    aliases=list(ast.literal_eval(kwargs['aliases'])) if 'aliases' in kwargs else [],
+                    help=ast.literal_eval(kwargs['help']) if 'help' in kwargs else ast.get_docstring(func),
+                    hidden=bool(ast.literal_eval(kwargs['hidden'])) if 'hidden' in kwargs else False,
+                    usage=_usage(func)
+                )
+            except ValueError:
+                manifest.reason = f"command {func.name} is not declared with literal arguments"
+                return manifest
+            manifest.commands.append(spec)
+
+    # Commands built at runtime (e.g. in a factory method) can't be stubbed ahead of time
+    for node in ast.walk(cog):
+        if isinstance(node, ast.Call) and _is_attr(node.func, 'commands', ('command', 'group')) and id(node) not in command_decorators:
+            manifest.reason = "creates commands at runtime"
+            return manifest
+    if not manifest.commands:
+        manifest.reason = "has no commands to trigger loading"
+    return manifest
+
+
+def scan_extension(extension: str) -> CogManifest:
+    """
+    Build an extension's manifest from its source.
+
+    Parsing costs about as much as importing, so the result is cached as JSON in the
+    module's __pycache__ and reused until the source file changes.
+    """
+    spec = importlib.util.find_spec(extension)
+    if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+        return CogManifest(extension, reason="source not found")
+    stat = os.stat(spec.origin)
+    key = [MANIFEST_VERSION, stat.st_mtime_ns, stat.st_size]
+    cache_path = os.path.join(os.path.dirname(spec.origin), '__pycache__', f'{extension.rsplit(".", 1)[-1]}.manifest.json')
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['key'] == key:
+            data = cached['manifest']
+            data['commands'] = [StubSpec(**command) for command in data['commands']]
+            return CogManifest(**data)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    with open(spec.origin, encoding='utf-8') as f:
+        manifest = _scan_source(extension, f.read())
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'manifest': asdict(manifest)}, f)
+    except OSError as e:
+        logger.warning(f"Could not cache manifest for {extension}: {e}")
+    return manifest
+
+
+class LazyCogLoader:
+    """
+    Registers placeholder cogs whose commands import the real extension on first use.
+
+    Each placeholder carries the real cog's name and one stub per command (name,
+    aliases, help and usage), so it shows up in !help like the real thing. The first
+    invocation of any stub swaps the placeholder for the real extension and re-dispatches
+    the message, so checks, cooldowns and argument parsing all come from the real command.
+    """
+
+    def __init__(self, bot: commands.Bot, profiler=None):
+        self.bot = bot
+        self.profiler = profiler
+        self.pending: Dict[str, CogManifest] = {}  # extension -> manifest, until loaded
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _stub(self, extension: str, spec: StubSpec) -> commands.Command:
+        async def stub(cog, ctx: commands.Context, *, args: str = ''):
+            await self._dispatch(extension, ctx)
+        return commands.Command(stub, name=spec.name, aliases=spec.aliases, help=spec.help, hidden=spec.hidden, usage=spec.usage)
+
+    async def defer(self, manifest: CogManifest):
+        """Register a placeholder cog for a lazy-safe manifest"""
+        attrs = {f'_stub_{i}': self._stub(manifest.extension, spec) for i, spec in enumerate(manifest.commands)}
+        placeholder = commands.CogMeta(manifest.cog_name, (commands.Cog,), attrs, name=manifest.cog_name)
+        await self.bot.add_cog(placeholder())
+        self.pending[manifest.extension] = manifest
+
+    async def load(self, extension: str) -> bool:
+        """Load a deferred extension now; returns False if it failed and the placeholder was restored"""
+        lock = self._locks.setdefault(extension, asyncio.Lock())
+        async with lock:
+            manifest = self.pending.get(extension)
+            if manifest is None:
+                return True  # Already loaded
+            await self.bot.remove_cog(manifest.cog_name)
+            try:
+                if self.profiler:
+                    timing = await self.profiler.load_extension(self.bot, extension)
+                    elapsed_ms = timing.import_ms + timing.setup_ms
+                else:
+                    await self.bot.load_extension(extension)
+                    elapsed_ms = None
+            except Exception as e:
+                logger.error(f"Failed to lazily load cog {extension}: {e}")
+                del self.pending[extension]
+                await self.defer(manifest)
+                return False
+            del self.pending[extension]
+            logger.info(f"Loaded cog on first use: {extension}" + (f" in {elapsed_ms:.0f} ms" if elapsed_ms is not None else ""))
+            return True
+
+    async def load_all(self):
+        """Load every extension that is still deferred"""
+        for extension in list(self.pending):
+            await self.load(extension)
+
+    async def _dispatch(self, extension: str, ctx: commands.Context):
+        if not await self.load(extension):
+            await ctx.send("That command is unavailable right now. Please try again later.")
+            return
+        ctx = await self.bot.get_context(ctx.message)
+        await self.bot.invoke(ctx)
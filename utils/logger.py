@@ -1,8 +1,32 @@
 import logging
 import sys
 import os
+import queue
+import atexit
 import datetime
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+# Writes the bot logger's records to stdout and the log file on a background thread
+_log_listener = None
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queues records untouched, so formatting and I/O both happen on the listener thread.
+
+    The stock QueueHandler formats each record in the calling thread (it has to, for
+    multiprocessing queues). Here the queue is in-process and log arguments are plain
+    strings and numbers, so the event loop only pays for creating the record.
+    """
+
+    def prepare(self, record):
+        return record
+
+def stop_logging():
+    """Write out every queued record and stop the listener thread (safe to call twice)"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
 
 def setup_logger(log_dir=None):
     # Create logger
@@ -28,8 +52,13 @@ def setup_logger(log_dir=None):
     # Add handlers to logger
     # Check if handlers already exist to prevent duplicate logging
     if not logger.handlers:
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        global _log_listener
+        # Console and file writes block, so they run on a listener thread fed by a queue
+        log_queue = queue.SimpleQueue()
+        _log_listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        _log_listener.start()
+        atexit.register(stop_logging)
+        logger.addHandler(DeferredQueueHandler(log_queue))
 
     # Configure root logger to ensure all modules can log to console and file
     root_logger = logging.getLogger() # Gets the root logger
@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Optional, Callable, Awaitable, List
+
+from utils.metrics import LoopLagProbe
+
+logger = logging.getLogger('discord_bot')
+
+STACK_FRAMES = 12  # Innermost frames kept from a blocked loop's stack
+ASYNCIO_DIR = os.path.dirname(asyncio.__file__)  # The loop's own frames say nothing about the stall
+
+
+@dataclass
+class Stall:
+    """What the event loop was doing while it was blocked"""
+    detected_at: float            # perf_counter time the watchdog noticed it
+    task: Optional[str]           # The task being stepped, if the blocking code ran in one
+    stack: List[str]              # Formatted frames, innermost last
+    duration: float = 0.0         # Filled in once the loop comes back
+
+
+def _describe_task(task: Optional[asyncio.Task]) -> Optional[str]:
+    if task is None:
+        return None
+    coro = task.get_coro()
+    name = getattr(coro, '__qualname__', None) or repr(coro)
+    return f"{task.get_name()} ({name})"
+
+
+class LoopMonitor(LoopLagProbe):
+    """
+    Measures event loop lag and catches what blocks the loop.
+
+    The lag probe runs on the loop as before. A watchdog thread checks how long ago the
+    probe last woke up; once that is more than `threshold` seconds beyond the probe's
+    interval, the loop is stuck in one callback, and the watchdog captures the loop
+    thread's stack and current task while the blocking code is still running. When the
+    loop comes back, the stall is logged with its stack and summarized to `reporter`
+    (e.g. the bot-status channel), at most once per `report_interval` seconds; stalls
+    in between are counted into the next summary.
+
+    asyncio's own slow callback warnings need debug mode, which is too costly to leave
+    on, so the watchdog stands in for them. The loop's slow_callback_duration is still
+    set to `threshold` for runs with PYTHONASYNCIODEBUG=1.
+    """
+
+    def __init__(self, threshold: Optional[float] = 1.0, report_interval: float = 300.0,
+                 reporter: Optional[Callable[[str], Awaitable[None]]] = None, interval: float = 0.5):
+        super().__init__(interval)
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.reporter = reporter
+        self.stall_count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._stall: Optional[Stall] = None  # Set by the watchdog, taken by the loop
+        self._unreported: List[Stall] = []
+        self._last_report = float('-inf')
+
+    def start(self):
+        super().start()
+        if not self.threshold or (self._watchdog and self._watchdog.is_alive()):
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop.slow_callback_duration = self.threshold
+        self._loop_thread_id = threading.get_ident()
+        self.last_wakeup = time.perf_counter()
+        self._stopping.clear()
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        super().stop()
+        if self._watchdog:
+            self._stopping.set()
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def _watch(self):
+        """Watchdog thread: snapshot the loop thread once the probe is overdue"""
+        while not self._stopping.wait(min(self.threshold / 4, 0.25)):
+            overdue = time.perf_counter() - self.last_wakeup - self.interval
+            if overdue < self.threshold or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            frames = [f for f in traceback.extract_stack(frame) if not f.filename.startswith(ASYNCIO_DIR)] if frame else []
+            stack = traceback.format_list(frames[-STACK_FRAMES:])
+            try:
+                task = _describe_task(asyncio.current_task(self._loop))
+            except RuntimeError:
+                task = None
+            self._stall = Stall(time.perf_counter(), task, stack)
+
+    def sampled(self, lag: float):
+        stall, self._stall = self._stall, None
+        if stall is None:
+            return
+        stall.duration = lag
+        self.stall_count += 1
+        logger.warning(
+            f"Event loop blocked for {lag:.2f}s in {stall.task or 'a callback outside any task'}:\n" + ''.join(stall.stack)
+        )
+        self._unreported.append(stall)
+        now = time.perf_counter()
+        if self.reporter is None or now - self._last_report < self.report_interval:
+            return
+        self._last_report = now
+        stalls, self._unreported = self._unreported, []
+        asyncio.create_task(self.reporter(self._summary(stalls)))
+
+    def _summary(self, stalls: List[Stall]) -> str:
+        """A bot-status message for the worst of the stalls since the last report"""
+        worst = max(stalls, key=lambda s: s.duration)
+        message = "🐢 **Event Loop Stall** 🐢\n"
+        if len(stalls) > 1:
+            message += f"**Stalls since last report:** {len(stalls)}\n"
+        message += f"**Blocked for:** `{worst.duration:.2f}s`\n"
+        message += f"**Task:** `{worst.task or 'none (plain callback)'}`\n"
+        stack = ''.join(worst.stack)
+        if len(stack) > 1500:
+            stack = '...\n' + stack[-1500:]
+        message += f"**Stack:**\n```\n{stack}```"
+        return message
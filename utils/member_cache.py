@@ -0,0 +1,48 @@
+import logging
+from typing import List, Dict, Any
+
+import discord
+
+
+def member_cache_flags(policy: str) -> discord.MemberCacheFlags:
+    """
+    Build MemberCacheFlags from a MEMBER_CACHE policy string.
+
+    "all" and "none" map to the matching presets. Anything else is a comma-separated
+    list of flags to enable, e.g. "joined" or "joined,voice".
+    """
+    if policy == 'all':
+        return discord.MemberCacheFlags.all()
+    flags = discord.MemberCacheFlags.none()
+    if policy == 'none':
+        return flags
+    for name in (part.strip() for part in policy.split(',')):
+        if name not in ('joined', 'voice'):
+            raise ValueError(f"Unknown MEMBER_CACHE flag: {name!r} (expected all, none, joined or voice)")
+        setattr(flags, name, True)
+    return flags
+
+
+def member_cache_summary(bot: discord.Client) -> List[Dict[str, Any]]:
+    """Cached and total member counts for each guild, largest cache first"""
+    guilds = [
+        {
+            'guild_id': guild.id,
+            'name': guild.name,
+            'cached': len(guild.members),
+            'total': guild.member_count or 0,
+            'chunked': guild.chunked,
+        }
+        for guild in bot.guilds
+    ]
+    guilds.sort(key=lambda g: g['cached'], reverse=True)
+    return guilds
+
+
+def log_member_cache(bot: discord.Client, logger: logging.Logger):
+    """Log how many members are cached out of the total, across every guild"""
+    guilds = member_cache_summary(bot)
+    cached = sum(g['cached'] for g in guilds)
+    total = sum(g['total'] for g in guilds)
+    chunked = sum(1 for g in guilds if g['chunked'])
+    logger.info(f"Member cache: {cached} of {total} members cached across {len(guilds)} guild(s), {chunked} fully chunked")
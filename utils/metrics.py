@@ -0,0 +1,267 @@
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from dataclasses import asdict
+from typing import Optional, Dict, List, Tuple, Callable, Union, Sequence
+
+from aiohttp import web
+
+logger = logging.getLogger('discord_bot')
+
+# Seconds; spans a cached read (~0.1 ms) to a slow REST round trip
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in values]
+
+
+class Histogram:
+    """
+    Bucketed observations per label set.
+
+    observe() does one bisect over the bucket bounds and two increments under a lock;
+    counts are only made cumulative when scraped.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, list] = {}  # labels -> [per-bucket counts (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class GaugeFunc:
+    """
+    A gauge read from a callback at scrape time, so it costs nothing between scrapes.
+
+    The callback returns a number, or a dict of label values -> number for labelled
+    gauges. If it raises, the gauge is left out of that scrape.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, func: Callable[[], Union[float, Dict[LabelValues, float]]],
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.func = func
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.func()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} could not be collected: {e}")
+            return []
+        if isinstance(value, dict):
+            return [f'{self.name}{_labels(self.labelnames, labels)} {_number(v)}' for labels, v in value.items()]
+        return [f'{self.name} {_number(value)}']
+
+
+class Registry:
+    """The metrics exported by one process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Union[Counter, Histogram, GaugeFunc]] = {}
+
+    def register(self, metric):
+        """Add a metric, replacing any earlier one with the same name (e.g. after a cog reload)"""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+COMMANDS = REGISTRY.register(Counter(
+    'rfibot_commands_total', 'Commands invoked', ('command',)))
+COMMAND_DURATION = REGISTRY.register(Histogram(
+    'rfibot_command_duration_seconds', 'Time from parsing a command to its completion', ('command',)))
+COMMAND_ERRORS = REGISTRY.register(Counter(
+    'rfibot_command_errors_total', 'Errors reported to on_command_error', ('command', 'error')))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    'rfibot_db_query_duration_seconds', 'Credits database method duration', ('query',)))
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    'rfibot_event_loop_lag_seconds', 'How late the event loop ran a scheduled wakeup',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)))
+
+
+class LoopLagProbe:
+    """Sleeps for a fixed interval and records how late each wakeup was"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.last_wakeup = time.perf_counter()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last_wakeup = time.perf_counter()
+            self.last_lag = max(0.0, self.last_wakeup - start - self.interval)
+            EVENT_LOOP_LAG.observe(self.last_lag)
+            self.sampled(self.last_lag)
+
+    def sampled(self, lag: float):
+        """Called on the loop after each sample; a hook for subclasses"""
+
+
+class MetricsServer:
+    """
+    Serves REGISTRY at /metrics from an aiohttp app on the bot's event loop.
+
+    Given a HealthMonitor, it also serves /health (liveness) and /ready (readiness):
+    200 or 503 with the latest health check as JSON.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, host: str, port: int, registry: Registry = REGISTRY, health=None):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.health = health
+        self.runner: Optional[web.AppRunner] = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode('utf-8'), headers={'Content-Type': self.CONTENT_TYPE})
+
+    def _health_response(self, ok: bool) -> web.Response:
+        status = asdict(self.health.status) if self.health.status else {}
+        return web.json_response(status, status=200 if ok else 503)
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return self._health_response(self.health.live)
+
+    async def handle_ready(self, request: web.Request) -> web.Response:
+        return self._health_response(self.health.ready)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        if self.health:
+            app.router.add_get('/health', self.handle_health)
+            app.router.add_get('/ready', self.handle_ready)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+def observe_db_query(name: str, seconds: float):
+    """CreditsDatabase query listener feeding DB_QUERY_DURATION"""
+    DB_QUERY_DURATION.observe(seconds, name)
+
+
+def register_bot_metrics(bot, probe: LoopLagProbe):
+    """Register the gauges read from the bot and its cogs at scrape time"""
+    from utils.sharding import shard_summary
+
+    def gateway_latency():
+        return {(str(s['shard_id']),): s['latency_ms'] / 1000 for s in shard_summary(bot) if s['latency_ms'] is not None}
+
+    def guilds():
+        return {(str(s['shard_id']),): s['guilds'] for s in shard_summary(bot)}
+
+    def active_games():
+        games = bot.get_cog('Games')
+        counts = games.active_game_counts() if hasattr(games, 'active_game_counts') else {}
+        return {(game,): count for game, count in counts.items()}
+
+    REGISTRY.register(GaugeFunc('rfibot_gateway_latency_seconds', 'Heartbeat latency per shard', gateway_latency, ('shard',)))
+    REGISTRY.register(GaugeFunc('rfibot_guilds', 'Guilds per shard', guilds, ('shard',)))
+    REGISTRY.register(GaugeFunc('rfibot_event_loop_lag_last_seconds', 'Most recent event loop lag sample', lambda: probe.last_lag))
+    REGISTRY.register(GaugeFunc('rfibot_active_games', 'Games in progress by kind', active_games, ('game',)))
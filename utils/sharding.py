@@ -0,0 +1,64 @@
+import logging
+from collections import Counter
+from typing import Optional, List, Dict, Any
+
+import discord
+
+
+def parse_shard_ids(value: Optional[str]) -> Optional[List[int]]:
+    """
+    Parse a shard ID list from the environment.
+
+    Accepts comma-separated IDs and inclusive ranges, e.g. "0,2" or "0-3,8".
+    Returns None for an empty value.
+    """
+    if not value:
+        return None
+    shard_ids: List[int] = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            shard_ids.extend(range(int(start), int(end) + 1))
+        else:
+            shard_ids.append(int(part))
+    return sorted(set(shard_ids))
+
+
+def shard_ranges(shard_count: int, cluster_count: int) -> List[List[int]]:
+    """Split shard_count shards into cluster_count contiguous, near-equal ranges"""
+    cluster_count = max(1, min(cluster_count, shard_count))
+    base, extra = divmod(shard_count, cluster_count)
+    ranges = []
+    start = 0
+    for cluster in range(cluster_count):
+        size = base + (1 if cluster < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def shard_summary(bot: discord.Client) -> List[Dict[str, Any]]:
+    """Latency (ms) and guild count for each shard this process runs"""
+    guild_counts = Counter(guild.shard_id for guild in bot.guilds)
+    if isinstance(bot, discord.AutoShardedClient):
+        latencies = bot.latencies
+    else:
+        latencies = [(bot.shard_id or 0, bot.latency)]
+    return [
+        {
+            'shard_id': shard_id,
+            'latency_ms': round(latency * 1000, 1) if latency == latency else None,  # NaN before the first heartbeat
+            'guilds': guild_counts.get(shard_id, 0),
+        }
+        for shard_id, latency in latencies
+    ]
+
+
+def log_shard_summary(bot: discord.Client, logger: logging.Logger):
+    """Log one line per shard with its latency and guild count"""
+    for shard in shard_summary(bot):
+        latency = f"{shard['latency_ms']} ms" if shard['latency_ms'] is not None else "n/a"
+        logger.info(f"Shard {shard['shard_id']}: latency {latency}, {shard['guilds']} guild(s)")
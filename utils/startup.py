@@ -0,0 +1,137 @@
+import sys
+import time
+import logging
+import importlib.abc
+from dataclasses import dataclass
+from typing import Optional, Dict, List
+
+# Taken when this module is first imported, i.e. as early in bot.py as possible
+PROCESS_START = time.perf_counter()
+
+
+@dataclass
+class ImportTiming:
+    """How long one module took to execute on import"""
+    name: str
+    total_ms: float  # Including the modules it imported
+    self_ms: float   # Excluding them
+
+
+@dataclass
+class CogTiming:
+    """How long one extension took to load"""
+    name: str
+    import_ms: float  # Executing the extension module, with its imports
+    setup_ms: float   # Its setup() function: cog construction and registration
+
+
+class _TimingLoader:
+    """Wraps a module loader and times exec_module; everything else passes through"""
+
+    def __init__(self, loader, name: str, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._exec_module(self._loader, self._name, module)
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Meta path hook that hands every found module a _TimingLoader"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimingLoader(spec.loader, fullname, self.profiler)
+                return spec
+        return None
+
+
+class StartupProfiler:
+    """
+    Shows where cold-start time goes before the gateway connects.
+
+    While installed, a meta path hook times every module executed on import (total and
+    self time), and load_extension() splits each cog's load into executing its module
+    and running its setup(). Without install() only the per-cog totals are measured.
+    Imports are assumed to happen on the main thread, as they do during startup.
+    """
+
+    def __init__(self):
+        self.imports: Dict[str, ImportTiming] = {}
+        self.cogs: Dict[str, CogTiming] = {}
+        self.marks: Dict[str, float] = {}  # label -> seconds since process start
+        self._finder: Optional[_TimingFinder] = None
+        self._child_ms: List[float] = []  # Time spent in nested imports, per executing module
+
+    @property
+    def installed(self) -> bool:
+        return self._finder is not None
+
+    def install(self):
+        if self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    def _exec_module(self, loader, name: str, module):
+        start = time.perf_counter()
+        self._child_ms.append(0.0)
+        try:
+            loader.exec_module(module)
+        finally:
+            total_ms = (time.perf_counter() - start) * 1000
+            child_ms = self._child_ms.pop()
+            if self._child_ms:
+                self._child_ms[-1] += total_ms
+            self.imports[name] = ImportTiming(name, total_ms, total_ms - child_ms)
+
+    def mark(self, label: str) -> float:
+        """Record a startup milestone; returns seconds since process start"""
+        elapsed = time.perf_counter() - PROCESS_START
+        self.marks[label] = elapsed
+        return elapsed
+
+    async def load_extension(self, bot, name: str) -> CogTiming:
+        """Load an extension and record its import and setup time"""
+        self.imports.pop(name, None)
+        start = time.perf_counter()
+        await bot.load_extension(name)
+        total_ms = (time.perf_counter() - start) * 1000
+        module = self.imports.get(name)
+        import_ms = module.total_ms if module else 0.0
+        timing = CogTiming(name, import_ms, total_ms - import_ms)
+        self.cogs[name] = timing
+        return timing
+
+    def report(self, logger: logging.Logger, top: int = 15):
+        """Log the milestones, every cog load and the slowest imports"""
+        for label, elapsed in self.marks.items():
+            logger.info(f"Startup: {label} at {elapsed:.2f}s")
+        for cog in sorted(self.cogs.values(), key=lambda c: c.import_ms + c.setup_ms, reverse=True):
+            if self.installed or cog.import_ms:
+                logger.info(f"Startup: cog {cog.name}: import {cog.import_ms:.1f} ms, setup {cog.setup_ms:.1f} ms")
+            else:
+                logger.info(f"Startup: cog {cog.name}: {cog.setup_ms:.1f} ms")
+        if self.imports:
+            logger.info(f"Startup: {len(self.imports)} modules imported, slowest (self time):")
+            for timing in sorted(self.imports.values(), key=lambda t: t.self_ms, reverse=True)[:top]:
+                logger.info(f"Startup:   {timing.name}: {timing.self_ms:.1f} ms self, {timing.total_ms:.1f} ms total")